@@ -0,0 +1,102 @@
+"""Admission control: per-request overhead, cost of a shed request and behaviour under a spike.
+
+The overhead runs dispatch the ``small`` payload of ``payloads.SCENARIOS`` (already parsed)
+without admission control, through an :class:`AdmissionControl` that admits everything and
+through one that sheds everything. The spike run sends 64 concurrent clients at a view
+function that holds one of 8 backend connections for 10 ms, with and without a concurrency
+limit of 8, and reports the latency of the answered requests.
+
+Run it with::
+
+    $ python benchmarks/bench_admission.py
+"""
+import json
+import threading
+import time
+
+from flask_dialogflow.admission import AdmissionControl
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+
+from payloads import payload_bytes, register
+
+NUMBER = 20000
+CLIENTS = 64
+BACKEND = 8
+DURATION = 2.0
+
+
+def measure(admission):
+    dispatcher = Dispatcher(admission=admission)
+    register(dispatcher)
+    data = json.loads(payload_bytes('small'))
+    for _ in range(1000):
+        dispatcher.dispatch(data)
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(NUMBER):
+            dispatcher.dispatch(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best / NUMBER * 1e6
+
+
+def spike(admission):
+    dispatcher = Dispatcher(admission=admission)
+    backend = threading.Semaphore(BACKEND)
+
+    @dispatcher.default
+    def slow():
+        with backend:
+            time.sleep(0.01)
+        return Response()
+
+    data = json.loads(payload_bytes('small'))
+    latencies, shed = [], [0]
+    lock = threading.Lock()
+    stop = time.perf_counter() + DURATION
+
+    def client():
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            body = dispatcher.dispatch(data)
+            elapsed = time.perf_counter() - start
+            with lock:
+                if admission is not None and body == admission.body:
+                    shed[0] += 1
+                else:
+                    latencies.append(elapsed)
+            if admission is not None and body == admission.body:
+                time.sleep(0.01)  # DialogFlow doesn't retry at once
+
+    threads = [threading.Thread(target=client) for _ in range(CLIENTS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    latencies.sort()
+    return (len(latencies), shed[0], latencies[len(latencies) // 2] * 1e3,
+            latencies[int(len(latencies) * 0.99)] * 1e3)
+
+
+def main():
+    baseline = measure(None)
+    print('{:<22} {:8.2f} us/request'.format('no admission control', baseline))
+    result = measure(AdmissionControl(max_concurrent=1000, session_rate=1e9))
+    print('{:<22} {:8.2f} us/request  (+{:.2f} us)'.format('admitted', result, result - baseline))
+    result = measure(AdmissionControl(session_rate=1e-9, session_burst=1))
+    print('{:<22} {:8.2f} us/request'.format('shed', result))
+
+    print()
+    print('{} clients, {} backend connections of 10 ms, {:.0f} s'.format(CLIENTS, BACKEND, DURATION))
+    for label, admission in (('no limit', None),
+                             ('max_concurrent=8', AdmissionControl(max_concurrent=BACKEND)),
+                             ('+ queue_timeout=20ms', AdmissionControl(max_concurrent=BACKEND, queue_timeout=0.02))):
+        answered, shed, p50, p99 = spike(admission)
+        print('{:<22} {:6} answered {:6} shed   p50 {:7.1f} ms   p99 {:7.1f} ms'.format(
+            label, answered, shed, p50, p99))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Cost of the authentication check, and of rejecting a flood of unauthenticated requests.
+
+The check itself is timed for a missing header, garbage, wrong credentials and the right
+ones, against the previous implementation (base64 decoding and ``==`` on every request).
+Then unauthenticated requests carrying the ``original_request`` payload of
+``payloads.SCENARIOS`` (100 KB) are sent to the WSGI application and through the Flask test
+client: they are rejected before the body is read, their cost is compared with an
+authenticated request. The Flask figures include the test client building the request.
+
+Run it with::
+
+    $ python benchmarks/bench_auth.py
+"""
+import base64
+import binascii
+import io
+import timeit
+
+from flask import Flask
+
+from flask_dialogflow.auth import BasicAuth
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+
+from payloads import payload_bytes, register
+
+NUMBER = 20000
+GOOD = 'Basic ' + base64.b64encode(b'agent:correct horse battery staple').decode('ascii')
+HEADERS = (
+    ('missing', None),
+    ('garbage', 'Basic !!!not base64!!!'),
+    ('wrong password', 'Basic ' + base64.b64encode(b'agent:wrong').decode('ascii')),
+    ('right', GOOD),
+)
+
+
+def decode_and_compare(authorization, username='agent', password='correct horse battery staple'):
+    """The check before precomputed credentials."""
+    if not authorization:
+        return False
+    scheme, _, credentials = authorization.partition(' ')
+    if scheme.lower() != 'basic':
+        return False
+    try:
+        decoded = base64.b64decode(credentials).decode('utf-8')
+    except (binascii.Error, UnicodeDecodeError):
+        return False
+    user, _, secret = decoded.partition(':')
+    return user == username and secret == password
+
+
+def best(statement, number=NUMBER):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    auth = BasicAuth([('agent', 'correct horse battery staple')])
+    rotated = BasicAuth([('agent', 'next password'), ('agent', 'correct horse battery staple')])
+    print('{:<16} {:>10} {:>12} {:>12}'.format('header', 'decode', 'precomputed', '2 rotated'))
+    for label, header in HEADERS:
+        print('{:<16} {:8.3f}us {:10.3f}us {:10.3f}us'.format(
+            label, best(lambda: decode_and_compare(header)),
+            best(lambda: auth.authenticate(header)), best(lambda: rotated.authenticate(header))))
+
+    body = payload_bytes('original_request')
+    dispatcher = Dispatcher(auth=auth)
+    register(dispatcher)
+    wsgi = dispatcher.wsgi_app(None)
+
+    def wsgi_call(header):
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body)}
+        if header is not None:
+            environ['HTTP_AUTHORIZATION'] = header
+        return wsgi(environ, lambda status, headers: None)
+
+    app = Flask(__name__)
+    dialogflow = DialogFlow(app, '/webhook', auth=auth)
+    register(dialogflow)
+    client = app.test_client()
+
+    def flask_call(header):
+        return client.post('/webhook', data=body, headers={'Authorization': header} if header else {})
+
+    print()
+    print('{} KB body'.format(len(body) // 1024))
+    for label, header in HEADERS:
+        print('{:<16} WSGI {:8.2f} us/request   Flask {:8.2f} us/request'.format(
+            label, best(lambda: wsgi_call(header), 2000), best(lambda: flask_call(header), 500)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,42 @@
+"""Per-request argument binding overhead of a view function.
+
+Compares the previous strategy (inspecting the view function signature and building
+a ``functools.partial`` on every request) against the :class:`Binding` compiled at
+registration time.
+
+Run it with::
+
+    $ python benchmarks/bench_binding.py
+"""
+import inspect
+import timeit
+from functools import partial
+
+from flask_dialogflow.binding import Binding
+
+PARAMS = {'number': '12', 'unit': 'cm', 'geo-city': 'Paris'}
+NUMBER = 100000
+
+
+def view(number, unit):
+    return number
+
+
+def before(params):
+    arg_values = []
+    for arg_name in inspect.getfullargspec(view).args:
+        arg_values.append(params.get(arg_name))
+    return partial(view, *arg_values)()
+
+
+after = Binding(view)
+
+
+def main():
+    for name, func in (('inspect + partial', before), ('Binding', after)):
+        best = min(timeit.repeat(lambda: func(PARAMS), number=NUMBER, repeat=5))
+        print('{:<20} {:8.3f} us/request'.format(name, best / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+"""Per-request overhead of the traffic capture at 0%, 1% and 100% sampling.
+
+Each run dispatches the ``small`` payload of ``payloads.SCENARIOS`` (already parsed) through a
+:class:`Dispatcher`, without capture and with a :class:`TrafficCapture` writing to a
+temporary directory. The background writer competes with the request thread for the GIL,
+so its cost is part of the measurement.
+
+Run it with::
+
+    $ python benchmarks/bench_capture.py
+"""
+import json
+import shutil
+import tempfile
+import time
+
+from flask_dialogflow.capture import TrafficCapture
+from flask_dialogflow.core import Dispatcher
+
+from payloads import payload_bytes, register
+
+NUMBER = 20000
+
+
+def measure(capture):
+    dispatcher = Dispatcher(capture=capture)
+    register(dispatcher)
+    data = json.loads(payload_bytes('small'))
+    for _ in range(1000):
+        dispatcher.dispatch(data)
+    best = None
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(NUMBER):
+            dispatcher.dispatch(data)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    if capture is not None:
+        capture.close()
+    return best / NUMBER * 1e6
+
+
+def main():
+    baseline = measure(None)
+    print('{:<14} {:8.2f} us/request'.format('no capture', baseline))
+    for rate in (0.0, 0.01, 1.0):
+        directory = tempfile.mkdtemp()
+        try:
+            capture = TrafficCapture(directory, rate=rate, queue_size=10 * NUMBER)
+            result = measure(capture)
+            print('{:<14} {:8.2f} us/request  (+{:.2f} us, {} written, {} dropped)'.format(
+                '{:.0%} sampled'.format(rate), result, result - baseline, capture.written, capture.dropped))
+        finally:
+            shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main()
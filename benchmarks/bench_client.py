@@ -0,0 +1,77 @@
+"""Latency of outbound calls with a new connection per call against the pooled client.
+
+A local HTTP/1.1 server answers a small JSON document. Calls are made with a fresh
+``http.client`` connection each time (what a view function does without a shared client),
+with :class:`HTTPClient`, and with :class:`HTTPClient` from inside a dispatched request, where
+the timeout is derived from the time left. Loopback connections are the cheapest there are:
+with TLS and a real network the gap is much wider.
+
+Run it with::
+
+    $ python benchmarks/bench_client.py
+"""
+import http.client
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from flask_dialogflow.client import HTTPClient
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+
+from payloads import make_payload
+
+NUMBER = 2000
+BODY = b'{"status":"shipped","eta":"2018-02-20"}'
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def best(statement, number=NUMBER):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port = server.server_address[1]
+
+    def new_connection():
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=5)
+        connection.request('GET', '/orders/42')
+        connection.getresponse().read()
+        connection.close()
+
+    client = HTTPClient(base_url='http://127.0.0.1:{}'.format(port))
+    dispatcher = Dispatcher(client=client)
+
+    @dispatcher.default
+    def order():
+        dispatcher.client.get('/orders/42')
+        return Response()
+
+    request = make_payload()
+    print('{:<26} {:8.1f} us/call'.format('new connection per call', best(new_connection)))
+    print('{:<26} {:8.1f} us/call'.format('pooled client', best(lambda: client.get('/orders/42'))))
+    print('{:<26} {:8.1f} us/request'.format('dispatch + pooled call', best(lambda: dispatcher.dispatch(request))))
+    print('opened {} connections for {} calls'.format(client.opened, client.opened + client.reused))
+    server.shutdown()
+    client.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Import cost of the Flask-free core against the Flask integration (cold start).
+
+Each import runs in a fresh interpreter with ``python -X importtime``, the self time of every
+module it imports is summed, whichever module imports it, minus the modules imported by the
+interpreter startup (best of several runs).
+
+Run it with::
+
+    $ python benchmarks/bench_import.py
+"""
+import subprocess
+import sys
+
+RUNS = 7
+TARGETS = (
+    ('core (Dispatcher)', 'from flask_dialogflow.core import Dispatcher'),
+    ('flask (DialogFlow)', 'from flask_dialogflow import DialogFlow'),
+    ('flask alone', 'import flask'),
+)
+
+
+def import_time(statement):
+    """Return the total import time of ``statement`` in a fresh interpreter, in microseconds."""
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', statement],
+                            stderr=subprocess.PIPE, check=True, universal_newlines=True).stderr
+    total = 0
+    for line in stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        fields = line.split(':', 1)[-1].split('|')
+        if len(fields) == 3 and fields[0].strip().isdigit():
+            total += int(fields[0])
+    return total
+
+
+def main():
+    startup = min(import_time('pass') for _ in range(RUNS))
+    for name, statement in TARGETS:
+        best = min(import_time(statement) for _ in range(RUNS))
+        print('{:<20} {:8.1f} ms'.format(name, (best - startup) / 1000))
+
+
+if __name__ == '__main__':
+    main()
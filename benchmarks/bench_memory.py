@@ -0,0 +1,40 @@
+"""Memory used by 10k responses, measured with tracemalloc.
+
+Every response holds one text message, one image, one quick reply list and one card,
+which is representative of a rich (carousel-like) answer.
+
+Run it with::
+
+    $ python benchmarks/bench_memory.py
+"""
+import tracemalloc
+
+from flask_dialogflow.messages import TextMessage, ImageMessage, QuickReplyMessage, CardMessage
+from flask_dialogflow.response import Response
+
+COUNT = 10000
+REPLIES = ['yes', 'no', 'maybe']
+BUTTONS = [{'text': 'Buy', 'postback': 'buy'}]
+
+
+def build_response():
+    response = Response()
+    response.append(TextMessage(speech='Here are our products'))
+    response.append(ImageMessage(image_url='https://example.com/1.png'))
+    response.append(QuickReplyMessage(title='Interested?', replies=REPLIES))
+    response.append(CardMessage(buttons=BUTTONS, image_url='https://example.com/1.png',
+                                title='Product', subtitle='The best one'))
+    return response
+
+
+def main():
+    tracemalloc.start()
+    responses = [build_response() for _ in range(COUNT)]
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('{} responses: {:.2f} MiB current, {:.2f} MiB peak, {:.0f} bytes per response'.format(
+        len(responses), current / 2**20, peak / 2**20, current / COUNT))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+"""Per-request overhead of the metrics instrumentation.
+
+Dispatches the sample request directly (no HTTP layer) with and without a
+:class:`Metrics` sink, the difference is the cost of the instrumentation.
+
+Run it with::
+
+    $ python benchmarks/bench_metrics.py
+"""
+import json
+import os
+import sys
+import timeit
+
+from flask_dialogflow import DialogFlow, Response, TextMessage
+from flask_dialogflow.metrics import Metrics
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'tests'))
+from sample_data import sample_request  # noqa: E402
+
+NUMBER = 50000
+RESPONSE = Response()
+RESPONSE.append(TextMessage(speech='Hi there!'))
+
+
+def build(metrics):
+    dialogflow = DialogFlow(route='/webhook', metrics=metrics)
+
+    @dialogflow.action('hello')
+    def hello():
+        return RESPONSE
+
+    return dialogflow
+
+
+def main():
+    raw = json.dumps(sample_request)
+    plain = build(None)
+    measured = build(Metrics())
+    timings = {}
+    for name, func in (('without metrics', lambda: plain._dispatch(json.loads(raw))),
+                       ('with metrics', lambda: measured._measured_dispatch(json.loads, raw))):
+        timings[name] = min(timeit.repeat(func, number=NUMBER, repeat=5)) / NUMBER * 1e6
+        print('{:<20} {:8.3f} us/request'.format(name, timings[name]))
+    print('{:<20} {:8.3f} us/request'.format(
+        'overhead', timings['with metrics'] - timings['without metrics']))
+
+
+if __name__ == '__main__':
+    main()
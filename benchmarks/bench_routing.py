@@ -0,0 +1,59 @@
+"""Action resolution with 5000 registered actions.
+
+Registers 4000 exact actions and 1000 patterns (``domainN.*`` and ``domainN.{step}.done``),
+then times :meth:`Dispatcher._prepare` for an exact name, a pattern match served from the
+resolved-route cache, a pattern match walking the trie (cache cleared on every call) and an unknown action
+falling through to the default view function.
+
+Run it with::
+
+    $ python benchmarks/bench_routing.py
+"""
+import timeit
+
+from flask_dialogflow.core import Dispatcher
+
+NUMBER = 100000
+
+
+def view():
+    pass
+
+
+def build():
+    dispatcher = Dispatcher()
+    for i in range(4000):
+        dispatcher.action('domain{}.action{}'.format(i % 500, i))(view)
+    for i in range(500):
+        dispatcher.action('domain{}.*'.format(i))(view)
+        dispatcher.action('domain{}.{{step}}.done'.format(i))(view)
+    dispatcher.default(view)
+    return dispatcher
+
+
+def request(action):
+    return {'result': {'action': action, 'parameters': {}}}
+
+
+def main():
+    dispatcher = build()
+    cases = (
+        ('exact', request('domain250.action2250')),
+        ('pattern, cached', request('domain250.checkout.done')),
+        ('unknown, cached', request('unknown.action')),
+    )
+    for name, data in cases:
+        best = min(timeit.repeat(lambda: dispatcher._prepare(data), number=NUMBER, repeat=5))
+        print('{:<20} {:8.3f} us/request'.format(name, best / NUMBER * 1e6))
+
+    resolved = dispatcher._action_patterns._resolved
+    for name, data in (('pattern, trie walk', request('domain250.checkout.done')),
+                       ('wildcard, trie walk', request('domain250.a.b.c')),
+                       ('unknown, trie walk', request('unknown.action'))):
+        best = min(timeit.repeat(lambda: (resolved.clear(), dispatcher._prepare(data)),
+                                 number=NUMBER, repeat=5))
+        print('{:<20} {:8.3f} us/request'.format(name, best / NUMBER * 1e6))
+
+
+if __name__ == '__main__':
+    main()
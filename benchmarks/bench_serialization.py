@@ -0,0 +1,52 @@
+"""Serialization cost of a response with 1, 10 and 100 messages.
+
+Compares the previous strategy (``json.dumps`` of the response ``__dict__`` with
+:class:`MessageEncoder` walking each message ``__dict__``) against
+:meth:`Response.to_json` with every available JSON backend.
+
+Run it with::
+
+    $ python benchmarks/bench_serialization.py
+"""
+import json
+import timeit
+
+from flask_dialogflow.helpers import JSON_BACKENDS, set_json_backend
+from flask_dialogflow.messages import MessageEncoder, TextMessage, CardMessage
+from flask_dialogflow.response import Response
+
+NUMBER = 2000
+
+
+def build_response(size):
+    response = Response()
+    for i in range(size):
+        if i % 2:
+            response.append(TextMessage(speech='Message number {}'.format(i)))
+        else:
+            response.append(CardMessage(
+                buttons=[{'text': 'Buy', 'postback': 'buy-{}'.format(i)}],
+                image_url='https://example.com/{}.png'.format(i),
+                title='Card {}'.format(i), subtitle='Subtitle'))
+    return response
+
+
+def main():
+    print('{:<24} {:>10} {:>10} {:>10}'.format('', '1 msg', '10 msgs', '100 msgs'))
+    responses = [build_response(size) for size in (1, 10, 100)]
+
+    def report(name, func):
+        timings = []
+        for response in responses:
+            best = min(timeit.repeat(lambda: func(response), number=NUMBER, repeat=5))
+            timings.append('{:8.2f}us'.format(best / NUMBER * 1e6))
+        print('{:<24} {:>10} {:>10} {:>10}'.format(name, *timings))
+
+    report('MessageEncoder', lambda r: json.dumps(r.__dict__, cls=MessageEncoder))
+    for backend in sorted(JSON_BACKENDS):
+        set_json_backend(backend)
+        report('to_json ({})'.format(backend), Response.to_json)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""Cost of the request validation, and of rejecting malformed or oversized requests.
+
+The compiled validator is timed against the same checks written by hand, on the ``small``
+payload of ``payloads.SCENARIOS``. Then requests are sent to the WSGI application with a
+``max_body_size`` of 64 KB: a valid one, one missing ``result.action``, a 1 MB one and a
+1 MB one without ``Content-Length`` (read up to the limit only).
+
+Run it with::
+
+    $ python benchmarks/bench_validation.py
+"""
+import io
+import json
+import timeit
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.validation import validate_webhook
+
+from payloads import payload_bytes, register
+
+NUMBER = 20000
+
+
+def handwritten(data):
+    if not isinstance(data, dict):
+        raise ValueError()
+    result = data.get('result')
+    if not isinstance(result, dict) or not isinstance(result.get('action'), str) \
+            or not isinstance(result.get('parameters'), dict):
+        raise ValueError()
+    metadata = result.get('metadata')
+    if not isinstance(metadata, dict) or not isinstance(metadata.get('intentName'), str):
+        raise ValueError()
+
+
+def best(statement, number=NUMBER):
+    return min(timeit.repeat(statement, number=number, repeat=5)) / number * 1e6
+
+
+def main():
+    data = json.loads(payload_bytes('small'))
+    print('{:<28} {:8.3f} us'.format('compiled validator', best(lambda: validate_webhook(data))))
+    print('{:<28} {:8.3f} us'.format('handwritten checks', best(lambda: handwritten(data))))
+
+    dispatcher = Dispatcher(max_body_size=64 * 1024)
+    register(dispatcher)
+    app = dispatcher.wsgi_app(None)
+    invalid = json.loads(payload_bytes('small'))
+    del invalid['result']['action']
+    bodies = (
+        ('valid', payload_bytes('small'), True),
+        ('missing result.action', json.dumps(invalid).encode('utf-8'), True),
+        ('1 MB', b' ' * (1024 * 1024) + payload_bytes('small'), True),
+        ('1 MB, no Content-Length', b' ' * (1024 * 1024) + payload_bytes('small'), False),
+    )
+    print()
+    for label, body, length in bodies:
+        def call():
+            environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'wsgi.input': io.BytesIO(body)}
+            if length:
+                environ['CONTENT_LENGTH'] = str(len(body))
+            statuses = []
+            app(environ, lambda status, headers: statuses.append(status))
+            return statuses[0]
+        print('{:<28} {:8.2f} us  {}'.format(label, best(call, 2000), call()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""Benchmark of the webhook hot path: parsing, dispatch, view function and serialization.
+
+Every scenario of ``payloads.SCENARIOS`` is sent to ``DialogFlow._flask_view_func``,
+either through the Flask test client or with a direct WSGI call (no client overhead).
+For each one it reports requests/sec, latency percentiles and the memory allocated
+while handling one request (tracemalloc peak, measured in a separate pass).
+
+Run it with::
+
+    $ python benchmarks/bench_webhook.py
+    $ python benchmarks/bench_webhook.py --mode client --scenario contexts --requests 500
+
+Save a baseline and check a change against it (exits with status 1 on regression)::
+
+    $ python benchmarks/bench_webhook.py --save baseline.json
+    $ python benchmarks/bench_webhook.py --compare baseline.json --tolerance 0.2
+"""
+import argparse
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+from flask import Flask
+from werkzeug.test import create_environ
+
+from flask_dialogflow import DialogFlow
+
+from payloads import SCENARIOS, payload_bytes, register
+
+WEBHOOK_ENDPOINT = '/webhook'
+
+
+def build_app():
+    app = Flask(__name__)
+    dialogflow = DialogFlow(app, WEBHOOK_ENDPOINT)
+    register(dialogflow)
+    return app
+
+
+def client_sender(app, body):
+    client = app.test_client()
+
+    def send():
+        response = client.post(WEBHOOK_ENDPOINT, data=body, content_type='application/json')
+        assert response.status_code == 200, response.status
+    return send
+
+
+def wsgi_sender(app, body):
+    environ = create_environ(WEBHOOK_ENDPOINT, method='POST', content_type='application/json',
+                             content_length=len(body))
+
+    def start_response(status, headers, exc_info=None):
+        assert status.startswith('200'), status
+
+    def send():
+        request_environ = dict(environ)
+        request_environ['wsgi.input'] = io.BytesIO(body)
+        for _ in app.wsgi_app(request_environ, start_response):
+            pass
+    return send
+
+
+SENDERS = {'client': client_sender, 'wsgi': wsgi_sender}
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def run(mode, scenario, requests, warmup=50, allocation_requests=50):
+    body = payload_bytes(scenario)
+    send = SENDERS[mode](build_app(), body)
+    for _ in range(warmup):
+        send()
+
+    latencies = []
+    clock = time.perf_counter
+    start = clock()
+    for _ in range(requests):
+        request_start = clock()
+        send()
+        latencies.append(clock() - request_start)
+    elapsed = clock() - start
+    latencies.sort()
+
+    tracemalloc.start()
+    allocated = []
+    for _ in range(allocation_requests):
+        tracemalloc.reset_peak()
+        current = tracemalloc.get_traced_memory()[0]
+        send()
+        allocated.append(tracemalloc.get_traced_memory()[1] - current)
+    tracemalloc.stop()
+
+    return {
+        'mode': mode,
+        'scenario': scenario,
+        'request_bytes': len(body),
+        'rps': requests / elapsed,
+        'p50_us': percentile(latencies, 0.50) * 1e6,
+        'p90_us': percentile(latencies, 0.90) * 1e6,
+        'p99_us': percentile(latencies, 0.99) * 1e6,
+        'max_us': latencies[-1] * 1e6,
+        'alloc_kb': sum(allocated) / len(allocated) / 1024,
+    }
+
+
+def report(results):
+    header = '{:<8} {:<18} {:>9} {:>10} {:>9} {:>9} {:>9} {:>9} {:>10}'
+    row = '{mode:<8} {scenario:<18} {request_kb:>8.1f}K {rps:>10.0f} {p50_us:>9.1f} {p90_us:>9.1f} ' \
+          '{p99_us:>9.1f} {max_us:>9.1f} {alloc_kb:>9.1f}K'
+    print(header.format('mode', 'scenario', 'request', 'req/s', 'p50 us', 'p90 us', 'p99 us',
+                        'max us', 'alloc'))
+    for result in results:
+        print(row.format(request_kb=result['request_bytes'] / 1024, **result))
+
+
+def compare(results, baseline_path, tolerance):
+    """Return the results whose p50 latency regressed by more than ``tolerance`` against the baseline."""
+    with open(baseline_path) as baseline_file:
+        baseline = {(item['mode'], item['scenario']): item for item in json.load(baseline_file)}
+    regressions = []
+    for result in results:
+        previous = baseline.get((result['mode'], result['scenario']))
+        if previous is not None and result['p50_us'] > previous['p50_us'] * (1 + tolerance):
+            regressions.append((result, previous))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=sorted(SENDERS), action='append',
+                        help='how requests are sent (default: all)')
+    parser.add_argument('--scenario', choices=sorted(SCENARIOS), action='append',
+                        help='payload shape (default: all)')
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests per run')
+    parser.add_argument('--save', metavar='PATH', help='write the results as JSON')
+    parser.add_argument('--compare', metavar='PATH', help='baseline written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help='allowed p50 slowdown against the baseline (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    results = [run(mode, scenario, args.requests)
+               for mode in args.mode or sorted(SENDERS)
+               for scenario in args.scenario or list(SCENARIOS)]
+    report(results)
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump(results, output, indent=2)
+    if args.compare:
+        regressions = compare(results, args.compare, args.tolerance)
+        for result, previous in regressions:
+            print('REGRESSION {mode} {scenario}: p50 {p50_us:.1f}us'.format(**result),
+                  'was {:.1f}us'.format(previous['p50_us']))
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,75 @@
+"""Synthetic DialogFlow webhook payloads and view functions for the benchmarks."""
+import copy
+import json
+import os
+import sys
+
+from flask_dialogflow import Response, TextMessage, CardMessage
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'tests'))
+from sample_data import sample_request, sample_context  # noqa: E402
+
+ACTION = 'bench'
+
+
+def make_payload(contexts=0, parameters=0, original_request_kb=0, messages=1):
+    """Build a webhook request from ``tests/sample_data.sample_request``.
+
+    Keyword Arguments:
+        contexts {int} -- Number of input contexts, each with 10 parameters (default: {0})
+        parameters {int} -- Number of extra request parameters (default: {0})
+        original_request_kb {int} -- Approximate size of the ``originalRequest`` blob (default: {0})
+        messages {int} -- Number of messages the view function answers with (default: {1})
+
+    Returns:
+        [dict] -- The request
+    """
+    data = copy.deepcopy(sample_request)
+    result = data['result']
+    result['action'] = ACTION
+    result['parameters'] = {'messages': str(messages)}
+    result['parameters'].update(('param-{}'.format(i), 'value {}'.format(i)) for i in range(parameters))
+    result['contexts'] = [
+        dict(sample_context, name='context-{}'.format(i),
+             parameters={'key-{}'.format(j): 'value {}'.format(j) for j in range(10)})
+        for i in range(contexts)
+    ]
+    if original_request_kb:
+        chunk = 'x' * 1000
+        data['originalRequest'] = {
+            'source': 'facebook',
+            'data': {'entries': [{'id': i, 'text': chunk} for i in range(original_request_kb)]},
+        }
+    return data
+
+
+#: name -> payload arguments
+SCENARIOS = {
+    'small': {},
+    'contexts': {'contexts': 50},
+    'parameters': {'parameters': 200},
+    'original_request': {'original_request_kb': 100},
+    'messages': {'messages': 100},
+}
+
+
+def payload_bytes(scenario):
+    return json.dumps(make_payload(**SCENARIOS[scenario])).encode('utf-8')
+
+
+def register(dialogflow):
+    """Register the benchmark view function, answering with ``messages`` messages."""
+
+    @dialogflow.action(ACTION)
+    def bench(messages, **parameters):
+        response = Response()
+        count = int(messages)
+        response.extend(
+            TextMessage(speech='Message {}'.format(i)) if i % 2 else
+            CardMessage(buttons=[{'text': 'Buy', 'postback': 'buy'}],
+                        image_url='https://example.com/{}.png'.format(i),
+                        title='Card {}'.format(i), subtitle='Subtitle')
+            for i in range(count))
+        return response
+
+    return bench
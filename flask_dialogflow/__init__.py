@@ -1,4 +1,41 @@
-from .dialogflow import DialogFlow
-from .response import Response
+from .core import Dispatcher
+from .response import Response, FrozenResponse
 from .messages import Message, MessageType, Platform, TextMessage, QuickReplyMessage, \
                         CardMessage, ImageMessage
+from .cache import TTLCache
+from .idempotency import Idempotency, IdempotencyStore
+from .metrics import Metrics, MetricsSink
+from .errors import BadRequest, ParameterError, InvalidPayload, PayloadTooLarge, CircuitOpen, \
+                    DeadlineExceeded
+from .validation import WEBHOOK_FIELDS, compile_validator, validate_webhook
+
+# Imported on first use: DialogFlow so the Flask-free core can be imported without Flask, the
+# others (logging, gzip, hmac, http.client...) so they don't slow down cold starts of the
+# functions that don't use them.
+_LAZY = {
+    'DialogFlow': 'dialogflow',
+    'SessionStore': 'session',
+    'SessionBackend': 'session',
+    'MemoryBackend': 'session',
+    'SQLiteBackend': 'session',
+    'TaskQueue': 'tasks',
+    'TrafficCapture': 'capture',
+    'Profiler': 'profiling',
+    'AdmissionControl': 'admission',
+    'Authenticator': 'auth',
+    'TokenAuth': 'auth',
+    'BasicAuth': 'auth',
+    'BearerAuth': 'auth',
+    'AnyAuth': 'auth',
+    'HTTPClient': 'client',
+    'CircuitBreaker': 'client',
+    'ClientResponse': 'client',
+}
+
+
+def __getattr__(name):
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError('module {!r} has no attribute {!r}'.format(__name__, name))
+    from importlib import import_module
+    return getattr(import_module('.' + module, __name__), name)
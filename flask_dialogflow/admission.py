@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import Counter, deque
+
+from .messages import TextMessage
+from .response import Response, FrozenResponse
+
+
+def _busy_response():
+    response = Response()
+    response.append(TextMessage(speech="Sorry, I'm a bit busy right now. Please try again in a moment."))
+    return response.freeze()
+
+
+def _grant(admission, future):
+    # runs on the loop of the waiter: a waiter that gave up in the meantime passes its slot on
+    if future.done():
+        admission.release()
+    else:
+        future.set_result(None)
+
+
+class _Bucket:
+    __slots__ = ('tokens', 'stamp')
+
+    def __init__(self, tokens, stamp):
+        self.tokens = tokens
+        self.stamp = stamp
+
+
+class AdmissionControl:
+    """Admission control of the webhook requests, to shed load early during traffic spikes.
+
+    A request is admitted when its session has a token left in its bucket (``session_rate``
+    tokens per second, up to ``session_burst``) and one of the ``max_concurrent`` slots is
+    free, or frees up within ``queue_timeout`` seconds. Otherwise it is shed: DialogFlow gets
+    ``response``, serialized once, instead of waiting for an overloaded handler and timing out.
+    Requests shed for lack of a slot give their token back to their session.
+
+    Counters: ``admitted``, ``queued`` (admitted or not, requests that had to wait for a
+    slot) and ``shed``, per reason (``'rate_limited'`` or ``'overloaded'``).
+
+    Keyword Arguments:
+        max_concurrent {int} -- Number of requests handled at the same time, unlimited if None (default: {None})
+        queue_timeout {float} -- Time a request may wait for a slot, in seconds (default: {0.0})
+        session_rate {float} -- Requests per second allowed to a ``sessionId``, unlimited if None (default: {None})
+        session_burst {int} -- Size of the bucket of each session, defaults to ``max(1, session_rate)`` (default: {None})
+        max_sessions {int} -- Number of session buckets kept, the oldest are forgotten first (default: {100000})
+        response {Response} -- Response sent to the requests that are shed (default: {"please try again" message})
+        timer {function} -- Clock refilling the buckets (default: {time.monotonic})
+
+    Example:
+        >>> admission = AdmissionControl(max_concurrent=32, queue_timeout=0.5, session_rate=2)
+        >>> dialogflow = DialogFlow(app, '/webhook', admission=admission)
+    """
+
+    def __init__(self, max_concurrent=None, queue_timeout=0.0, session_rate=None,
+                 session_burst=None, max_sessions=100000, response=None, timer=time.monotonic):
+        self.max_concurrent = max_concurrent
+        self.queue_timeout = queue_timeout
+        self.session_rate = session_rate
+        if session_burst is None and session_rate is not None:
+            session_burst = max(1, session_rate)
+        self.session_burst = session_burst
+        self.max_sessions = max_sessions
+        if response is None:
+            response = _busy_response()
+        elif not isinstance(response, FrozenResponse):
+            response = response.freeze()
+        self.response = response
+        self.body = response.body
+        self.timer = timer
+        self.active = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed = Counter()
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self._released = threading.Condition(self._lock)
+        # futures of the coroutines waiting for a slot, with their loops, and number of waiting threads
+        self._waiters = deque()
+        self._sleeping = 0
+
+    def acquire(self, session_id=None):
+        """Try to admit a request, waiting for a slot up to ``queue_timeout``.
+
+        Arguments:
+            session_id {str} -- The ``sessionId`` of the request (default: {None})
+
+        Returns:
+            [bool] -- Whether the request is admitted, then :meth:`release` must be called once it is handled
+        """
+        with self._lock:
+            if not self._take_token(session_id):
+                return False
+            if self._take_slot():
+                return True
+            if self.queue_timeout <= 0:
+                return self._overloaded(session_id)
+            self.queued += 1
+            deadline = time.monotonic() + self.queue_timeout
+            while not self._take_slot():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return self._overloaded(session_id)
+                self._sleeping += 1
+                try:
+                    self._released.wait(remaining)
+                finally:
+                    self._sleeping -= 1
+            return True
+
+    async def acquire_async(self, session_id=None):
+        """Coroutine counterpart of :meth:`acquire`, waits without blocking the event loop."""
+        import asyncio
+
+        with self._lock:
+            if not self._take_token(session_id):
+                return False
+            if self._take_slot():
+                return True
+            if self.queue_timeout <= 0:
+                return self._overloaded(session_id)
+            self.queued += 1
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+        try:
+            # the slot is handed over by release, see _grant
+            await asyncio.wait_for(future, self.queue_timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                return self._overloaded(session_id)
+        with self._lock:
+            self.admitted += 1
+        return True
+
+    def release(self):
+        """Free the slot of an admitted request."""
+        with self._lock:
+            while self._waiters:
+                loop, future = self._waiters.popleft()
+                if not future.done():
+                    loop.call_soon_threadsafe(_grant, self, future)
+                    return
+            self.active -= 1
+            if self._sleeping:
+                self._released.notify()
+
+    def _take_token(self, session_id):
+        if self.session_rate is None or session_id is None:
+            return True
+        now = self.timer()
+        bucket = self._buckets.get(session_id)
+        if bucket is None:
+            if len(self._buckets) >= self.max_sessions:
+                del self._buckets[next(iter(self._buckets))]
+            bucket = self._buckets[session_id] = _Bucket(self.session_burst, now)
+        else:
+            bucket.tokens = min(self.session_burst,
+                                bucket.tokens + (now - bucket.stamp) * self.session_rate)
+            bucket.stamp = now
+        if bucket.tokens < 1:
+            self.shed['rate_limited'] += 1
+            return False
+        bucket.tokens -= 1
+        return True
+
+    def _take_slot(self):
+        if self.max_concurrent is not None and self.active >= self.max_concurrent:
+            return False
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def _overloaded(self, session_id):
+        # the request never ran, the session gets its token back
+        bucket = self._buckets.get(session_id) if self.session_rate is not None else None
+        if bucket is not None:
+            bucket.tokens = min(self.session_burst, bucket.tokens + 1)
+        self.shed['overloaded'] += 1
+        return False
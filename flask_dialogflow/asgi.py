@@ -0,0 +1,175 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from .errors import BadRequest, PayloadTooLarge
+
+
+async def _lifespan(receive, send, shutdown):
+    while True:
+        message = await receive()
+        if message['type'] == 'lifespan.startup':
+            await send({'type': 'lifespan.startup.complete'})
+        elif message['type'] == 'lifespan.shutdown':
+            await asyncio.get_running_loop().run_in_executor(None, shutdown)
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+class ASGIApp:
+    """ASGI application serving a DialogFlow webhook.
+
+    Coroutine view functions are awaited directly on the event loop, so a single process can
+    hold many concurrent fulfillment requests while they wait on slow backends. Synchronous
+    view functions keep working, they are offloaded to a bounded thread pool.
+
+    Don't build it directly, use :meth:`Dispatcher.asgi_app`.
+
+    Arguments:
+        dispatcher {Dispatcher} -- The dispatcher holding the registered actions
+        route {str} -- Route at which DialogFlow is going to listen, ``None`` to accept any path
+
+    Keyword Arguments:
+        max_workers {int} -- Size of the thread pool running synchronous view functions (default: {None})
+        executor {concurrent.futures.Executor} -- Thread pool running synchronous view functions, e.g. shared by several agents (default: {None})
+    """
+
+    def __init__(self, dispatcher, route, max_workers=None, executor=None):
+        self.dispatcher = dispatcher
+        self.route = route
+        self.max_workers = max_workers
+        self._executor = executor
+
+    @property
+    def executor(self):
+        """Thread pool used for synchronous view functions, created on first use."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='flask-dialogflow')
+        return self._executor
+
+    def shutdown(self):
+        """Wait for the running synchronous view functions, release the thread pool and shut the dispatcher down.
+
+        See :meth:`Dispatcher.shutdown`, deferred tasks, queued sessions and captured traffic are written too.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.dispatcher.shutdown()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(receive, send, self.shutdown)
+            return
+        if scope['type'] != 'http':
+            raise NotImplementedError('Unsupported ASGI scope type: "{}"'.format(scope['type']))
+
+        if self.route is not None and scope['path'] != self.route:
+            await self._send(send, 404)
+            return
+        if scope['method'] != 'POST':
+            await self._send(send, 405)
+            return
+        if not self.dispatcher._is_authorized(self._header(scope, b'authorization')):
+            await self._send(send, 401)
+            return
+
+        profiler = self.dispatcher.profiler
+        profile = profiler is not None and profiler.requested(
+            self._header(scope, profiler.header.lower().encode('latin-1')))
+        try:
+            body = await self.dispatch(await self._read_body(scope, receive), profile)
+        except BadRequest as error:
+            await self._send(send, error.status, error.body)
+            return
+        if body is None:
+            await self._send(send, 400)
+            return
+        await self._send(send, 200, body)
+
+    async def dispatch(self, payload, profile=False):
+        """Handle a webhook request, see :meth:`Dispatcher.dispatch_async`.
+
+        Arguments:
+            payload {dict|bytes|str} -- The request sent by Google DialogFlow, parsed or not
+
+        Keyword Arguments:
+            profile {bool} -- Profile the request, if the dispatcher has a :class:`Profiler` (default: {False})
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        return await self.dispatcher.dispatch_async(payload, self.executor, profile)
+
+    @staticmethod
+    def _header(scope, name):
+        for key, value in scope['headers']:
+            if key == name:
+                return value
+        return None
+
+    async def _read_body(self, scope, receive):
+        max_size = self.dispatcher.max_body_size
+        if max_size is not None:
+            try:
+                length = int(self._header(scope, b'content-length'))
+            except (TypeError, ValueError):
+                length = None  # no Content-Length, counted while reading
+            self.dispatcher._check_body_size(length)
+        chunks = []
+        size = 0
+        more_body = True
+        while more_body:
+            message = await receive()
+            chunk = message.get('body', b'')
+            size += len(chunk)
+            if max_size is not None and size > max_size:
+                raise PayloadTooLarge(max_size)
+            chunks.append(chunk)
+            more_body = message.get('more_body', False)
+        return b''.join(chunks)
+
+    @staticmethod
+    async def _send(send, status, body=b''):
+        headers = [(b'content-length', str(len(body)).encode('ascii'))]
+        if body:
+            headers.append((b'content-type', b'application/json'))
+        await send({'type': 'http.response.start', 'status': status, 'headers': headers})
+        await send({'type': 'http.response.body', 'body': body})
+
+
+class ASGIRouter:
+    """ASGI application serving the webhooks of several agents, one route each.
+
+    Lifespan events are handled here: on shutdown every application is shut down.
+
+    Arguments:
+        apps {list[ASGIApp]} -- The applications of the agents, they must have distinct routes
+
+    Example:
+        >>> pool = ThreadPoolExecutor(max_workers=32)
+        >>> app = ASGIRouter([billing.asgi_app('/billing', executor=pool),
+        >>>                   support.asgi_app('/support', executor=pool)])
+    """
+
+    def __init__(self, apps):
+        self.apps = {}
+        for app in apps:
+            if app.route is None or app.route in self.apps:
+                raise ValueError('Each agent needs its own route, got {!r}'.format(app.route))
+            self.apps[app.route] = app
+
+    def shutdown(self):
+        """Shut every application down."""
+        for app in self.apps.values():
+            app.shutdown()
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await _lifespan(receive, send, self.shutdown)
+            return
+        app = self.apps.get(scope.get('path'))
+        if app is None:
+            await ASGIApp._send(send, 404)
+            return
+        await app(scope, receive, send)
@@ -0,0 +1,99 @@
+import base64
+import hmac
+
+
+class Authenticator:
+    """Base class of the objects checking the ``Authorization`` header of the webhook requests.
+
+    The check runs before the body is read or parsed: unauthenticated requests are rejected
+    with a 401 without touching it.
+    """
+
+    def authenticate(self, authorization):
+        """Tell whether a request may be processed.
+
+        Arguments:
+            authorization {str|bytes} -- Value of the ``Authorization`` header, None if missing
+
+        Returns:
+            [bool] -- Whether the request is authenticated
+        """
+        raise NotImplementedError()
+
+
+class TokenAuth(Authenticator):
+    """Accepts the ``Authorization`` headers ``<scheme> <token>`` with one of the given tokens.
+
+    The tokens are encoded once: a request costs a constant-time comparison of the raw header
+    with each of them, several tokens allow rotating them without downtime.
+
+    Arguments:
+        scheme {str} -- The authentication scheme, e.g. ``'Bearer'`` (compared case-insensitively)
+        tokens {list[str|bytes]} -- The accepted tokens
+    """
+
+    def __init__(self, scheme, tokens):
+        self.scheme = scheme.lower().encode('ascii')
+        self._tokens = tuple(token if isinstance(token, bytes) else token.encode('utf-8')
+                             for token in tokens)
+        if not self._tokens:
+            raise ValueError('At least one credential is required')
+
+    def authenticate(self, authorization):
+        if not authorization:
+            return False
+        if not isinstance(authorization, bytes):
+            authorization = authorization.encode('latin-1', 'replace')
+        scheme, _, token = authorization.partition(b' ')
+        if scheme.lower() != self.scheme:
+            return False
+        token = token.strip()
+        matched = False
+        # no early exit, so the time doesn't tell which credential matched
+        for expected in self._tokens:
+            matched |= hmac.compare_digest(token, expected)
+        return matched
+
+
+class BasicAuth(TokenAuth):
+    """HTTP basic auth, against one or several (rotated) username and password pairs.
+
+    Arguments:
+        credentials {list[tuple[str, str]]} -- The accepted ``(username, password)`` pairs
+
+    Example:
+        >>> dialogflow = DialogFlow(app, '/webhook', auth=BasicAuth([('agent', new), ('agent', old)]))
+    """
+
+    def __init__(self, credentials):
+        super(BasicAuth, self).__init__('Basic', [
+            base64.b64encode('{}:{}'.format(username, password or '').encode('utf-8'))
+            for username, password in credentials])
+
+
+class BearerAuth(TokenAuth):
+    """Bearer tokens, e.g. an API key set in the headers of the fulfillment webhook.
+
+    Arguments:
+        tokens {list[str]} -- The accepted tokens
+
+    Example:
+        >>> dialogflow = DialogFlow(app, '/webhook', auth=BearerAuth([os.environ['WEBHOOK_TOKEN']]))
+    """
+
+    def __init__(self, tokens):
+        super(BearerAuth, self).__init__('Bearer', tokens)
+
+
+class AnyAuth(Authenticator):
+    """Accepts the requests accepted by any of the given authenticators.
+
+    Arguments:
+        authenticators {list[Authenticator]} -- The authenticators, tried in order
+    """
+
+    def __init__(self, authenticators):
+        self.authenticators = tuple(authenticators)
+
+    def authenticate(self, authorization):
+        return any(authenticator.authenticate(authorization) for authenticator in self.authenticators)
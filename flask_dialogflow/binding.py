@@ -0,0 +1,163 @@
+import inspect
+
+
+class Binding:
+    """Precompiled plan to call a view function with the parameters of a DialogFlow request.
+
+    The view function signature is inspected once, when the function is registered,
+    and turned into a list of ``(name, default)`` pairs. At request time the binding
+    just looks the names up in the ``parameters`` object of the request, without any
+    reflection or ``functools.partial`` allocation.
+
+    Positional (and positional-or-keyword) arguments are passed positionally, keyword-only
+    arguments are passed by name, and if the view function accepts ``**kwargs`` every
+    parameter that is not mapped to a named argument is passed there. Missing parameters
+    take the argument default, or ``None`` if the argument has no default.
+
+    Annotated arguments are converted to their type, see :mod:`flask_dialogflow.coercion`:
+    the converters are chosen here, a value that can't be converted raises
+    :class:`flask_dialogflow.errors.ParameterError`. Missing and empty (``""``) values of
+    annotated arguments take the argument default.
+
+    Bindings of ``async def`` view functions return the coroutine, ``is_async`` tells the
+    dispatcher that it must be awaited.
+
+    Arguments:
+        func {function} -- The view function to bind
+
+    Example:
+        >>> def square(number, *, unit='cm', **extra):
+        >>>     ...
+        >>> binding = Binding(square)
+        >>> binding({'number': '2', 'color': 'red'})   # square('2', unit='cm', color='red')
+        >>>
+        >>> def cube(number: int):
+        >>>     ...
+        >>> Binding(cube)({'number': '2'})   # cube(2)
+    """
+
+    __slots__ = ('func', 'is_async', 'positional', 'keyword_only', 'var_keyword', 'converters',
+                 'call', '_bound_names', '_expected')
+
+    def __init__(self, func):
+        self.func = func
+        self.is_async = inspect.iscoroutinefunction(func)
+        self.positional = []
+        self.keyword_only = []
+        self.var_keyword = False
+
+        for param in inspect.signature(func).parameters.values():
+            default = None if param.default is param.empty else param.default
+            if param.kind in (param.POSITIONAL_ONLY, param.POSITIONAL_OR_KEYWORD):
+                self.positional.append((param.name, default))
+            elif param.kind is param.KEYWORD_ONLY:
+                self.keyword_only.append((param.name, default))
+            elif param.kind is param.VAR_KEYWORD:
+                self.var_keyword = True
+
+        self._bound_names = frozenset(
+            name for name, _ in self.positional + self.keyword_only)
+        self._expected = {}
+        self.converters = self._converters()
+        self.call = self._compile()
+
+    def __call__(self, params):
+        """Call the view function with the values found in ``params``.
+
+        Arguments:
+            params {dict} -- The ``parameters`` object of the DialogFlow request
+
+        Returns:
+            The value returned by the view function
+        """
+        return self.call(params)
+
+    def _converters(self):
+        """Map the annotated arguments to their converter."""
+        annotations = getattr(self.func, '__annotations__', None)
+        if not annotations or not self._bound_names.intersection(annotations):
+            return {}
+        # imported here, view functions without annotations don't pay for it
+        import typing
+        from .coercion import converter, describe
+        try:
+            annotations = typing.get_type_hints(self.func)
+        except Exception:  # unresolvable forward references, keep the raw annotations
+            pass
+        converters = {}
+        for name in self._bound_names:
+            if name in annotations:
+                convert = converter(annotations[name])
+                if convert is not None:
+                    converters[name] = convert
+                    self._expected[name] = describe(annotations[name])
+        return converters
+
+    def _compile(self):
+        """Choose the cheapest calling strategy for the shape of the signature."""
+        func = self.func
+        positional = tuple(self.positional)
+        keyword_only = tuple(self.keyword_only)
+        var_keyword = self.var_keyword
+        bound_names = self._bound_names
+
+        if not positional and not keyword_only and not var_keyword:
+            return lambda params: func()
+
+        if self.converters:
+            return self._compile_coercing()
+
+        if not keyword_only and not var_keyword:
+            def call(params):
+                get = params.get
+                return func(*[get(name, default) for name, default in positional])
+            return call
+
+        def call(params):
+            get = params.get
+            kwargs = {name: get(name, default) for name, default in keyword_only}
+            if var_keyword:
+                for name, value in params.items():
+                    if name not in bound_names:
+                        kwargs[name] = value
+            return func(*[get(name, default) for name, default in positional], **kwargs)
+        return call
+
+    def _compile_coercing(self):
+        """Calling strategy converting the annotated arguments.
+
+        The body of the call is generated and compiled once, like ``dataclasses`` does for
+        ``__init__``: one straight-line statement per argument, without loop or per-argument
+        function call on top of the converters themselves.
+        """
+        from .coercion import CONVERSION_ERRORS
+        from .errors import ParameterError
+
+        namespace = {'func': self.func, 'bound_names': self._bound_names,
+                     'CONVERSION_ERRORS': CONVERSION_ERRORS, 'ParameterError': ParameterError}
+        lines = ['def call(params):', '    get = params.get']
+        args = []
+        for i, (name, default) in enumerate(self.positional + self.keyword_only):
+            namespace['d{}'.format(i)] = default
+            convert = self.converters.get(name)
+            if convert is None:
+                lines.append('    a{i} = get({name!r}, d{i})'.format(i=i, name=name))
+            else:
+                namespace['c{}'.format(i)] = convert
+                namespace['e{}'.format(i)] = self._expected[name]
+                lines.extend(line.format(i=i, name=name) for line in (
+                    '    v = get({name!r})',
+                    '    if v is None or v == "":',
+                    '        a{i} = d{i}',
+                    '    else:',
+                    '        try:',
+                    '            a{i} = c{i}(v)',
+                    '        except CONVERSION_ERRORS:',
+                    '            raise ParameterError({name!r}, v, e{i}) from None'))
+            args.append('a{}'.format(i) if i < len(self.positional) else '{}=a{}'.format(name, i))
+        if self.var_keyword:
+            lines.append('    extra = {k: v for k, v in params.items() if k not in bound_names}')
+            args.append('**extra')
+        lines.append('    return func({})'.format(', '.join(args)))
+        exec('\n'.join(lines), namespace)
+        return namespace['call']
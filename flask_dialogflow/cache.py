@@ -0,0 +1,127 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+def _freeze(value):
+    """Turn a JSON value into a hashable one, dicts are normalized so key order doesn't matter."""
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+class TTLCache:
+    """Cache of serialized responses for the actions that are pure functions of their parameters.
+
+    Entries expire ``ttl`` seconds after being stored, and the least recently used entry is
+    evicted when the cache holds ``maxsize`` entries. The cache is thread safe.
+
+    Keyword Arguments:
+        maxsize {int} -- Maximum number of responses kept (default: {1024})
+        ttl {float} -- Time to live of a response, in seconds (default: {60})
+        by_lang {bool} -- Include the language of the request in the key (default: {False})
+        by_contexts {bool} -- Include the input contexts (names and parameters) in the key (default: {False})
+        timer {function} -- Clock used for expiration (default: {time.monotonic})
+
+    Example:
+        >>> @dialogflow.action('store.locate', cache=TTLCache(maxsize=500, ttl=3600))
+        >>> def locate(city):
+        >>>     ...
+    """
+
+    def __init__(self, maxsize=1024, ttl=60, by_lang=False, by_contexts=False,
+                 timer=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.by_lang = by_lang
+        self.by_contexts = by_contexts
+        self.timer = timer
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._data)
+
+    def key(self, action, data_json):
+        """Build the cache key of a request.
+
+        Arguments:
+            action {str} -- The action of the request
+            data_json {dict} -- The request sent by Google DialogFlow
+
+        Returns:
+            [tuple] -- A hashable key
+        """
+        result = data_json.get('result')
+        if result is not None:
+            key = (action, _freeze(result.get('parameters', {})))
+            if self.by_lang:
+                key += (data_json.get('lang'),)
+            contexts = result.get('contexts', []) if self.by_contexts else ()
+        else:
+            # v2 request, its response has another format
+            result = data_json['queryResult']
+            key = (action, _freeze(result.get('parameters', {})), 2)
+            if self.by_lang:
+                key += (result.get('languageCode'),)
+            contexts = result.get('outputContexts', []) if self.by_contexts else ()
+        if self.by_contexts:
+            # v2 context names are qualified with the session, only their last segment counts
+            key += (tuple(sorted(
+                (context['name'].rpartition('/')[2], _freeze(context.get('parameters', {})))
+                for context in contexts)),)
+        return key
+
+    def get(self, key):
+        """Return the cached value of ``key``, or None if it is missing or expired."""
+        with self._lock:
+            try:
+                expires, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return None
+            if expires <= self.timer():
+                del self._data[key]
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Store ``value`` under ``key``, evicting the least recently used entries if needed."""
+        with self._lock:
+            self._data[key] = (self.timer() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, action=None, parameters=None):
+        """Remove entries from the cache.
+
+        Keyword Arguments:
+            action {str} -- Only remove the entries of this action (default: {None})
+            parameters {dict} -- Only remove the entries with exactly these parameters (default: {None})
+
+        Returns:
+            [int] -- The number of removed entries
+        """
+        frozen = _freeze(parameters) if parameters is not None else None
+        with self._lock:
+            keys = [key for key in self._data
+                    if (action is None or key[0] == action) and
+                    (frozen is None or key[1] == frozen)]
+            for key in keys:
+                del self._data[key]
+        return len(keys)
+
+    def clear(self):
+        """Remove all the entries of the cache."""
+        with self._lock:
+            self._data.clear()
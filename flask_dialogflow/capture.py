@@ -0,0 +1,230 @@
+import atexit
+import gzip
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+REDACTED = '[REDACTED]'
+
+
+def _redact_path(value, path):
+    """Replace the value at the dotted ``path`` in ``value``, lists are traversed item by item."""
+    if isinstance(value, list):
+        return [_redact_path(item, path) for item in value]
+    if not isinstance(value, dict):
+        return value
+    head, _, rest = path.partition('.')
+    if head not in value:
+        return value
+    value = dict(value)
+    value[head] = _redact_path(value[head], rest) if rest else REDACTED
+    return value
+
+
+def _redact_parameters(parameters, names):
+    if not isinstance(parameters, dict) or not names.intersection(parameters):
+        return parameters
+    return {name: REDACTED if name in names else item for name, item in parameters.items()}
+
+
+def _redact_contexts(contexts, names):
+    return [dict(context, parameters=_redact_parameters(context.get('parameters'), names))
+            if isinstance(context, dict) and 'parameters' in context else context
+            for context in contexts]
+
+
+class TrafficCapture:
+    """Sampled capture of the webhook traffic, for replay with ``python -m flask_dialogflow.loadtest``.
+
+    A fraction of the requests and their responses are written to gzip compressed JSONL
+    files, one ``{"time", "action", "request", "response"}`` object per line. The request
+    thread only draws the sample and enqueues the request without blocking: redaction,
+    serialization, compression and writes happen on a background thread, in batches. When the queue is
+    full the sample is dropped (and counted in ``dropped``).
+
+    Files are named ``capture-<timestamp>-<sequence>.jsonl.gz`` and rotated when they
+    reach ``max_bytes``, only the ``backup_count`` most recent ones are kept. Every batch is
+    written as a complete gzip member, so a file is readable even if the process dies.
+
+    Keyword Arguments:
+        directory {str} -- Directory of the capture files, created if missing
+        rate {float} -- Fraction of the requests captured, between 0 and 1 (default: {0.01})
+        redact_parameters {list[str]} -- Parameters replaced by ``[REDACTED]`` in the request, its contexts and the output context (default: {()})
+        redact_original_request {list[str]} -- Dotted paths in ``originalRequest`` (``originalDetectIntentRequest`` in v2) replaced by ``[REDACTED]``, e.g. ``data.sender.id`` (default: {()})
+        max_bytes {int} -- Size at which the file is rotated (default: {64 MB})
+        backup_count {int} -- Number of files kept (default: {10})
+        queue_size {int} -- Maximum number of samples waiting for the writer (default: {10000})
+        flush_interval {float} -- Time the writer waits to batch samples, in seconds (default: {1.0})
+
+    Example:
+        >>> capture = TrafficCapture('/var/log/agent', rate=0.01, redact_parameters=['email'])
+        >>> dialogflow = DialogFlow(app, '/webhook', capture=capture)
+    """
+
+    def __init__(self, directory, rate=0.01, redact_parameters=(), redact_original_request=(),
+                 max_bytes=64 * 1024 * 1024, backup_count=10, queue_size=10000, flush_interval=1.0):
+        self.directory = directory
+        self.rate = rate
+        self.redact_parameters = frozenset(redact_parameters)
+        self.redact_original_request = tuple(redact_original_request)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.flush_interval = flush_interval
+        self.sampled = 0
+        self.dropped = 0
+        self.written = 0
+        # batches lost to I/O or serialization errors
+        self.write_errors = 0
+        self._random = random.random
+        self._queue = queue.Queue(queue_size)
+        self._file = None
+        self._sequence = 0
+        self._thread = None
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def sample(self):
+        """Draw whether the current request is captured."""
+        return self._random() < self.rate
+
+    def offer(self, request, response):
+        """Enqueue a sampled request and its response, without blocking.
+
+        Arguments:
+            request {dict} -- The request sent by Google DialogFlow
+            response {bytes} -- The JSON body of the response, None if there was none
+        """
+        self.sampled += 1
+        if self._thread is None:
+            self._start()
+        try:
+            self._queue.put_nowait((time.time(), request, response))
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        """Block until the enqueued samples are written."""
+        self._queue.join()
+
+    def close(self):
+        """Write the enqueued samples, stop the writer thread and close the file."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            thread = self._thread
+        if thread is not None:
+            self._queue.put(None)
+            thread.join()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None and not self._closed:
+                os.makedirs(self.directory, exist_ok=True)
+                self._thread = threading.Thread(
+                    target=self._run, name='flask-dialogflow-capture', daemon=True)
+                self._thread.start()
+                atexit.register(self.close)
+
+    def _run(self):
+        while True:
+            items = [self._queue.get()]
+            # batch what arrives within flush_interval, one gzip member per batch
+            deadline = time.monotonic() + self.flush_interval
+            while len(items) < 1000 and items[-1] is not None:
+                timeout = deadline - time.monotonic()
+                try:
+                    items.append(self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = None in items
+            try:
+                lines = [self._line(*item) for item in items if item is not None]
+                if lines:
+                    self._write(gzip.compress(''.join(lines).encode('utf-8')))
+                    self.written += len(lines)
+            except (OSError, TypeError, ValueError):
+                self.write_errors += 1
+            for _ in items:
+                self._queue.task_done()
+            if stop:
+                return
+
+    def _line(self, timestamp, request, response):
+        request = self.redact(request)
+        if response is not None:
+            try:
+                response = self._redact_response(json.loads(response))
+            except ValueError:
+                response = response.decode('utf-8', 'replace')
+        result = None
+        if isinstance(request, dict):
+            result = request.get('result', request.get('queryResult'))
+        return json.dumps({
+            'time': timestamp,
+            'action': result.get('action') if isinstance(result, dict) else None,
+            'request': request,
+            'response': response,
+        }, separators=(',', ':')) + '\n'
+
+    def redact(self, request):
+        """Return a copy of ``request`` with the configured fields replaced by ``[REDACTED]``."""
+        if not isinstance(request, dict):
+            return request
+        names = self.redact_parameters
+        # v1 and v2 names of the query result, its contexts and the original request
+        if 'queryResult' in request:
+            result_key, contexts_key = 'queryResult', 'outputContexts'
+            original_key = 'originalDetectIntentRequest'
+        else:
+            result_key, contexts_key, original_key = 'result', 'contexts', 'originalRequest'
+        result = request.get(result_key)
+        if names and isinstance(result, dict):
+            result = dict(result)
+            result['parameters'] = _redact_parameters(result.get('parameters'), names)
+            if isinstance(result.get(contexts_key), list):
+                result[contexts_key] = _redact_contexts(result[contexts_key], names)
+            request = dict(request, **{result_key: result})
+        if self.redact_original_request and original_key in request:
+            original = request[original_key]
+            for path in self.redact_original_request:
+                original = _redact_path(original, path)
+            request = dict(request, **{original_key: original})
+        return request
+
+    def _redact_response(self, response):
+        names = self.redact_parameters
+        if not names or not isinstance(response, dict):
+            return response
+        key = 'outputContexts' if 'outputContexts' in response else 'contextOut'
+        context_out = response.get(key)
+        if not context_out:
+            return response
+        contexts = _redact_contexts(context_out if isinstance(context_out, list) else [context_out], names)
+        return dict(response, **{key: contexts if isinstance(context_out, list) else contexts[0]})
+
+    def _write(self, data):
+        if self._file is None or self._file.tell() >= self.max_bytes:
+            self._rotate()
+        self._file.write(data)
+        self._file.flush()
+
+    def _rotate(self):
+        if self._file is not None:
+            self._file.close()
+        self._sequence += 1
+        name = 'capture-{}-{:04d}.jsonl.gz'.format(time.strftime('%Y%m%d-%H%M%S'), self._sequence)
+        self._file = open(os.path.join(self.directory, name), 'ab')
+        files = sorted(name for name in os.listdir(self.directory)
+                       if name.startswith('capture-') and name.endswith('.jsonl.gz'))
+        for old in files[:-self.backup_count] if self.backup_count > 0 else []:
+            try:
+                os.remove(os.path.join(self.directory, old))
+            except OSError:
+                pass
@@ -0,0 +1,481 @@
+"""Pooled HTTP client for the view functions calling other services.
+
+Opening a TCP (and TLS) connection for every call often costs more than the call itself.
+:class:`HTTPClient` keeps the connections alive in a bounded pool per service, derives the
+timeout of each call from the time left to answer DialogFlow, stops calling a failing service
+for a while (see :class:`CircuitBreaker`) and can hedge slow idempotent calls.
+
+It is built on :mod:`http.client`, no dependency is needed. :attr:`Dispatcher.client` creates
+one on first use, shared by the threads of the process.
+"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urljoin, urlsplit
+
+from .errors import CircuitOpen, DeadlineExceeded
+from .helpers import json_dumps
+
+_IDEMPOTENT = frozenset(('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'))
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+# raised when the server closed a kept-alive connection while it was idle in the pool,
+# http.client.RemoteDisconnected is a ConnectionResetError
+_STALE = (ConnectionResetError, BrokenPipeError)
+_HEDGE_WORKERS = 32
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for a while, so requests fail fast instead of waiting for timeouts.
+
+    After ``failure_threshold`` consecutive failures the circuit opens: calls are refused for
+    ``reset_timeout`` seconds. It is then half-open: one trial call is let through, its success
+    closes the circuit and its failure opens it again.
+
+    Keyword Arguments:
+        failure_threshold {int} -- Consecutive failures opening the circuit (default: {5})
+        reset_timeout {float} -- Seconds the circuit stays open before a trial call (default: {30.0})
+        timer {function} -- Clock, in seconds (default: {time.monotonic})
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0, timer=time.monotonic):
+        if failure_threshold < 1:
+            raise ValueError('failure_threshold must be at least 1')
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened = 0
+        self.rejected = 0
+        self._timer = timer
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        """``'closed'``, ``'open'`` or ``'half_open'``."""
+        if self._state == self.OPEN and self.retry_after() == 0:
+            return self.HALF_OPEN
+        return self._state
+
+    def retry_after(self):
+        """Seconds before the open circuit lets a trial call through, 0 if it isn't open."""
+        if self._state != self.OPEN:
+            return 0
+        return max(0, self._opened_at + self.reset_timeout - self._timer())
+
+    def allow(self):
+        """Tell whether a call may be made, to be followed by :meth:`success` or :meth:`failure`.
+
+        Returns:
+            [bool] -- False if the circuit is open, or half-open with the trial call in flight
+        """
+        if self._state == self.CLOSED:
+            return True
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._timer() - self._opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    return False
+                self._state = self.HALF_OPEN
+                self._trial = False
+            elif self._state == self.CLOSED:
+                return True
+            if self._trial:
+                self.rejected += 1
+                return False
+            self._trial = True
+            return True
+
+    def success(self):
+        """Record a successful call, closing the circuit."""
+        if self._state == self.CLOSED and not self.failures:
+            return
+        with self._lock:
+            self.failures = 0
+            self._state = self.CLOSED
+            self._trial = False
+
+    def failure(self):
+        """Record a failed call, opening the circuit after too many of them."""
+        with self._lock:
+            self.failures += 1
+            if self._state == self.HALF_OPEN or (
+                    self._state == self.CLOSED and self.failures >= self.failure_threshold):
+                self._state = self.OPEN
+                self._opened_at = self._timer()
+                self._trial = False
+                self.opened += 1
+
+
+class ClientResponse:
+    """Response of an outbound call, read in full so its connection goes back to the pool.
+
+    Arguments:
+        status {int} -- The HTTP status code
+        reason {str} -- The reason phrase
+        headers {http.client.HTTPMessage} -- The headers, looked up case-insensitively
+        body {bytes} -- The body
+    """
+    __slots__ = ('status', 'reason', 'headers', 'body')
+
+    def __init__(self, status, reason, headers, body):
+        self.status = status
+        self.reason = reason
+        self.headers = headers
+        self.body = body
+
+    @property
+    def ok(self):
+        """Whether the status is below 400."""
+        return self.status < 400
+
+    def json(self):
+        """Parse the body as JSON."""
+        return json.loads(self.body)
+
+    def __repr__(self):
+        return '<ClientResponse {} {}>'.format(self.status, self.reason)
+
+
+class _Pool:
+    __slots__ = ('idle', 'size', 'condition')
+
+    def __init__(self):
+        # (connection, time it was released), the most recently used last
+        self.idle = []
+        self.size = 0
+        self.condition = threading.Condition(threading.Lock())
+
+
+class HTTPClient:
+    """HTTP client keeping alive a bounded pool of connections per service.
+
+    Connections are reused most-recently-used first and closed after ``idle_timeout`` seconds
+    unused. At most ``max_connections`` are open to each service, callers wait for a free one
+    within their timeout. A call on a kept-alive connection that the server had closed is
+    retried once on a new connection, for idempotent methods.
+
+    The timeout of a call is the smallest of the ``timeout`` given, the default one and the time
+    left to answer the current webhook request (see :meth:`Dispatcher.time_left`), minus
+    ``reserve`` to build the response. When no time is left, :class:`DeadlineExceeded` is
+    raised without calling the service. Like :mod:`socket` timeouts, it applies to the connection
+    and to each read, not to the whole call.
+
+    Each service has a :class:`CircuitBreaker`: exceptions and 5xx responses are failures, calls
+    made while its circuit is open raise :class:`CircuitOpen`.
+
+    With ``hedge_after``, an idempotent call still running after that many seconds is sent a
+    second time on another connection, the first response wins. It trims the tail latency of
+    services with occasional slow responses, for up to twice the load on them.
+
+    Keyword Arguments:
+        base_url {str} -- URL the relative URLs are resolved against, see :func:`urllib.parse.urljoin` (default: {None})
+        max_connections {int} -- Maximum number of connections to each service (default: {10})
+        timeout {float} -- Default timeout of the calls in seconds, None for no timeout but the deadline (default: {10.0})
+        idle_timeout {float} -- Seconds after which an unused connection is closed (default: {15.0})
+        reserve {float} -- Seconds of the time left to answer the webhook request kept for the response (default: {0.1})
+        headers {dict} -- Headers sent with every call (default: {None})
+        failure_threshold {int} -- Consecutive failures opening the circuit of a service, None to disable the circuit breakers (default: {5})
+        reset_timeout {float} -- Seconds the circuit of a service stays open (default: {30.0})
+        hedge_after {float} -- Seconds after which idempotent calls are hedged, None to disable (default: {None})
+        ssl_context {ssl.SSLContext} -- Context of the HTTPS connections (default: {None})
+        timer {function} -- Clock, in seconds (default: {time.monotonic})
+
+    Example:
+        >>> @dialogflow.action('order.status')
+        >>> def status(order_id):
+        >>>     order = dialogflow.client.get('https://orders.internal/orders/' + order_id).json()
+        >>>     ...
+    """
+
+    def __init__(self, base_url=None, max_connections=10, timeout=10.0, idle_timeout=15.0,
+                 reserve=0.1, headers=None, failure_threshold=5, reset_timeout=30.0,
+                 hedge_after=None, ssl_context=None, timer=time.monotonic):
+        if max_connections < 1:
+            raise ValueError('max_connections must be at least 1')
+        self.base_url = base_url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.reserve = reserve
+        self.headers = dict(headers or ())
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.hedge_after = hedge_after
+        self.ssl_context = ssl_context
+        self.breakers = {}
+        self.opened = 0
+        self.reused = 0
+        self.hedged = 0
+        self.hedges_won = 0
+        self._timer = timer
+        self._budgets = ()
+        self._pools = {}
+        self._hedge_executor = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    def bind(self, budget):
+        """Bound the timeouts of the calls by the time left to answer the current request.
+
+        :class:`Dispatcher` binds its :meth:`Dispatcher.time_left`. A client shared by several
+        dispatchers is bound to each of them, the first one serving a request gives the budget.
+
+        Arguments:
+            budget {function} -- Returns the seconds left, or None outside of a request
+        """
+        with self._lock:
+            self._budgets += (budget,)
+
+    def time_left(self):
+        """Seconds left to the current request, minus ``reserve``, None outside of a request."""
+        for budget in self._budgets:
+            left = budget()
+            if left is not None:
+                return left - self.reserve
+        return None
+
+    def breaker(self, url):
+        """Return the :class:`CircuitBreaker` of the service of ``url``, None if they are disabled."""
+        return self._breaker(self._origin(url)[0])
+
+    def get(self, url, **kwargs):
+        """Send a GET request, see :meth:`request`."""
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, body=None, **kwargs):
+        """Send a POST request, see :meth:`request`."""
+        return self.request('POST', url, body, **kwargs)
+
+    def request(self, method, url, body=None, json=None, headers=None, timeout=None, hedge_after=None):
+        """Send a request on a pooled connection and read its response.
+
+        Arguments:
+            method {str} -- The HTTP method
+            url {str} -- The URL, relative to ``base_url`` if one is given
+
+        Keyword Arguments:
+            body {bytes|str} -- The body (default: {None})
+            json -- Sent as the JSON body, instead of ``body`` (default: {None})
+            headers {dict} -- Headers added to the default ones (default: {None})
+            timeout {float} -- Timeout in seconds, still bounded by the time left to the webhook request (default: {None})
+            hedge_after {float} -- Seconds after which the call is hedged, overrides the default one (default: {None})
+
+        Returns:
+            [ClientResponse] -- The response, whatever its status
+
+        Raises:
+            DeadlineExceeded -- When no time is left to the webhook request
+            CircuitOpen -- When the circuit breaker of the service is open
+            OSError -- When the connection fails or times out
+            http.client.HTTPException -- When the response is malformed
+        """
+        method = method.upper()
+        key, host, path = self._origin(url)
+        request_headers = self.headers
+        if json is not None:
+            body = json_dumps(json)
+            request_headers = dict(request_headers, **{'Content-Type': 'application/json'})
+        if headers:
+            request_headers = dict(request_headers, **headers)
+        timeout = self._timeout(timeout)
+        if hedge_after is None:
+            hedge_after = self.hedge_after if method in _IDEMPOTENT else None
+        elif method not in _IDEMPOTENT:
+            raise ValueError('Only idempotent requests can be hedged, not {}'.format(method))
+
+        breaker = self._breaker(key)
+        if breaker is not None and not breaker.allow():
+            raise CircuitOpen(key, breaker.retry_after())
+        try:
+            if hedge_after is not None and (timeout is None or hedge_after < timeout):
+                response = self._hedged(hedge_after, key, host, method, path, body, request_headers, timeout)
+            else:
+                response = self._send(key, host, method, path, body, request_headers, timeout)
+        except BaseException:
+            if breaker is not None:
+                breaker.failure()
+            raise
+        if breaker is not None:
+            if response.status >= 500:
+                breaker.failure()
+            else:
+                breaker.success()
+        return response
+
+    async def request_async(self, method, url, **kwargs):
+        """Send a request from a coroutine, on the default executor of the event loop, see :meth:`request`."""
+        import asyncio
+        import contextvars
+        import functools
+        # copy_context() carries the request state over, and the time left with it
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, contextvars.copy_context().run, functools.partial(
+            self.request, method, url, **kwargs))
+
+    def close(self):
+        """Close the idle connections, the others are closed when their call completes."""
+        with self._lock:
+            self._closed = True
+            pools = list(self._pools.values())
+            executor, self._hedge_executor = self._hedge_executor, None
+        for pool in pools:
+            with pool.condition:
+                idle, pool.idle = pool.idle, []
+                pool.size -= len(idle)
+                pool.condition.notify_all()
+            for connection, _ in idle:
+                connection.close()
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def _origin(self, url):
+        """Split a URL into the key of its service, ``(scheme, host, port)`` and the request target."""
+        if self.base_url is not None:
+            url = urljoin(self.base_url, url)
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in _DEFAULT_PORTS:
+            raise ValueError('Unsupported URL {!r}, expected an http or https URL'.format(url))
+        port = parts.port or _DEFAULT_PORTS[scheme]
+        path = parts.path or '/'
+        if parts.query:
+            path += '?' + parts.query
+        host = (scheme, parts.hostname, port)
+        return '{}://{}:{}'.format(*host), host, path
+
+    def _breaker(self, key):
+        if self.failure_threshold is None:
+            return None
+        breaker = self.breakers.get(key)
+        if breaker is None:
+            with self._lock:
+                breaker = self.breakers.get(key)
+                if breaker is None:
+                    breaker = self.breakers[key] = CircuitBreaker(
+                        self.failure_threshold, self.reset_timeout, self._timer)
+        return breaker
+
+    def _timeout(self, timeout):
+        if timeout is None:
+            timeout = self.timeout
+        left = self.time_left()
+        if left is None:
+            return timeout
+        if left <= 0:
+            raise DeadlineExceeded('No time left to call the service')
+        return left if timeout is None or left < timeout else timeout
+
+    def _acquire(self, key, host, timeout, fresh=False):
+        """Take an idle connection to a service or open one, waiting for a free slot within the timeout.
+
+        Returns:
+            [tuple(http.client.HTTPConnection, bool)] -- The connection and whether it was used before
+        """
+        if self._closed:
+            raise RuntimeError('The client is closed')
+        pool = self._pools.get(key)
+        if pool is None:
+            with self._lock:
+                pool = self._pools.setdefault(key, _Pool())
+        stale = []
+        with pool.condition:
+            expires = None
+            while not pool.idle and pool.size >= self.max_connections:
+                now = self._timer()
+                if expires is None and timeout is not None:
+                    expires = now + timeout
+                if expires is not None and now >= expires:
+                    raise DeadlineExceeded('No connection to {} freed up in time'.format(key))
+                pool.condition.wait(None if expires is None else expires - now)
+            connection = None
+            now = self._timer()
+            while pool.idle:
+                candidate, released = pool.idle.pop()
+                if fresh or now - released >= self.idle_timeout:
+                    stale.append(candidate)
+                    pool.size -= 1
+                else:
+                    connection = candidate
+                    self.reused += 1
+                    break
+            if connection is None:
+                pool.size += 1
+                self.opened += 1
+        for candidate in stale:
+            candidate.close()
+        if connection is not None:
+            return connection, True
+        scheme, hostname, port = host
+        if scheme == 'https':
+            return http.client.HTTPSConnection(hostname, port, timeout=timeout, context=self.ssl_context), False
+        return http.client.HTTPConnection(hostname, port, timeout=timeout), False
+
+    def _release(self, key, connection, reusable):
+        pool = self._pools[key]
+        with pool.condition:
+            if reusable and not self._closed:
+                pool.idle.append((connection, self._timer()))
+            else:
+                pool.size -= 1
+                reusable = False
+            pool.condition.notify()
+        if not reusable:
+            connection.close()
+
+    def _send(self, key, host, method, path, body, headers, timeout):
+        """Send a request on a pooled connection, retrying once on a new one if it was stale."""
+        fresh = False
+        while True:
+            connection, reused = self._acquire(key, host, timeout, fresh)
+            try:
+                connection.timeout = timeout
+                if connection.sock is not None:
+                    connection.sock.settimeout(timeout)
+                connection.request(method, path, body, headers)
+                response = connection.getresponse()
+                data = response.read()
+            except _STALE:
+                self._release(key, connection, False)
+                if not reused or method not in _IDEMPOTENT:
+                    raise
+                fresh = True
+                continue
+            except BaseException:
+                self._release(key, connection, False)
+                raise
+            self._release(key, connection, not response.will_close)
+            return ClientResponse(response.status, response.reason, response.headers, data)
+
+    def _hedged(self, delay, key, host, method, path, body, headers, timeout):
+        """Send a request, and again if it is still running after ``delay`` seconds, returning the first response."""
+        from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+        with self._lock:
+            if self._hedge_executor is None:
+                self._hedge_executor = ThreadPoolExecutor(
+                    max_workers=_HEDGE_WORKERS, thread_name_prefix='flask-dialogflow-hedge')
+            executor = self._hedge_executor
+        first = executor.submit(self._send, key, host, method, path, body, headers, timeout)
+        done, _ = wait((first,), delay)
+        if done:
+            return first.result()
+        with self._lock:
+            self.hedged += 1
+        second = executor.submit(self._send, key, host, method, path, body, headers, timeout)
+        pending = (first, second)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                error = future.exception()
+                if error is None:
+                    if future is second:
+                        with self._lock:
+                            self.hedges_won += 1
+                    return future.result()
+        raise error
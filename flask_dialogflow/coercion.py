@@ -0,0 +1,170 @@
+"""Conversion of DialogFlow parameters to the types annotated on view functions.
+
+DialogFlow sends parameters as strings (or lists of strings), a view function annotated with
+``def square(number: int)`` receives an ``int``. The converters are chosen once, when the view
+function is registered (see :class:`flask_dialogflow.binding.Binding`), requests only pay for
+the conversion itself.
+
+Supported annotations: ``int``, ``float``, ``decimal.Decimal``, ``bool``, ``datetime.date``,
+``datetime.time``, ``datetime.datetime``, :class:`enum.Enum` subclasses (by value, then by
+name), ``list[X]`` / ``typing.List[X]`` and ``Optional[X]`` of those, types registered with
+:func:`register_converter`, and plain functions used as annotations. Other annotations (``str``
+included) leave the value untouched.
+"""
+import datetime
+import decimal
+import enum
+import typing
+
+_CONVERTERS = {}
+
+# errors raised by converters on bad input, turned into a ParameterError by the binding
+CONVERSION_ERRORS = (ValueError, TypeError, ArithmeticError, KeyError)
+
+
+def register_converter(type_, func):
+    """Convert the parameters annotated with ``type_`` with ``func``.
+
+    ``func`` receives the raw value and raises ValueError or TypeError on bad input.
+
+    Example:
+        >>> register_converter(Money, Money.parse)
+        >>>
+        >>> @dialogflow.action('transfer')
+        >>> def transfer(amount: Money):
+        >>>     ...
+    """
+    _CONVERTERS[type_] = func
+
+
+def _int(value):
+    if value.__class__ is str:
+        try:
+            return int(value)
+        except ValueError:
+            value = float(value)
+    if value.__class__ is int:
+        return value
+    if value.__class__ is float and value.is_integer():
+        return int(value)
+    raise ValueError(value)
+
+
+def _float(value):
+    if value.__class__ is bool:
+        raise TypeError(value)
+    return float(value)
+
+
+def _decimal(value):
+    if value.__class__ is bool:
+        raise TypeError(value)
+    return decimal.Decimal(value if value.__class__ is not float else repr(value))
+
+
+_TRUE = frozenset(('true', 'yes', 'on', '1'))
+_FALSE = frozenset(('false', 'no', 'off', '0'))
+
+
+def _bool(value):
+    if value.__class__ is bool:
+        return value
+    value = str(value).lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    raise ValueError(value)
+
+
+def _isoformat(value):
+    # fromisoformat doesn't accept the Z suffix before Python 3.11
+    return value[:-1] + '+00:00' if value.endswith('Z') else value
+
+
+def _date(value):
+    if value.__class__ is str:
+        if 'T' in value:
+            return datetime.datetime.fromisoformat(_isoformat(value)).date()
+        return datetime.date.fromisoformat(value)
+    if isinstance(value, datetime.datetime):
+        return value.date()
+    if isinstance(value, datetime.date):
+        return value
+    raise TypeError(value)
+
+
+def _datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(_isoformat(value))
+
+
+def _time(value):
+    if isinstance(value, datetime.time):
+        return value
+    return datetime.time.fromisoformat(_isoformat(value))
+
+
+_BUILTIN = {
+    int: _int,
+    float: _float,
+    decimal.Decimal: _decimal,
+    bool: _bool,
+    datetime.date: _date,
+    datetime.datetime: _datetime,
+    datetime.time: _time,
+}
+
+
+def _enum(cls):
+    def convert(value):
+        try:
+            return cls(value)
+        except ValueError:
+            return cls[value]
+    return convert
+
+
+def _list(item):
+    if item is None:
+        return lambda value: list(value) if isinstance(value, list) else [value]
+
+    def convert(value):
+        if not isinstance(value, list):
+            return [item(value)]
+        return [item(element) for element in value]
+    return convert
+
+
+def converter(annotation):
+    """Return the function converting raw values to ``annotation``, or None to leave them untouched.
+
+    Converters raise one of ``CONVERSION_ERRORS`` on bad input.
+    """
+    func = _CONVERTERS.get(annotation) or _BUILTIN.get(annotation)
+    if func is not None:
+        return func
+    if isinstance(annotation, type):
+        if issubclass(annotation, enum.Enum):
+            return _enum(annotation)
+        if annotation is list:
+            return _list(None)
+        return None
+
+    origin = getattr(annotation, '__origin__', None)
+    args = [arg for arg in getattr(annotation, '__args__', ()) if arg is not type(None)]
+    if origin is list:
+        return _list(converter(args[0]) if args else None)
+    if origin is typing.Union:
+        return converter(args[0]) if len(args) == 1 else None
+    if callable(annotation) and origin is None and getattr(annotation, '__module__', None) != 'typing':
+        return annotation
+    return None
+
+
+def describe(annotation):
+    """Name of ``annotation`` as shown in error messages."""
+    if isinstance(annotation, type):
+        return annotation.__name__
+    return getattr(annotation, '__name__', None) or str(annotation).replace('typing.', '')
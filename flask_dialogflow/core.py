@@ -0,0 +1,967 @@
+"""Framework agnostic core of Flask-DialogFlow.
+
+This module doesn't import Flask: serverless functions (Cloud Functions, Lambda...) can
+register their actions on a :class:`Dispatcher` and call :meth:`Dispatcher.dispatch` with
+the body of the request, without paying for the Flask import and routing.
+"""
+import contextvars
+from contextvars import ContextVar
+import json
+import time
+from collections import Counter
+
+from .binding import Binding
+from .errors import BadRequest, PayloadTooLarge
+from .response import Response
+from .routing import Router, is_pattern
+from .state import RequestState, get_state
+from .validation import validate_webhook
+from .formats import V1, V2, version_of
+
+#: Metrics label of the requests that aren't routed to a registered action or pattern.
+UNKNOWN_ACTION = 'unknown'
+
+# Sent when a deadline is missed and there is nothing else to answer with: DialogFlow then
+# uses the responses defined in the intent.
+_EMPTY_RESPONSE = Response().freeze()
+
+def _action_of(data_json):
+    try:
+        result = data_json.get('result')
+        if result is None:
+            result = data_json['queryResult']
+        return result.get('action')
+    except (AttributeError, KeyError, TypeError):
+        return None
+
+def _session_of(data_json):
+    try:
+        session_id = data_json.get('sessionId')
+        return session_id if session_id is not None else data_json.get('session')
+    except AttributeError:
+        return None
+
+def _render_static(response, data_json):
+    """Render a frozen response in the format of the request, before it is prepared."""
+    if version_of(data_json) == V1:
+        return response.body
+    return response.render(None, V2, data_json.get('session'))
+
+def _cacheable(state, body):
+    # v2 output context names embed the session, such responses can't be shared
+    return state.version == V1 or b'"outputContexts"' not in body
+
+def _parse(payload):
+    if isinstance(payload, dict):
+        return payload
+    try:
+        return json.loads(payload)
+    except ValueError:
+        raise BadRequest('The request body is not valid JSON') from None
+
+class Dispatcher:
+    """Registry of the actions of an agent and dispatcher of the webhook requests.
+
+    :class:`DialogFlow` adds the Flask integration on top of it. Used on its own, it has
+    raw WSGI and ASGI adapters (:meth:`wsgi_app`, :meth:`asgi_app`), or requests can be
+    dispatched directly:
+
+    >>> dispatcher = Dispatcher()
+    >>>
+    >>> @dispatcher.action('hello')
+    >>> def hello():
+    >>>     ...
+    >>>
+    >>> def handler(event, context):   # e.g. an AWS Lambda function
+    >>>     return {'statusCode': 200, 'body': dispatcher.dispatch(event['body']).decode('utf-8')}
+
+    One process can serve several agents, with one dispatcher each: actions, auth, metrics and
+    request state (:attr:`context_out`...) are per dispatcher, while the thread pool, task
+    queues, caches, idempotency and session stores can be shared by passing the same objects.
+    Give each agent a ``name``: it keeps their entries apart in shared caches and session stores.
+    :meth:`shutdown` releases the shared objects too, call it when the process stops.
+
+    Requests of the v1 (``result``) and v2 (``queryResult``) webhook formats are both accepted,
+    responses are sent in the format of the request, see :mod:`flask_dialogflow.formats`.
+
+    Keyword Arguments:
+        route {str} -- Route at which DialogFlow is going to listen (default: {None})
+        basic_auth_user {str} -- Username to use for basic auth. Basic auth is enabled if this is set (default: {None})
+        basic_auth_pass {str} -- Password to use for basic auth. (default: {None})
+        auth {Authenticator} -- Checks the ``Authorization`` header, e.g. rotated credentials or bearer tokens, instead of basic_auth_user (default: {None})
+        deadline {float} -- Time budget of view functions in seconds, see :meth:`action` (default: {None})
+        fallback {Response} -- Response sent when a view function misses its deadline (default: {None})
+        max_workers {int} -- Size of the thread pool running view functions with a deadline (default: {None})
+        metrics {MetricsSink} -- Sink receiving per-action request counts and phase latencies (default: {None})
+        idempotency {Idempotency} -- Coalesces retried requests and serves their recent responses (default: {None})
+        sessions {SessionStore} -- Store of the per-session state exposed by :attr:`session` (default: {None})
+        tasks {TaskQueue} -- Pool running the work deferred with :meth:`defer`, created on first use (default: {None})
+        cpu_tasks {TaskQueue} -- Pool running the work deferred with :meth:`defer_cpu`, a process pool created on first use (default: {None})
+        name {str} -- Name of the agent, when one process serves several agents (default: {None})
+        executor {concurrent.futures.Executor} -- Thread pool running the view functions with a deadline, created on first use (default: {None})
+        capture {TrafficCapture} -- Writes a sample of the requests and responses to disk (default: {None})
+        profiler {Profiler} -- Profiles sampled or selected requests, per action (default: {None})
+        admission {AdmissionControl} -- Sheds the requests exceeding the concurrency or per-session limits (default: {None})
+        max_body_size {int} -- Size in bytes above which request bodies are rejected with a 413, before they are read (default: {None})
+        validator {function} -- Checks the shape of the requests, see :func:`compile_validator`, None to skip it (default: {validate_webhook})
+        client {HTTPClient} -- Pooled HTTP client exposed to the view functions by :attr:`client`, created on first use (default: {None})
+    """
+    #: Seconds DialogFlow waits for the webhook, the budget of :meth:`time_left`.
+    webhook_timeout = 5.0
+
+    def __init__(self, route=None, basic_auth_user=None, basic_auth_pass=None, auth=None,
+                 deadline=None, fallback=None, max_workers=None, metrics=None,
+                 idempotency=None, sessions=None, tasks=None, cpu_tasks=None,
+                 name=None, executor=None, capture=None, profiler=None, admission=None,
+                 max_body_size=None, validator=validate_webhook, client=None):
+        self.name = name
+        self._route = route
+        self._action_to_function_map = {}
+        self._action_patterns = Router()
+        self._action_caches = {}
+        self._action_deadlines = {}
+        self._action_fallbacks = {}
+        self.auth = auth
+        if basic_auth_user is not None:
+            self.set_basic_auth(basic_auth_user, basic_auth_pass)
+        self._default_view_func = None
+        self.deadline = deadline
+        self.fallback = fallback
+        self.max_workers = max_workers
+        self.deadline_misses = Counter()
+        self.metrics = metrics
+        self.idempotency = idempotency
+        self.sessions = sessions
+        self._tasks = tasks
+        self._cpu_tasks = cpu_tasks
+        self._executor = executor
+        self.capture = capture
+        self.profiler = profiler
+        self.admission = admission
+        self.max_body_size = max_body_size
+        self.validator = validator
+        self._client = None
+        if client is not None:
+            self._bind_client(client)
+        # per dispatcher, so agents served by the same process don't see each other's requests
+        self._current_state = ContextVar('flask_dialogflow_request_state', default=None)
+
+    def set_basic_auth(self, username, password):
+        """Enable basic auth with a single username and password, see :class:`BasicAuth`."""
+        from .auth import BasicAuth
+        self.auth = BasicAuth([(username, password)])
+
+    @property
+    def executor(self):
+        """Thread pool running the view functions that have a deadline, created on first use."""
+        if self._executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='flask-dialogflow')
+        return self._executor
+
+    @property
+    def tasks(self):
+        """Thread pool running the work deferred with :meth:`defer`."""
+        if self._tasks is None:
+            from .tasks import TaskQueue
+            self._tasks = TaskQueue()
+        return self._tasks
+
+    @property
+    def cpu_tasks(self):
+        """Process pool running the work deferred with :meth:`defer_cpu`."""
+        if self._cpu_tasks is None:
+            from .tasks import TaskQueue
+            self._cpu_tasks = TaskQueue(processes=True)
+        return self._cpu_tasks
+
+    @property
+    def client(self):
+        """Pooled HTTP client for the view functions, see :class:`HTTPClient`.
+
+        Its timeouts are bounded by :meth:`time_left`, so a slow service doesn't make the
+        webhook miss the DialogFlow timeout.
+
+        Example:
+            >>> @dialogflow.action('order.status')
+            >>> def status(order_id):
+            >>>     order = dialogflow.client.get(ORDERS_URL + order_id, timeout=1).json()
+            >>>     ...
+        """
+        if self._client is None:
+            from .client import HTTPClient
+            self._bind_client(HTTPClient())
+        return self._client
+
+    def _bind_client(self, client):
+        client.bind(self.time_left)
+        self._client = client
+
+    def time_left(self):
+        """Return the seconds left to answer the current request before DialogFlow gives up on it.
+
+        Counted from the start of the dispatch against :attr:`webhook_timeout`, rather than the
+        deadline of the action: a view function missing its deadline keeps running so its late
+        response serves the retry.
+
+        Returns:
+            [float] -- The seconds left, negative once the timeout is past, None outside of a request
+        """
+        state = self._current_state.get()
+        if state is None:
+            return None
+        return self.webhook_timeout - (time.monotonic() - state.started)
+
+    def shutdown(self):
+        """Wait for the running view functions and deferred tasks, release the pools, write the queued sessions and captured traffic."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        for tasks in (self._tasks, self._cpu_tasks):
+            if tasks is not None:
+                tasks.shutdown(wait=True)
+        if self.sessions is not None:
+            self.sessions.close()
+        if self.capture is not None:
+            self.capture.close()
+        if self._client is not None:
+            self._client.close()
+
+    def defer(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` on a thread pool once the response is ready.
+
+        Use it in view functions for logging, analytics, CRM writes... anything DialogFlow
+        doesn't need to wait for. Called outside of a request, the task is submitted right away.
+        Tasks of a view function that raises are discarded. When the pool is full the task is
+        dropped, see :class:`TaskQueue`.
+
+        Example:
+            >>> @dialogflow.action('order.confirm')
+            >>> def confirm(order_id):
+            >>>     dialogflow.defer(crm.log_order, order_id)
+            >>>     return CONFIRMED
+        """
+        self._defer(self.tasks, fn, args, kwargs)
+
+    def defer_cpu(self, fn, *args, **kwargs):
+        """Like :meth:`defer`, on a process pool for CPU heavy work. ``fn`` and its arguments must be picklable."""
+        self._defer(self.cpu_tasks, fn, args, kwargs)
+
+    def _defer(self, tasks, fn, args, kwargs):
+        state = self._current_state.get()
+        if state is None:
+            tasks.submit(fn, *args, **kwargs)
+            return
+        if state.deferred is None:
+            state.deferred = []
+        state.deferred.append((tasks, fn, args, kwargs))
+
+    @staticmethod
+    def _submit_deferred(state):
+        deferred, state.deferred = state.deferred, None
+        for tasks, fn, args, kwargs in deferred:
+            tasks.submit(fn, *args, **kwargs)
+
+    @property
+    def context_in(self):
+        """This contains the context received from Google DialogFlow
+        
+        Returns:
+            [list[context]] -- List of contexts
+        """
+        state = self._current_state.get()
+        return state.context_in if state is not None else []
+
+    @context_in.setter
+    def context_in(self, value):
+        get_state(self._current_state).context_in = value
+
+    @property
+    def original_request(self):
+        """Contains the original request (1-click integrations providers data) received from Google DialogFlow
+        
+        Returns:
+            [originalRequest -- originalRequest object
+        """
+        state = self._current_state.get()
+        return state.original_request if state is not None else []
+
+    @original_request.setter
+    def original_request(self, value):
+        get_state(self._current_state).original_request = value
+
+    @property
+    def session(self):
+        """State of the current DialogFlow session (keyed by ``sessionId``), kept between turns.
+
+        A dict of JSON compatible values, loaded on first access. If the view function read it,
+        it is queued for persistence once the response is ready (see :class:`SessionStore`).
+
+        Returns:
+            [dict] -- The session state
+
+        Raises:
+            RuntimeError -- When no session store is configured or outside of a request
+        """
+        state = get_state(self._current_state)
+        if state.session is None:
+            if self.sessions is None:
+                raise RuntimeError('No session store configured, see the sessions argument.')
+            session_id = self._session_key(state)
+            state.session = self.sessions.get(session_id) if session_id is not None else {}
+        return state.session
+
+    def get_context(self, name):
+        """Return the context named ``name`` received from Google DialogFlow.
+
+        Contexts are indexed by name on the first call, so lookups don't scan ``context_in``.
+
+        Arguments:
+            name {str} -- Name of the context (case insensitive)
+
+        Returns:
+            [context] -- The context, or None if it was not received
+        """
+        state = self._current_state.get()
+        return state.get_context(name) if state is not None else None
+
+    @property
+    def intent(self):
+        state = self._current_state.get()
+        return state.intent if state is not None else []
+
+    @intent.setter
+    def intent(self, value):
+        get_state(self._current_state).intent = value
+
+    @property
+    def context_out(self):
+        state = self._current_state.get()
+        return state.context_out if state is not None else None
+
+    @context_out.setter
+    def context_out(self, value):
+        """Set the the output context that is going to be present in the response back to Google DialogFlow
+
+        Arguments:
+            value {context} -- The context to be sent
+
+        Example:
+            dialogflow.context_out = {
+                "name": "some-context",
+                "lifespan": 10,
+                "parameters": {
+                    "key": "value"
+                }
+            }
+        """
+        get_state(self._current_state).context_out = value
+
+    def asgi_app(self, route=None, max_workers=None, executor=None):
+        """Build an ASGI application serving the webhook, to be run by any ASGI server (uvicorn, hypercorn...).
+
+        ``async def`` view functions are awaited on the server event loop, synchronous view
+        functions are run on a bounded thread pool so they never block it.
+
+        Keyword Arguments:
+            route {str} -- Route at which DialogFlow is going to listen, defaults to the route given to init_app (default: {None})
+            max_workers {int} -- Size of the thread pool running synchronous view functions (default: {None})
+            executor {concurrent.futures.Executor} -- Thread pool running synchronous view functions, e.g. shared by several agents (default: {None})
+
+        Returns:
+            [ASGIApp] -- The ASGI application
+
+        Example::
+            >>> dialogflow = DialogFlow(route='/webhook')
+            >>> app = dialogflow.asgi_app()
+            >>> # $ uvicorn myagent:app
+        """
+        from .asgi import ASGIApp
+        return ASGIApp(self, route if route is not None else self._route, max_workers, executor)
+
+    def wsgi_app(self, route=None):
+        """Build a plain WSGI application serving the webhook, without Flask.
+
+        Keyword Arguments:
+            route {str} -- Route at which DialogFlow is going to listen, defaults to the route of the dispatcher (default: {None})
+
+        Returns:
+            [WSGIApp] -- The WSGI application
+
+        Example::
+            >>> dispatcher = Dispatcher(route='/webhook')
+            >>> app = dispatcher.wsgi_app()
+            >>> # $ gunicorn myagent:app
+        """
+        from .wsgi import WSGIApp
+        return WSGIApp(self, route if route is not None else self._route)
+
+    def dispatch(self, payload, profile=False):
+        """Handle a webhook request.
+
+        Arguments:
+            payload {dict|bytes|str} -- The request sent by Google DialogFlow, parsed or not
+
+        Keyword Arguments:
+            profile {bool} -- Profile the request, if a :class:`Profiler` is configured (default: {False})
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        if self.metrics is not None:
+            return self._measured_dispatch(_parse, payload, profile=profile)
+        return self._dispatch(_parse(payload), profile=profile)
+
+    async def dispatch_async(self, payload, executor=None, profile=False):
+        """Handle a webhook request from a coroutine.
+
+        ``async def`` view functions are awaited, synchronous ones are run on ``executor``.
+
+        Arguments:
+            payload {dict|bytes|str} -- The request sent by Google DialogFlow, parsed or not
+
+        Keyword Arguments:
+            executor {concurrent.futures.Executor} -- Runs synchronous view functions, defaults to :attr:`executor` (default: {None})
+            profile {bool} -- Profile the request, if a :class:`Profiler` is configured (default: {False})
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        executor = executor if executor is not None else self.executor
+        if self.metrics is None:
+            return await self._dispatch_async(_parse(payload), executor, profile=profile)
+
+        marks = [time.perf_counter()]
+        data_json = None
+        try:
+            data_json = _parse(payload)
+            marks.append(time.perf_counter())
+            body = await self._dispatch_async(data_json, executor, marks, profile)
+        except Exception:
+            self.metrics.record(self._route_of(data_json), marks, error=True)
+            raise
+        self.metrics.record(self._route_of(data_json), marks)
+        return body
+
+    def _check_body_size(self, length):
+        """Reject a request whose ``Content-Length`` is over :attr:`max_body_size`, before reading it.
+
+        Arguments:
+            length {int} -- The ``Content-Length`` of the request, None if unknown
+
+        Raises:
+            PayloadTooLarge -- When the body is too large
+        """
+        if self.max_body_size is not None and length is not None and length > self.max_body_size:
+            raise PayloadTooLarge(self.max_body_size)
+
+    def _read_limited(self, read):
+        """Read a body of unknown length (chunked), up to :attr:`max_body_size`.
+
+        The stream must end with the body (``wsgi.input_terminated``), otherwise the read
+        blocks until the client gives up.
+
+        Arguments:
+            read {function} -- Reads up to the given number of bytes from the body
+
+        Raises:
+            PayloadTooLarge -- When the body is too large
+        """
+        body = read(self.max_body_size + 1)
+        if len(body) > self.max_body_size:
+            raise PayloadTooLarge(self.max_body_size)
+        return body
+
+    def _is_authorized(self, authorization):
+        """Check the credentials of a request with :attr:`auth`, if authentication is enabled.
+
+        Arguments:
+            authorization {str|bytes} -- Value of the ``Authorization`` header, None if missing
+
+        Returns:
+            [bool] -- Whether the request may be processed
+        """
+        return self.auth is None or self.auth.authenticate(authorization)
+
+    def _prepare(self, data_json):
+        """Resolve the view function binding of a request and build its state.
+
+        Arguments:
+            data_json {dict} -- The request sent by Google DialogFlow
+
+        Returns:
+            [tuple(Binding, RequestState, dict)] -- The binding to call, the state to make current
+                and the parameters to call it with
+        """
+        # the key of the query result tells the version, v2 omits empty actions and parameters
+        result = data_json.get('result')
+        if result is not None:
+            action = result['action']
+            params = result['parameters']
+            state = RequestState(data_json, action)
+        else:
+            result = data_json['queryResult']
+            action = result.get('action', '')
+            params = result.get('parameters', {})
+            state = RequestState(data_json, action, V2)
+        binding = self._action_to_function_map.get(action)
+        if binding is not None:
+            return binding, state, params
+
+        route = self._action_patterns.match(action)
+        if route is not None:
+            pattern, binding, captured = route
+            state.route = pattern
+            if captured is not None:
+                params = dict(params, **captured)
+            return binding, state, params
+        if self._default_view_func:
+            state.route = None
+            return self._default_view_func, state, params
+        raise NotImplementedError('No registered view_func for action: "{}" and no default action specified.'.format(action))
+
+    def _route_of(self, data_json):
+        """Return the registered action or pattern a request is routed to, the label of its metrics.
+
+        Actions left to the default view function and requests that couldn't be parsed share
+        :data:`UNKNOWN_ACTION`: the number of series is bounded by the registrations, whatever
+        the requests.
+        """
+        action = _action_of(data_json)
+        if isinstance(action, str):
+            if action in self._action_to_function_map:
+                return action
+            route = self._action_patterns.match(action)
+            if route is not None:
+                return route[0]
+        return UNKNOWN_ACTION
+
+    def _cache_lookup(self, state, data_json):
+        """Look the response of a request up in the cache of its action.
+
+        Returns:
+            [tuple(TTLCache, tuple, bytes)] -- The cache of the action (or None), the key of the
+                request and the cached body (or None)
+        """
+        cache = self._action_caches.get(state.route)
+        if cache is None:
+            return None, None, None
+        key = cache.key(state.action, data_json)
+        if self.name is not None:
+            key += (self.name,)
+        return cache, key, cache.get(key)
+
+    def _render(self, result, state):
+        """Serialize the value returned by a view function.
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        if result is None:
+            return None
+        if state.version == V1:
+            return result.render(state.context_out)
+        return result.render(state.context_out, state.version, state.session_id)
+
+    def _measured_dispatch(self, parse, *args, profile=False, **kwargs):
+        """Parse and dispatch a request, recording the time spent in each phase in the metrics sink.
+
+        Arguments:
+            parse {function} -- Called with the remaining arguments, returns the DialogFlow request
+
+        Keyword Arguments:
+            profile {bool} -- Profile the request, see :meth:`dispatch` (default: {False})
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        marks = [time.perf_counter()]
+        data_json = None
+        try:
+            data_json = parse(*args, **kwargs)
+            marks.append(time.perf_counter())
+            body = self._dispatch(data_json, marks, profile)
+        except Exception:
+            self.metrics.record(self._route_of(data_json), marks, error=True)
+            raise
+        self.metrics.record(self._route_of(data_json), marks)
+        return body
+
+    def _dispatch(self, data_json, marks=None, profile=False):
+        """Run the view function of a DialogFlow request, or serve its response from the action cache.
+
+        View functions with a deadline are run on the thread pool, if the deadline is missed
+        the fallback response is returned instead (see :meth:`action`). With idempotency
+        enabled, retries of a request share the response of the first one. With admission
+        control, requests exceeding the limits get the response of :class:`AdmissionControl`.
+        Requests that fail the :attr:`validator` raise :class:`InvalidPayload`.
+
+        Arguments:
+            data_json {dict} -- The request sent by Google DialogFlow
+
+        Keyword Arguments:
+            marks {list[float]} -- When given, ``time.perf_counter()`` is appended at the end of
+                each phase (see :data:`flask_dialogflow.metrics.PHASES`) (default: {None})
+            profile {bool} -- Profile the request, if a :class:`Profiler` is configured (default: {False})
+
+        Returns:
+            [bytes] -- The JSON body of the response, or None if the view function returned nothing
+        """
+        if self.validator is not None:
+            self.validator(data_json)
+        admission = self.admission
+        if admission is None:
+            return self._profiled_dispatch(data_json, marks, profile)
+        if not admission.acquire(_session_of(data_json)):
+            return _render_static(admission.response, data_json)
+        try:
+            return self._profiled_dispatch(data_json, marks, profile)
+        finally:
+            admission.release()
+
+    def _profiled_dispatch(self, data_json, marks=None, profile=False):
+        if self.profiler is not None:
+            # keyed like the metrics: the statistics and their files don't grow with the requests
+            action = self._route_of(data_json)
+            if profile or self.profiler.wants(action):
+                return self.profiler.run(action, self._captured_dispatch, data_json, marks)
+        return self._captured_dispatch(data_json, marks)
+
+    def _captured_dispatch(self, data_json, marks=None):
+        if self.capture is not None and self.capture.sample():
+            body = None
+            try:
+                body = self._dispatch_idempotent(data_json, marks)
+            finally:
+                self.capture.offer(data_json, body)
+            return body
+        return self._dispatch_idempotent(data_json, marks)
+
+    def _dispatch_idempotent(self, data_json, marks=None):
+        if self.idempotency is not None:
+            key = self.idempotency.key(data_json)
+            if key is not None:
+                return self.idempotency.run(key, self._dispatch_once, data_json, marks)
+        return self._dispatch_once(data_json, marks)
+
+    def _dispatch_once(self, data_json, marks=None):
+        binding, state, params = self._prepare(data_json)
+        cache, key, body = self._cache_lookup(state, data_json)
+        if marks is not None:
+            marks.append(time.perf_counter())
+        if body is not None:
+            return body
+
+        deadline = self._action_deadlines.get(state.route, self.deadline)
+        token = self._current_state.set(state)
+        try:
+            if deadline is None:
+                result = self._call(binding, params)
+            else:
+                from concurrent.futures import TimeoutError
+                future = self.executor.submit(
+                    contextvars.copy_context().run, self._call, binding, params)
+                try:
+                    result = future.result(timeout=deadline)
+                except TimeoutError:
+                    self._deadline_missed(state, future, cache, key)
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    body = self._static_fallback(state)
+                    if body is None and self._default_view_func not in (None, binding):
+                        fallback_state = state.copy()
+                        self._current_state.set(fallback_state)
+                        body = self._render(self._call(self._default_view_func, params), fallback_state)
+                        if fallback_state.session is not None:
+                            self._save_session(fallback_state)
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    if body is None:
+                        body = _EMPTY_RESPONSE.render(None, state.version, state.session_id)
+                    return body
+        finally:
+            self._current_state.reset(token)
+        if marks is not None:
+            marks.append(time.perf_counter())
+
+        body = self._render(result, state)
+        if cache is not None and body is not None and _cacheable(state, body):
+            cache.set(key, body)
+        if state.session is not None:
+            self._save_session(state)
+        if state.deferred is not None:
+            self._submit_deferred(state)
+        if marks is not None:
+            marks.append(time.perf_counter())
+        return body
+
+    async def _dispatch_async(self, data_json, executor, marks=None, profile=False):
+        """Coroutine counterpart of :meth:`_dispatch`, view functions with a deadline run in a shielded task."""
+        if self.validator is not None:
+            self.validator(data_json)
+        admission = self.admission
+        if admission is None:
+            return await self._profiled_dispatch_async(data_json, executor, marks, profile)
+        if not await admission.acquire_async(_session_of(data_json)):
+            return _render_static(admission.response, data_json)
+        try:
+            return await self._profiled_dispatch_async(data_json, executor, marks, profile)
+        finally:
+            admission.release()
+
+    async def _profiled_dispatch_async(self, data_json, executor, marks=None, profile=False):
+        if self.profiler is not None:
+            # keyed like the metrics: the statistics and their files don't grow with the requests
+            action = self._route_of(data_json)
+            if profile or self.profiler.wants(action):
+                return await self.profiler.run_async(
+                    action, self._captured_dispatch_async, data_json, executor, marks)
+        return await self._captured_dispatch_async(data_json, executor, marks)
+
+    async def _captured_dispatch_async(self, data_json, executor, marks=None):
+        if self.capture is not None and self.capture.sample():
+            body = None
+            try:
+                body = await self._dispatch_idempotent_async(data_json, executor, marks)
+            finally:
+                self.capture.offer(data_json, body)
+            return body
+        return await self._dispatch_idempotent_async(data_json, executor, marks)
+
+    async def _dispatch_idempotent_async(self, data_json, executor, marks=None):
+        if self.idempotency is not None:
+            key = self.idempotency.key(data_json)
+            if key is not None:
+                return await self.idempotency.run_async(
+                    key, self._dispatch_once_async, data_json, executor, marks)
+        return await self._dispatch_once_async(data_json, executor, marks)
+
+    async def _dispatch_once_async(self, data_json, executor, marks=None):
+        import asyncio
+
+        binding, state, params = self._prepare(data_json)
+        cache, key, body = self._cache_lookup(state, data_json)
+        if marks is not None:
+            marks.append(time.perf_counter())
+        if body is not None:
+            return body
+
+        deadline = self._action_deadlines.get(state.route, self.deadline)
+        token = self._current_state.set(state)
+        try:
+            if deadline is None:
+                result = await self._call_async(binding, params, executor)
+            else:
+                if binding.is_async:
+                    # the task copies the current context, and the request state with it
+                    future = asyncio.ensure_future(binding(params))
+                    waiter = asyncio.shield(future)
+                else:
+                    # a concurrent future, which can still be cancelled if the deadline is
+                    # missed while it is queued
+                    future = executor.submit(contextvars.copy_context().run, binding, params)
+                    waiter = asyncio.shield(asyncio.wrap_future(future))
+                try:
+                    result = await asyncio.wait_for(waiter, deadline)
+                except asyncio.TimeoutError:
+                    self._deadline_missed(state, future, cache, key)
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    body = self._static_fallback(state)
+                    if body is None and self._default_view_func not in (None, binding):
+                        fallback_state = state.copy()
+                        self._current_state.set(fallback_state)
+                        result = await self._call_async(self._default_view_func, params, executor)
+                        body = self._render(result, fallback_state)
+                        if fallback_state.session is not None:
+                            self._save_session(fallback_state)
+                    if marks is not None:
+                        marks.append(time.perf_counter())
+                    if body is None:
+                        body = _EMPTY_RESPONSE.render(None, state.version, state.session_id)
+                    return body
+        finally:
+            self._current_state.reset(token)
+        if marks is not None:
+            marks.append(time.perf_counter())
+
+        body = self._render(result, state)
+        if cache is not None and body is not None and _cacheable(state, body):
+            cache.set(key, body)
+        if state.session is not None:
+            self._save_session(state)
+        if state.deferred is not None:
+            self._submit_deferred(state)
+        if marks is not None:
+            marks.append(time.perf_counter())
+        return body
+
+    def _session_key(self, state):
+        session_id = state.session_id
+        if session_id is None or self.name is None:
+            return session_id
+        return '{}:{}'.format(self.name, session_id)
+
+    def _save_session(self, state):
+        session_id = self._session_key(state)
+        if session_id is not None:
+            self.sessions.save(session_id, state.session)
+
+    @staticmethod
+    def _call(binding, params):
+        result = binding(params)
+        if binding.is_async:
+            import asyncio
+            result = asyncio.run(result)
+        return result
+
+    @staticmethod
+    async def _call_async(binding, params, executor):
+        if binding.is_async:
+            return await binding(params)
+        import asyncio
+        # copy_context() carries the request state over to the worker thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            executor, contextvars.copy_context().run, binding, params)
+
+    def _deadline_missed(self, state, future, cache, key):
+        """Count a missed deadline, the late response is stored for the retry.
+
+        The late response goes to the action cache and to the idempotency store, if any, where
+        it replaces the fallback response. Its session is saved and the tasks it deferred are
+        submitted when it completes. When there is no store, a view function still queued on
+        the thread pool is cancelled: nothing would use its response. Misses are counted per
+        registered action or pattern.
+
+        Arguments:
+            state {RequestState} -- The state of the request
+            future {Future} -- The future of the late view function
+            cache {TTLCache} -- The cache of the action, or None
+            key {tuple} -- The cache key of the request
+        """
+        self.deadline_misses[state.route] += 1
+        future.add_done_callback(lambda future: self._late_done(future, state))
+        stores = []
+        if cache is not None:
+            stores.append((cache, key))
+        if self.idempotency is not None:
+            idempotency_key = self.idempotency.key(state.data)
+            if idempotency_key is not None:
+                stores.append((self.idempotency.store, idempotency_key))
+        if not stores:
+            # a thread pool future is only cancelled if the view function hasn't started,
+            # coroutines always have: they complete for their session and deferred tasks
+            from concurrent.futures import Future
+            if isinstance(future, Future):
+                future.cancel()
+            return
+
+        def store(future):
+            if future.cancelled() or future.exception() is not None:
+                return
+            body = self._render(future.result(), state)
+            if body is not None:
+                for target, target_key in stores:
+                    if target is not cache or _cacheable(state, body):
+                        target.set(target_key, body)
+        future.add_done_callback(store)
+
+    def _late_done(self, future, state):
+        """Save the session of a view function that missed its deadline and submit its deferred tasks, once it completes."""
+        if future.cancelled() or future.exception() is not None:
+            return
+        if state.session is not None:
+            self._save_session(state)
+        if state.deferred is not None:
+            self._submit_deferred(state)
+
+    def _static_fallback(self, state):
+        """Return the body of the fallback response of the action, or of the global one.
+
+        Returns:
+            [bytes] -- The JSON body, or None if no fallback response is configured
+        """
+        fallback = self._action_fallbacks.get(state.route, self.fallback)
+        if fallback is None:
+            return None
+        return fallback.render(None, state.version, state.session_id)
+
+    def action(self, action_name, cache=None, deadline=None, fallback=None):
+        """ Decorator that registers an action's view function.
+
+        The view function can be a regular function or an ``async def`` coroutine function.
+        The signature of the decorated function is compiled into a :class:`Binding` when it is
+        registered, DialogFlow parameters are mapped to arguments of the same name.
+
+        Actions that are pure functions of their parameters can be given a cache, the serialized
+        response is then reused for requests with the same parameters (see :class:`TTLCache`).
+
+        DialogFlow abandons a webhook call after about 5 seconds. With a deadline, the view
+        function runs on a thread pool and if it misses the deadline the fallback response is
+        sent right away: the fallback of the action, the global one, the output of the default
+        view function, or an empty response (DialogFlow then uses the responses of the intent).
+        The late response is stored in the cache of the action, if any, for the retry.
+        Misses are counted per registered action or pattern in ``deadline_misses``, under None
+        for the actions of the default view function.
+
+        ``action_name`` can be a pattern, such as ``smalltalk.*`` or ``order.{step}``, see
+        :class:`flask_dialogflow.routing.Router`. ``{name}`` segments are passed to the view
+        function like DialogFlow parameters. Exact names are always tried first.
+
+        Arguments:
+            action_name {str} -- The name of the action, or the pattern of the actions, to map with the decorated function.
+
+        Keyword Arguments:
+            cache {TTLCache} -- Cache of the responses of the action (default: {None})
+            deadline {float} -- Time budget of the view function in seconds, overrides the global one (default: {None})
+            fallback {Response} -- Response sent when the deadline is missed, overrides the global one (default: {None})
+
+        Example::
+            >>> app = Flask(__name__)
+            >>> dialogflow = DialogFlow(app, 'webhook/')
+            >>> 
+            >>> @dialogflow.action('core.onboarding')
+            >>> def onboarding():
+            >>>     answer = TextMessage(speech='Hello, World!')
+            >>>     response = Response()
+            >>>     response.append(answer)
+            >>>     return response
+        """
+
+        def decorator(f):
+            if is_pattern(action_name):
+                self._action_patterns.add(action_name, Binding(f))
+            else:
+                self._action_to_function_map[action_name] = Binding(f)
+            for options, value in ((self._action_caches, cache),
+                                   (self._action_deadlines, deadline),
+                                   (self._action_fallbacks, fallback)):
+                if value is not None:
+                    options[action_name] = value
+                else:
+                    options.pop(action_name, None)
+            return f
+        return decorator
+
+    def default(self, f):
+        """
+        Register a default function to be used when an unknown action is received.
+        
+        Arguments:
+             {function} -- Function to be decorated
+        Example::
+            >>> app = Flask(__name__)
+            >>> dialogflow = DialogFlow(app, 'webhook/')
+            >>> 
+            >>> @dialogflow.default
+            >>> def default():
+            >>>     answer = TextMessage(speech='Something happened!')
+            >>>     response = Response()
+            >>>     response.append(answer)
+            >>>     return response
+        """
+
+        self._default_view_func = Binding(f)
+        return f
@@ -1,19 +1,11 @@
-import inspect
-import json
-from functools import wraps, partial
-from flask import jsonify, make_response, request, Response as FlaskResponse
-
-from .messages import MessageEncoder
-
-# Find the stack on which we want to store the database connection.
-# Starting with Flask 0.9, the _app_ctx_stack is the correct one,
-# before that we need to use the _request_ctx_stack.
-try:
-    from flask import _app_ctx_stack as _app_stack
-except ImportError:
-    from flask import _request_ctx_stack as _app_stack
-
-class DialogFlow:
+from flask import request, Response as FlaskResponse
+
+from .core import Dispatcher
+from .errors import BadRequest
+from .metrics import Metrics
+from .validation import validate_webhook
+
+class DialogFlow(Dispatcher):
     """
     The main entry point for the application.
     You need to initialize it with a Flask Application: ::
@@ -25,94 +17,101 @@ class DialogFlow:
     It setups a flask route to be used as the fulfillment webhook route of your agent.
     It also maps actions your function to proccess that actions, this is done with a docorator (@dialogflow.action).
 
+    The registration of actions and the dispatch of requests are implemented by
+    :class:`flask_dialogflow.core.Dispatcher`, this class adds the Flask integration.
+
     Keyword Arguments:
         app {flask.Flask} -- the Flask application object (default: {None})
         route {str} -- Route at which DialogFlow is going to listen (default: {None})
         basic_auth_user {str} -- Username to use for basic auth. Basic auth is enabled if this is set (default: {None})
         basic_auth_pass {str} -- Password to use for basic auth. (default: {None})
+        auth {Authenticator} -- Checks the ``Authorization`` header, e.g. rotated credentials or bearer tokens, instead of basic_auth_user (default: {None})
+        deadline {float} -- Time budget of view functions in seconds, see :meth:`action` (default: {None})
+        fallback {Response} -- Response sent when a view function misses its deadline (default: {None})
+        max_workers {int} -- Size of the thread pool running view functions with a deadline (default: {None})
+        metrics {MetricsSink} -- Sink receiving per-action request counts and phase latencies (default: {None})
+        metrics_route {str} -- Route serving the metrics in Prometheus text format, see :meth:`init_app` (default: {None})
+        idempotency {Idempotency} -- Coalesces retried requests and serves their recent responses (default: {None})
+        sessions {SessionStore} -- Store of the per-session state exposed by :attr:`session` (default: {None})
+        tasks {TaskQueue} -- Pool running the work deferred with :meth:`defer`, created on first use (default: {None})
+        cpu_tasks {TaskQueue} -- Pool running the work deferred with :meth:`defer_cpu`, a process pool created on first use (default: {None})
+        name {str} -- Name of the agent, when one application serves several agents (default: {None})
+        executor {concurrent.futures.Executor} -- Thread pool running the view functions with a deadline, created on first use (default: {None})
+        capture {TrafficCapture} -- Writes a sample of the requests and responses to disk (default: {None})
+        profiler {Profiler} -- Profiles sampled or selected requests, per action (default: {None})
+        profile_route {str} -- Route serving the profiles, see :meth:`init_app` (default: {None})
+        admission {AdmissionControl} -- Sheds the requests exceeding the concurrency or per-session limits (default: {None})
+        max_body_size {int} -- Size in bytes above which request bodies are rejected with a 413, before they are read (default: {None})
+        validator {function} -- Checks the shape of the requests, see :func:`compile_validator`, None to skip it (default: {validate_webhook})
+        client {HTTPClient} -- Pooled HTTP client exposed to the view functions by :attr:`client`, created on first use (default: {None})
+
+    Several agents can be served by the same application, each with its own route::
+
+    >>> pool = ThreadPoolExecutor(max_workers=32)
+    >>> billing = DialogFlow(app, '/billing', name='billing', executor=pool, basic_auth_user=...)
+    >>> support = DialogFlow(app, '/support', name='support', executor=pool)
     """
     def __init__(self, app=None, route=None, basic_auth_user=None,
-            basic_auth_pass=None):
+            basic_auth_pass=None, deadline=None, fallback=None, max_workers=None,
+            metrics=None, metrics_route=None, idempotency=None, sessions=None,
+            tasks=None, cpu_tasks=None, name=None, executor=None, capture=None,
+            profiler=None, profile_route=None, admission=None, auth=None,
+            max_body_size=None, validator=validate_webhook, client=None):
+        super(DialogFlow, self).__init__(
+            route=route, basic_auth_user=basic_auth_user, basic_auth_pass=basic_auth_pass, auth=auth,
+            deadline=deadline, fallback=fallback, max_workers=max_workers, metrics=metrics,
+            idempotency=idempotency, sessions=sessions, tasks=tasks, cpu_tasks=cpu_tasks,
+            name=name, executor=executor, capture=capture, profiler=profiler,
+            admission=admission, max_body_size=max_body_size, validator=validator, client=client)
         self.app = app
-        self._route = route
-        self._action_to_function_map = {}
-        self._basic_auth_user = basic_auth_user
-        self._basic_auth_pass = basic_auth_pass
-        self._default_view_func = None
 
         if app is not None:
-            self.init_app(app, route, basic_auth_user, basic_auth_pass)
+            self.init_app(app, route, basic_auth_user, basic_auth_pass, metrics_route, profile_route)
 
     def init_app(self, app, route=None, basic_auth_user=None,
-                 basic_auth_pass=None):
+                 basic_auth_pass=None, metrics_route=None, profile_route=None):
         """
         The function that really init the app. Setups a flask route for the webhook.
 
+        If ``metrics_route`` is given, a GET route serving the metrics in the Prometheus text
+        format is registered next to the webhook, with a :class:`Metrics` sink if none was given
+        (labelled with the ``agent`` name, if any).
+
+        If ``profile_route`` is given, a GET route serving the report of the :class:`Profiler`
+        is registered as well (``?action=`` restricts it to one action). It exposes the
+        internals of the application, so it requires authentication to be enabled.
+
+        The endpoints are named after the agent name, or the route, so several instances can
+        be registered on the same application.
+
         See also:
             Why an init_app function? See: http://flask.pocoo.org/docs/0.12/extensiondev/
         """
 
         self._route = route
-        self.basic_auth_user = basic_auth_user
-        self.basic_auth_user = basic_auth_pass
+        if basic_auth_user is not None:
+            self.set_basic_auth(basic_auth_user, basic_auth_pass)
+        endpoint = 'dialogflow:{}'.format(self.name if self.name is not None else self._route)
         app.add_url_rule(
-            self._route, view_func=self._flask_view_func, methods=['POST'])
-
-    @property
-    def context_in(self):
-        """This contains the context received from Google DialogFlow
-        
-        Returns:
-            [list[context]] -- List of contexts
-        """
-        return getattr(_app_stack.top, '_dialogflow_context_in', [])
-
-    @context_in.setter
-    def context_in(self, value):
-        _app_stack.top._dialogflow_context_in = value
-
-    @property
-    def original_request(self):
-        """Contains the original request (1-click integrations providers data) received from Google DialogFlow
-        
-        Returns:
-            [originalRequest -- originalRequest object
-        """
-        return getattr(_app_stack.top, '_dialogflow_original_request', [])
-
-    @original_request.setter
-    def original_request(self, value):
-        _app_stack.top._dialogflow_original_request = value
-
-    @property
-    def intent(self):
-        return getattr(_app_stack.top, '_dialogflow_intent', [])
-
-    @intent.setter
-    def intent(self, value):
-        _app_stack.top._dialogflow_intent = value
-
-    @property
-    def context_out(self):
-        return getattr(_app_stack.top, '_dialogflow_context_out', None)
-
-    @context_out.setter
-    def context_out(self, value):
-        """Set the the output context that is going to be present in the response back to Google DialogFlow
-
-        Arguments:
-            value {context} -- The context to be sent
-
-        Example:
-            dialogflow.context_out = {
-                "name": "some-context",
-                "lifespan": 10,
-                "parameters": {
-                    "key": "value"
-                }
-            }
-        """
-        _app_stack.top._dialogflow_context_out = value
+            self._route, endpoint=endpoint, view_func=self._flask_view_func, methods=['POST'])
+
+        if metrics_route is not None:
+            if self.metrics is None:
+                self.metrics = Metrics(labels={'agent': self.name} if self.name is not None else None)
+            elif not hasattr(self.metrics, 'prometheus'):
+                raise ValueError('metrics_route requires a Metrics sink, got {!r}'.format(self.metrics))
+            app.add_url_rule(
+                metrics_route, endpoint=endpoint + ':metrics',
+                view_func=self._flask_metrics_view_func, methods=['GET'])
+
+        if profile_route is not None:
+            if self.profiler is None:
+                raise ValueError('profile_route requires a profiler')
+            if self.auth is None:
+                raise ValueError('profile_route requires authentication to be enabled')
+            app.add_url_rule(
+                profile_route, endpoint=endpoint + ':profile',
+                view_func=self._flask_profile_view_func, methods=['GET'])
 
     def _flask_view_func(self, *args, **kwargs):
         """
@@ -120,111 +119,60 @@ class DialogFlow:
 
         This function is called every time the "Webhook" flask route is fired.
 
-        If basic_auth_user and _basic_auth_pass are set in Flask-Dialogflow, this function
-        is going to perform a Basic Http Auth.
+        If basic_auth_user and basic_auth_pass (or an authenticator) are set in Flask-Dialogflow, this function
+        is going to check the raw ``Authorization`` header, before the body is read.
 
         It also parses the request object sent by Google Dialog FLow and create the intent and context_in objects 
         to be used by view functions.
 
-        Finally it calls the decorated view function with the parameters received in the intent fired.
+        Finally it calls the decorated view function with the parameters received in the intent fired,
+        using the binding compiled when the view function was registered. ``async def`` view functions
+        are run to completion on a private event loop. Parameters that can't be converted to the
+        type annotated on the view function get a 400 response describing the error, so do
+        requests missing the fields checked by the validator and bodies that aren't valid JSON.
+        Bodies larger than ``max_body_size`` get a 413 without being read.
 
         """
-        is_basic_auth_enabled = (self._basic_auth_user is not None)
-        if (is_basic_auth_enabled and
-            (request.authorization.username != self._basic_auth_user or
-                request.authorization.password != self._basic_auth_pass)):
+        if not self._is_authorized(request.headers.get('Authorization')):
             return "", 401
 
-        data_json = request.get_json(silent=True, force=True)
-
-        action = data_json['result']['action']
+        profile = self.profiler is not None and self.profiler.requested(
+            request.headers.get(self.profiler.header))
         try:
-            view_func = self._action_to_function_map[action]
-        except KeyError:
-            if self._default_view_func:
-                view_func = self._default_view_func
-            else:
-                raise NotImplementedError('No registered view_func for action: "{}" and no default action specified.'.format(action))
-        # update incoming information
-        self.intent = data_json['result']['metadata']['intentName']
-        self.context_in = data_json['result'].get('contexts', [])
-        self.original_request = data_json.get('originalRequest', None)
-        
-        argspec = inspect.getargspec(view_func)
-        arg_names = argspec.args
-        arg_values = []
-        params = data_json['result']['parameters']
-        for arg_name in arg_names:
-            value = params.get(arg_name)
-            arg_values.append(value)
-
-        view_func_with_args = partial(view_func, *arg_values)
-
-        result = view_func_with_args()
-
-        if result is not None:
-
-            if self.context_out is not None:
-                result.contextOut = self.context_out
-
+            if self.max_body_size is not None:
+                self._check_body_size(request.content_length)
+                if request.content_length is None:
+                    # chunked body, read no more than allowed
+                    body = self.dispatch(self._read_limited(request.stream.read), profile=profile)
+                    return self._flask_response(body)
+            body = self.dispatch(request.get_data(), profile=profile)
+        except BadRequest as error:
+            return FlaskResponse(response=error.body, status=error.status, mimetype='application/json')
+        return self._flask_response(body)
+
+    @staticmethod
+    def _flask_response(body):
+        if body is not None:
             response = FlaskResponse(
-                response=json.dumps(result.__dict__, cls=MessageEncoder),
+                response=body,
                 status=200,
                 mimetype='application/json'
             )
             return response
         return "", 400
 
-    def action(self, action_name):
-        """ Decorator that registers an action's view function.
-
-        Arguments:
-            action_name {str} -- The name of the action to map with the decorated function.
-
-        Example::
-            >>> app = Flask(__name__)
-            >>> dialogflow = DialogFlow(app, 'webhook/')
-            >>> 
-            >>> @dialogflow.action('core.onboarding')
-            >>> def onboarding():
-            >>>     answer = TextMessage(speech='Hello, World!')
-            >>>     response = Response()
-            >>>     response.append(answer)
-            >>>     return response
-        """
-
-        def decorator(f):
-            self._action_to_function_map[action_name] = f
-
-            # see: https://docs.python.org/2/library/functools.html#functools.wraps
-            @wraps(f)
-            def wrapper(*args, **kw):
-                self._flask_view_func(*args, **kw)
-            return f
-        return decorator
-
+    def _flask_metrics_view_func(self):
+        return FlaskResponse(
+            response=self.metrics.prometheus(),
+            status=200,
+            mimetype='text/plain; version=0.0.4'
+        )
 
-    def default(self, f):
-        """
-        Register a default function to be used when an unknown action is received.
-        
-        Arguments:
-             {function} -- Function to be decorated
-        Example::
-            >>> app = Flask(__name__)
-            >>> dialogflow = DialogFlow(app, 'webhook/')
-            >>> 
-            >>> @dialogflow.default
-            >>> def default():
-            >>>     answer = TextMessage(speech='Something happened!')
-            >>>     response = Response()
-            >>>     response.append(answer)
-            >>>     return response
-        """
-
-        self._default_view_func = f
-
-        @wraps(f)
-        def wrapper(*args, **kw):
-            self._flask_view_func(*args, **kw)
-        return f
\ No newline at end of file
+    def _flask_profile_view_func(self):
+        if not self._is_authorized(request.headers.get('Authorization')):
+            return "", 401
+        return FlaskResponse(
+            response=self.profiler.report(request.args.get('action')),
+            status=200,
+            mimetype='text/plain'
+        )
@@ -0,0 +1,108 @@
+from .helpers import json_dumps
+
+
+class BadRequest(ValueError):
+    """Raised when a webhook request can't be processed, the adapters answer it with a 400 status
+    (or the ``status`` of the subclass) and a JSON body describing the problem.
+
+    Arguments:
+        message {str} -- Description of the problem
+
+    Keyword Arguments:
+        details -- Extra members of the JSON body
+    """
+    error = 'bad_request'
+    status = 400
+
+    def __init__(self, message, **details):
+        super(BadRequest, self).__init__(message)
+        self.message = message
+        self.details = details
+
+    def to_dict(self):
+        """Return the JSON body of the 400 response as a dict."""
+        data = {'status': self.status, 'error': self.error, 'message': self.message}
+        data.update(self.details)
+        return data
+
+    @property
+    def body(self):
+        """The JSON body of the 400 response."""
+        return json_dumps(self.to_dict())
+
+
+class ParameterError(BadRequest):
+    """Raised when a parameter of the request can't be converted to the type its view function expects.
+
+    The value isn't echoed in the response body, parameters may hold personal data.
+
+    Arguments:
+        parameter {str} -- Name of the parameter
+        value -- The value received
+        expected {str} -- Description of the expected type
+    """
+    error = 'invalid_parameter'
+
+    def __init__(self, parameter, value, expected):
+        super(ParameterError, self).__init__(
+            'Invalid value for parameter "{}", expected {}'.format(parameter, expected),
+            parameter=parameter, expected=expected)
+        self.parameter = parameter
+        self.value = value
+        self.expected = expected
+
+
+class InvalidPayload(BadRequest):
+    """Raised when a field of the request is missing or doesn't have the expected type.
+
+    Arguments:
+        field {str} -- Dotted path of the field, empty for the request itself
+        expected {str} -- Description of the expected type
+        missing {bool} -- Whether the field is missing (default: {False})
+    """
+    error = 'invalid_request'
+
+    def __init__(self, field, expected, missing=False):
+        if missing:
+            message = 'Missing field "{}"'.format(field)
+        elif field:
+            message = 'Invalid field "{}", expected {}'.format(field, expected)
+        else:
+            message = 'Invalid request, expected {}'.format(expected)
+        super(InvalidPayload, self).__init__(message, field=field, expected=expected)
+        self.field = field
+        self.expected = expected
+
+
+class PayloadTooLarge(BadRequest):
+    """Raised when the body of the request is larger than the configured maximum.
+
+    Arguments:
+        max_size {int} -- The maximum size, in bytes
+    """
+    error = 'payload_too_large'
+    status = 413
+
+    def __init__(self, max_size):
+        super(PayloadTooLarge, self).__init__(
+            'The request body is larger than {} bytes'.format(max_size), max_size=max_size)
+        self.max_size = max_size
+
+
+class CircuitOpen(ConnectionError):
+    """Raised by :class:`HTTPClient` instead of calling a service whose circuit breaker is open.
+
+    Arguments:
+        origin {str} -- The service, ``scheme://host:port``
+        retry_after {float} -- Seconds before a trial call is let through
+    """
+
+    def __init__(self, origin, retry_after):
+        super(CircuitOpen, self).__init__(
+            'The circuit to {} is open, retry in {:.1f}s'.format(origin, retry_after))
+        self.origin = origin
+        self.retry_after = retry_after
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised by :class:`HTTPClient` when an outbound call can't complete in the time left to answer the webhook request."""
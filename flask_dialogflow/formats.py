@@ -0,0 +1,126 @@
+"""DialogFlow v1 and v2 webhook formats.
+
+Requests of both versions are read through the same :class:`RequestState`: the version is told
+by the key holding the query result (``result`` or ``queryResult``) when the request is
+prepared, and the v2 fields are mapped to the v1 view on first access. Responses are built from
+the same :class:`Response` and :class:`Message` objects, in the v1 shape, and converted by
+:func:`response_v2` when the request was a v2 one.
+
+See also:
+    https://cloud.google.com/dialogflow/es/docs/fulfillment-webhook
+"""
+V1 = 1
+V2 = 2
+
+#: v1 platform names and their v2 counterparts, others are upper-cased.
+PLATFORMS_V2 = {
+    'facebook': 'FACEBOOK',
+    'kik': 'KIK',
+    'line': 'LINE',
+    'skype': 'SKYPE',
+    'slack': 'SLACK',
+    'telegram': 'TELEGRAM',
+    'viber': 'VIBER',
+    'google': 'ACTIONS_ON_GOOGLE',
+}
+
+# v1 response members that have no v2 counterpart, or are converted one by one
+_CONVERTED = frozenset(('messages', 'speech', 'displayText', 'data', 'contextOut', 'followupEvent'))
+
+
+def version_of(data_json):
+    """Return the version of the format of a request, :data:`V2` if it has a ``queryResult``."""
+    return V2 if isinstance(data_json, dict) and 'queryResult' in data_json else V1
+
+
+def context_v1(context):
+    """Convert an input context of a v2 request to the v1 shape, with its short name."""
+    data = {'name': context.get('name', '').rpartition('/')[2]}
+    if 'lifespanCount' in context:
+        data['lifespan'] = context['lifespanCount']
+    if 'parameters' in context:
+        data['parameters'] = context['parameters']
+    return data
+
+
+def context_v2(context, session):
+    """Convert an output context to the v2 shape, its name is qualified with the session."""
+    name = context.get('name', '')
+    data = {'name': name if '/' in name else '{}/contexts/{}'.format(session, name)}
+    if 'lifespan' in context:
+        data['lifespanCount'] = context['lifespan']
+    if 'parameters' in context:
+        data['parameters'] = context['parameters']
+    return data
+
+
+def contexts_v2(context_out, session):
+    """Convert the ``contextOut`` of a response (one context or a list) to ``outputContexts``."""
+    if isinstance(context_out, dict):
+        context_out = [context_out]
+    return [context_v2(context, session) for context in context_out]
+
+
+def _button_v2(button):
+    if isinstance(button, dict):
+        return button
+    text, postback = button
+    return {'text': text, 'postback': postback}
+
+
+def message_v2(data):
+    """Convert a message from the v1 shape (see :meth:`Message.to_dict`) to the v2 one.
+
+    Messages of an unknown type are kept as they are.
+    """
+    kind = data.get('type')
+    if kind == 0:
+        speech = data.get('speech', '')
+        message = {'text': {'text': speech if isinstance(speech, list) else [speech]}}
+    elif kind == 1 or (kind == 2 and 'buttons' in data and 'replies' not in data):
+        card = {'buttons': [_button_v2(button) for button in data.get('buttons') or ()]}
+        for v1_key, v2_key in (('title', 'title'), ('subtitle', 'subtitle'), ('imageUrl', 'imageUri')):
+            if data.get(v1_key) is not None:
+                card[v2_key] = data[v1_key]
+        message = {'card': card}
+    elif kind == 2:
+        message = {'quickReplies': {'title': data.get('title'), 'quickReplies': data.get('replies') or []}}
+    elif kind == 3:
+        message = {'image': {'imageUri': data.get('imageUrl')}}
+    elif kind == 4:
+        message = {'payload': data.get('payload', {})}
+    else:
+        return data
+    platform = data.get('platform')
+    if platform is not None:
+        message['platform'] = PLATFORMS_V2.get(platform, str(platform).upper())
+    return message
+
+
+def response_v2(data, session=None):
+    """Convert a response from the v1 shape (see :meth:`Response.to_dict`) to the v2 one.
+
+    Arguments:
+        data {dict} -- The v1 response
+
+    Keyword Arguments:
+        session {str} -- The ``session`` of the request, which qualifies the names of the output contexts (default: {None})
+
+    Returns:
+        [dict] -- The v2 response
+    """
+    result = {'fulfillmentMessages': [message_v2(message) for message in data.get('messages', ())]}
+    speech = data.get('speech', data.get('displayText'))
+    if speech is not None:
+        result['fulfillmentText'] = speech
+    if 'data' in data:
+        result['payload'] = data['data']
+    event = data.get('followupEvent')
+    if event is not None:
+        result['followupEventInput'] = {'name': event.get('name'), 'parameters': event.get('data', {})}
+    if data.get('contextOut') is not None:
+        result['outputContexts'] = contexts_v2(data['contextOut'], session)
+    for key, value in data.items():
+        if key not in _CONVERTED:
+            result.setdefault(key, value)
+    return result
@@ -1,3 +1,11 @@
+import functools
+import json
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson is optional
+    orjson = None
+
 
 class TypedList(list):
     """List that force typing on its elements. 
@@ -5,6 +13,7 @@ class TypedList(list):
     Arguments:
         type -- The type to force
     """
+    __slots__ = ('type',)
 
     def __init__(self, type):
         self.type = type
@@ -14,9 +23,69 @@ class TypedList(list):
             raise Exception(TypeError, 'item is not of type %s' % self.type)
 
     def append(self, item):
-        self._check_type(item)
+        if not isinstance(item, self.type):
+            self._check_type(item)
         super(TypedList, self).append(item)
 
     def insert(self, pos, item):
         self._check_type(item)
         super(TypedList, self).insert(pos, item)
+
+    def extend(self, items):
+        """Append all the items of an iterable, after checking all of them in a single pass.
+
+        Nothing is appended if one of the items has the wrong type.
+        """
+        items = list(items)
+        for item in items:
+            if not isinstance(item, self.type):
+                self._check_type(item)
+        super(TypedList, self).extend(items)
+
+
+def _stdlib_dumps(obj):
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+JSON_BACKENDS = {'json': _stdlib_dumps}
+if orjson is not None:
+    # like json.dumps, int, float, bool and None keys are converted to strings instead of raising
+    JSON_BACKENDS['orjson'] = functools.partial(orjson.dumps, option=orjson.OPT_NON_STR_KEYS)
+
+_json_dumps = JSON_BACKENDS['orjson' if orjson is not None else 'json']
+
+
+def json_dumps(obj):
+    """Serialize ``obj`` to JSON bytes with the configured backend.
+
+    The default backend is orjson if it is installed, the standard library json module otherwise.
+
+    Arguments:
+        obj -- A JSON compatible object (dict, list, str, numbers...)
+
+    Returns:
+        [bytes] -- The UTF-8 encoded JSON document
+    """
+    return _json_dumps(obj)
+
+
+def set_json_backend(backend):
+    """Change the backend used by :func:`json_dumps`.
+
+    Arguments:
+        backend {str|function} -- A name of ``JSON_BACKENDS`` ("json", "orjson") or a function
+            serializing an object to bytes
+
+    Example:
+        >>> set_json_backend('json')
+        >>> set_json_backend(lambda obj: rapidjson.dumps(obj).encode('utf-8'))
+    """
+    global _json_dumps
+    if callable(backend):
+        _json_dumps = backend
+    else:
+        try:
+            _json_dumps = JSON_BACKENDS[backend]
+        except KeyError:
+            raise ValueError('Unknown JSON backend: "{}", available backends: {}'.format(
+                backend, ', '.join(sorted(JSON_BACKENDS))))
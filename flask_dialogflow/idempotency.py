@@ -0,0 +1,156 @@
+import threading
+
+from .cache import TTLCache
+
+
+def request_id(data_json):
+    """Default idempotency key: the ``id`` (``responseId`` in v2) of the request, which DialogFlow reuses when it retries."""
+    key = data_json.get('id')
+    return key if key is not None else data_json.get('responseId')
+
+
+class IdempotencyStore:
+    """Base class of the stores keeping the responses of recently completed requests.
+
+    The in-memory default is a :class:`TTLCache`. Subclass this one to share completed
+    responses between processes (Redis, memcached...): ``set`` must expire entries by itself.
+    """
+
+    def get(self, key):
+        """Return the response body stored under ``key``, or None."""
+        raise NotImplementedError()
+
+    def set(self, key, value):
+        """Store the response body ``value`` under ``key``."""
+        raise NotImplementedError()
+
+
+class _Call:
+    __slots__ = ('event', 'future', 'result', 'error')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.future = None
+        self.result = None
+        self.error = None
+
+
+class Idempotency:
+    """Idempotent handling of retried webhook requests.
+
+    Requests with the same key (by default the request ``id``) are coalesced: while one is
+    running, the duplicates wait for its response instead of running the view function again
+    (single-flight). Completed responses are then served from the store until they expire.
+
+    Coalescing happens within a process, the store can be shared (see :class:`IdempotencyStore`).
+
+    Keyword Arguments:
+        store {IdempotencyStore} -- Store of completed responses, defaults to an in-memory :class:`TTLCache` (default: {None})
+        maxsize {int} -- Size of the default store (default: {10000})
+        ttl {float} -- Time to live of the responses in the default store, in seconds (default: {30})
+        key {function} -- Returns the key of a request, or None to not deduplicate it (default: {request_id})
+
+    Example:
+        >>> dialogflow = DialogFlow(app, '/webhook', idempotency=Idempotency(ttl=60))
+    """
+
+    def __init__(self, store=None, maxsize=10000, ttl=30, key=request_id):
+        self.store = store if store is not None else TTLCache(maxsize=maxsize, ttl=ttl)
+        self.key = key
+        self.hits = 0
+        self.coalesced = 0
+        self.executions = 0
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key):
+        """Return the in-flight call of ``key`` and whether the caller must run it."""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = self._calls[key] = _Call()
+                self.executions += 1
+                return call, True
+            self.coalesced += 1
+            return call, False
+
+    def _leave(self, key, call):
+        # stored before the call is removed: a retry arriving in between finds one or the other.
+        # A late view function that missed its deadline may have stored its response already,
+        # the fallback returned meanwhile mustn't replace it
+        try:
+            if call.result is not None and self.store.get(key) is None:
+                self.store.set(key, call.result)
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    def run(self, key, func, *args):
+        """Return the response of the request ``key``, calling ``func(*args)`` only if needed.
+
+        Arguments:
+            key -- The idempotency key of the request
+            func {function} -- Computes the response body
+
+        Returns:
+            [bytes] -- The response body (None if the view function returned nothing)
+        """
+        body = self.store.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        call, leader = self._join(key)
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func(*args)
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            self._leave(key, call)
+            call.event.set()
+        return call.result
+
+    async def run_async(self, key, func, *args):
+        """Coroutine counterpart of :meth:`run`, ``func(*args)`` returns an awaitable."""
+        import asyncio
+
+        body = self.store.get(key)
+        if body is not None:
+            self.hits += 1
+            return body
+
+        call, leader = self._join(key)
+        if not leader:
+            if call.future is not None:
+                return await asyncio.shield(call.future)
+            # the leader runs on a thread, don't block the event loop while waiting for it
+            await asyncio.get_running_loop().run_in_executor(None, call.event.wait)
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        call.future = asyncio.get_running_loop().create_future()
+        try:
+            call.result = await func(*args)
+        except BaseException as error:
+            call.error = error
+            if isinstance(error, asyncio.CancelledError):
+                call.future.cancel()
+            else:
+                call.future.set_exception(error)
+                # the exception is re-raised below, don't warn if no duplicate retrieves it
+                call.future.exception()
+            raise
+        else:
+            call.future.set_result(call.result)
+        finally:
+            self._leave(key, call)
+            call.event.set()
+        return call.result
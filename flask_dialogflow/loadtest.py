@@ -0,0 +1,513 @@
+"""Load generator replaying DialogFlow webhook requests against an application.
+
+Requests come from a JSONL file of captured payloads (``.gz`` files are read transparently,
+lines holding a ``request`` member, as written by the traffic capture, are unwrapped) or are
+synthesized from a template. They are sent in process to a WSGI or ASGI application given by
+its import path (a :class:`Dispatcher` or :class:`DialogFlow` works too), or over HTTP to a
+running server, by concurrent threads or asyncio tasks.
+
+The report gives the throughput, the error rate, latency percentiles and a per-action breakdown.
+
+Run it with::
+
+    $ python -m flask_dialogflow.loadtest --app samples/square/app.py:app --route /webhook \\
+          --action math.square --param number=12 --requests 10000 --concurrency 8
+    $ python -m flask_dialogflow.loadtest --app myagent:app --payloads traffic.jsonl.gz --duration 30
+    $ python -m flask_dialogflow.loadtest --url http://localhost:8090/webhook --mode asyncio --concurrency 64
+"""
+import argparse
+import copy
+import gzip
+import importlib
+import importlib.util
+import inspect
+import io
+import itertools
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from urllib.parse import urlsplit
+
+#: Request synthesized when no template is given, shaped like the requests of DialogFlow (v1).
+TEMPLATE = {
+    'id': '',
+    'timestamp': '2018-02-17T11:26:58.76Z',
+    'lang': 'en',
+    'result': {
+        'source': 'agent',
+        'resolvedQuery': 'hello',
+        'speech': '',
+        'action': 'hello',
+        'actionIncomplete': False,
+        'parameters': {},
+        'contexts': [],
+        'metadata': {'intentId': '', 'webhookUsed': 'true', 'intentName': 'hello'},
+        'fulfillment': {'speech': '', 'messages': [{'type': 0, 'speech': ''}]},
+        'score': 1.0,
+    },
+    'status': {'code': 200, 'errorType': 'success'},
+    'sessionId': '',
+}
+
+
+def load_payloads(path):
+    """Read the requests of a JSONL file, gzip compressed if its name ends with ``.gz``.
+
+    Returns:
+        [list[dict]] -- The requests
+    """
+    opener = gzip.open if path.endswith('.gz') else open
+    payloads = []
+    with opener(path, 'rt', encoding='utf-8') as lines:
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            payload = json.loads(line)
+            if 'result' not in payload and 'queryResult' not in payload and 'request' in payload:
+                payload = payload['request']
+            payloads.append(payload)
+    if not payloads:
+        raise ValueError('No request found in {}'.format(path))
+    return payloads
+
+
+def synthesize(template, actions, parameters, count, sessions=100):
+    """Build ``count`` requests from ``template``, with unique ids.
+
+    Arguments:
+        template {dict} -- The request to copy
+        actions {list[str]} -- Actions used in turn, the action of the template if empty
+        parameters {dict} -- Parameters merged into the ones of the template
+        count {int} -- Number of requests
+
+    Keyword Arguments:
+        sessions {int} -- Number of distinct ``sessionId`` used in turn (default: {100})
+
+    Returns:
+        [list[dict]] -- The requests
+    """
+    session_ids = [str(uuid.uuid4()) for _ in range(max(1, sessions))]
+    payloads = []
+    for i in range(count):
+        payload = copy.deepcopy(template)
+        result = payload.setdefault('result', {})
+        if actions:
+            result['action'] = actions[i % len(actions)]
+        result.setdefault('parameters', {}).update(parameters)
+        payload['id'] = str(uuid.uuid4())
+        payload['sessionId'] = session_ids[i % len(session_ids)]
+        payloads.append(payload)
+    return payloads
+
+
+def action_of(payload):
+    result = payload.get('result') or payload.get('queryResult') or {}
+    return result.get('action') or 'unknown'
+
+
+def load_app(path):
+    """Import the application named by ``module:attribute`` (the module can be a ``.py`` file path).
+
+    Dispatchers are turned into WSGI or ASGI applications by :func:`run`.
+    """
+    module_name, _, attribute = path.partition(':')
+    if module_name.endswith('.py'):
+        directory = os.path.dirname(os.path.abspath(module_name))
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+        spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(module_name))[0], module_name)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    else:
+        if os.getcwd() not in sys.path:
+            sys.path.insert(0, os.getcwd())
+        module = importlib.import_module(module_name)
+    return getattr(module, attribute or 'app')
+
+
+def is_asgi(app):
+    return inspect.iscoroutinefunction(app) or inspect.iscoroutinefunction(getattr(app, '__call__', None))
+
+
+def wsgi_sender(app, route, headers):
+    """Return a function sending a request body to a WSGI application, it returns the status code."""
+    environ = {
+        'REQUEST_METHOD': 'POST', 'PATH_INFO': route, 'SCRIPT_NAME': '', 'QUERY_STRING': '',
+        'SERVER_NAME': 'localhost', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'CONTENT_TYPE': 'application/json', 'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http',
+        'wsgi.errors': sys.stderr, 'wsgi.multithread': True, 'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for name, value in headers:
+        environ['HTTP_' + name.upper().replace('-', '_')] = value
+
+    def send(body):
+        statuses = []
+        request_environ = dict(environ, CONTENT_LENGTH=str(len(body)))
+        request_environ['wsgi.input'] = io.BytesIO(body)
+        result = app(request_environ, lambda status, response_headers, exc_info=None: statuses.append(status))
+        try:
+            for _ in result:
+                pass
+        finally:
+            if hasattr(result, 'close'):
+                result.close()
+        return int(statuses[0].split(' ', 1)[0])
+    return send
+
+
+def http_sender(url, headers):
+    """Return a function sending a request body over HTTP, with one keep-alive connection per thread."""
+    import http.client
+    parts = urlsplit(url)
+    connection_class = http.client.HTTPSConnection if parts.scheme == 'https' else http.client.HTTPConnection
+    path = parts.path or '/'
+    request_headers = dict(headers, **{'Content-Type': 'application/json'})
+    local = threading.local()
+
+    def send(body):
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = local.connection = connection_class(parts.netloc, timeout=30)
+        try:
+            connection.request('POST', path, body, request_headers)
+            response = connection.getresponse()
+            response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            local.connection = None
+            raise
+        return response.status
+    return send
+
+
+def asgi_sender(app, route, headers):
+    """Return a coroutine function sending a request body to an ASGI application."""
+    scope_headers = [(b'content-type', b'application/json')]
+    scope_headers.extend((name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers)
+
+    async def send(body):
+        scope = {'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1',
+                 'method': 'POST', 'path': route, 'raw_path': route.encode('latin-1'),
+                 'query_string': b'', 'headers': scope_headers + [(b'content-length', str(len(body)).encode('ascii'))]}
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        statuses = []
+
+        async def receive():
+            return messages.pop() if messages else {'type': 'http.disconnect'}
+
+        async def reply(message):
+            if message['type'] == 'http.response.start':
+                statuses.append(message['status'])
+
+        await app(scope, receive, reply)
+        return statuses[0]
+    return send
+
+
+def async_http_sender(url, headers):
+    """Return a coroutine function sending a request body over HTTP/1.1, with a pool of keep-alive connections."""
+    import asyncio
+    parts = urlsplit(url)
+    host = parts.hostname
+    port = parts.port or (443 if parts.scheme == 'https' else 80)
+    head = 'POST {} HTTP/1.1\r\nHost: {}\r\nContent-Type: application/json\r\n'.format(
+        parts.path or '/', parts.netloc)
+    head += ''.join('{}: {}\r\n'.format(name, value) for name, value in headers)
+    idle = []
+
+    async def send(body):
+        if idle:
+            reader, writer = idle.pop()
+        else:
+            reader, writer = await asyncio.open_connection(host, port, ssl=parts.scheme == 'https' or None)
+        try:
+            writer.write('{}Content-Length: {}\r\n\r\n'.format(head, len(body)).encode('latin-1') + body)
+            version, status = (await reader.readline()).split()[:2]
+            keep_alive = version == b'HTTP/1.1'
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b'\r\n', b''):
+                    break
+                name, _, value = line.decode('latin-1').partition(':')
+                name, value = name.strip().lower(), value.strip().lower()
+                if name == 'content-length':
+                    length = int(value)
+                elif name == 'connection':
+                    keep_alive = value == 'keep-alive' or (keep_alive and value != 'close')
+            await reader.readexactly(length)
+        except Exception:
+            writer.close()
+            raise
+        if keep_alive:
+            idle.append((reader, writer))
+        else:
+            writer.close()
+        return int(status)
+    return send
+
+
+class Results:
+    """Latencies and statuses of the requests sent, per action."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self._lock = threading.Lock()
+
+    def add(self, samples):
+        """Merge a list of ``(action, latency, ok)`` samples."""
+        with self._lock:
+            for action, latency, ok in samples:
+                self.latencies.setdefault(action, []).append(latency)
+                if not ok:
+                    self.errors[action] = self.errors.get(action, 0) + 1
+
+    def summary(self, elapsed):
+        """Return the report as a JSON compatible dict."""
+        def stats(latencies, errors):
+            latencies = sorted(latencies)
+            return {
+                'requests': len(latencies),
+                'errors': errors,
+                'error_rate': errors / len(latencies) if latencies else 0.0,
+                'p50_ms': percentile(latencies, 0.50) * 1e3,
+                'p90_ms': percentile(latencies, 0.90) * 1e3,
+                'p99_ms': percentile(latencies, 0.99) * 1e3,
+                'max_ms': (latencies[-1] if latencies else 0.0) * 1e3,
+            }
+        every = list(itertools.chain.from_iterable(self.latencies.values()))
+        total = stats(every, sum(self.errors.values()))
+        total['elapsed_s'] = elapsed
+        total['rps'] = len(every) / elapsed if elapsed else 0.0
+        total['actions'] = {action: stats(latencies, self.errors.get(action, 0))
+                            for action, latencies in sorted(self.latencies.items())}
+        return total
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+
+def _schedule(payloads, requests, duration):
+    """Return a thread safe ``next_request()`` returning ``(action, body)`` or None when done."""
+    bodies = [(action_of(payload), json.dumps(payload).encode('utf-8')) for payload in payloads]
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration if duration else None
+
+    def next_request():
+        i = next(counter)
+        if deadline is not None:
+            if time.perf_counter() >= deadline:
+                return None
+        elif i >= requests:
+            return None
+        return bodies[i % len(bodies)]
+    return next_request
+
+
+def run_threads(send, payloads, concurrency, requests=None, duration=None):
+    """Send the requests from ``concurrency`` threads.
+
+    Returns:
+        [tuple(Results, float)] -- The results and the elapsed time in seconds
+    """
+    next_request = _schedule(payloads, requests, duration)
+    results = Results()
+    clock = time.perf_counter
+
+    def worker():
+        samples = []
+        while True:
+            item = next_request()
+            if item is None:
+                break
+            action, body = item
+            start = clock()
+            try:
+                ok = send(body) == 200
+            except Exception:
+                ok = False
+            samples.append((action, clock() - start, ok))
+        results.add(samples)
+
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(concurrency)]
+    start = clock()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, clock() - start
+
+
+def run_asyncio(send, payloads, concurrency, requests=None, duration=None):
+    """Send the requests from ``concurrency`` asyncio tasks, see :func:`run_threads`."""
+    import asyncio
+    next_request = _schedule(payloads, requests, duration)
+    results = Results()
+    clock = time.perf_counter
+
+    async def worker():
+        samples = []
+        while True:
+            item = next_request()
+            if item is None:
+                break
+            action, body = item
+            start = clock()
+            try:
+                ok = await send(body) == 200
+            except Exception:
+                ok = False
+            samples.append((action, clock() - start, ok))
+        results.add(samples)
+
+    async def main():
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    start = clock()
+    asyncio.run(main())
+    return results, clock() - start
+
+
+def run(target, payloads, route='/', headers=(), mode='threads', concurrency=1,
+        requests=None, duration=None, warmup=0):
+    """Replay ``payloads`` against ``target`` and return the report.
+
+    Arguments:
+        target {object|str} -- A WSGI or ASGI application, a :class:`Dispatcher`, or an ``http://`` URL
+        payloads {list[dict]} -- The requests, sent in turn
+
+    Keyword Arguments:
+        route {str} -- Path of the webhook for in-process applications (default: {'/'})
+        headers {list[tuple(str, str)]} -- Extra request headers (default: {()})
+        mode {str} -- ``threads`` or ``asyncio`` (default: {'threads'})
+        concurrency {int} -- Number of concurrent senders (default: {1})
+        requests {int} -- Number of requests to send, unless ``duration`` is given (default: {None})
+        duration {float} -- Send requests for this many seconds (default: {None})
+        warmup {int} -- Requests sent first, not measured (default: {0})
+
+    Returns:
+        [dict] -- The report, see :meth:`Results.summary`
+    """
+    from .core import Dispatcher
+    headers = list(headers)
+    if requests is None and duration is None:
+        requests = len(payloads)
+    if isinstance(target, str):
+        send = (async_http_sender if mode == 'asyncio' else http_sender)(target, headers)
+    elif mode == 'asyncio':
+        if isinstance(target, Dispatcher):
+            target = target.asgi_app(route)
+        if not is_asgi(target):
+            raise ValueError('The asyncio mode needs an ASGI application or a URL')
+        send = asgi_sender(target, route, headers)
+    else:
+        if isinstance(target, Dispatcher):
+            # a DialogFlow instance is served by its Flask application
+            flask_app = getattr(target, 'app', None)
+            target = flask_app if flask_app is not None else target.wsgi_app(route)
+        if is_asgi(target):
+            raise ValueError('The threads mode needs a WSGI application or a URL')
+        send = wsgi_sender(target, route, headers)
+
+    runner = run_asyncio if mode == 'asyncio' else run_threads
+    if warmup:
+        runner(send, payloads, concurrency, requests=warmup)
+    results, elapsed = runner(send, payloads, concurrency, requests=requests, duration=duration)
+    return results.summary(elapsed)
+
+
+def format_report(report):
+    """Render the report as a text table."""
+    row = '{:<32} {:>9} {:>8} {:>9} {:>9} {:>9} {:>9}'
+    lines = [
+        'requests: {requests}  elapsed: {elapsed_s:.2f}s  throughput: {rps:.1f} req/s  '
+        'errors: {errors} ({error_rate:.2%})'.format(**report),
+        '',
+        row.format('action', 'requests', 'errors', 'p50 ms', 'p90 ms', 'p99 ms', 'max ms'),
+    ]
+    for action, stats in list(report['actions'].items()) + [('TOTAL', report)]:
+        lines.append(row.format(
+            action[:32], stats['requests'], stats['errors'], '{:.2f}'.format(stats['p50_ms']),
+            '{:.2f}'.format(stats['p90_ms']), '{:.2f}'.format(stats['p99_ms']),
+            '{:.2f}'.format(stats['max_ms'])))
+    return '\n'.join(lines)
+
+
+def _key_value(text):
+    key, separator, value = text.partition('=')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected KEY=VALUE, got {!r}'.format(text))
+    return key, value
+
+
+def _header(text):
+    name, separator, value = text.partition(':')
+    if not separator:
+        raise argparse.ArgumentTypeError('expected "Name: value", got {!r}'.format(text))
+    return name.strip(), value.strip()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='python -m flask_dialogflow.loadtest', description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument('--app', help='import path of the application, module:attribute or file.py:attribute')
+    target.add_argument('--url', help='URL of a running webhook')
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument('--payloads', metavar='PATH', help='JSONL file of requests (.gz accepted)')
+    source.add_argument('--template', metavar='PATH', help='JSON request to synthesize the requests from')
+    parser.add_argument('--action', action='append', default=[],
+                        help='action of the synthesized requests, used in turn (repeatable)')
+    parser.add_argument('--param', action='append', default=[], type=_key_value,
+                        help='parameter of the synthesized requests, KEY=VALUE (repeatable)')
+    parser.add_argument('--sessions', type=int, default=100, help='distinct sessionId of the synthesized requests')
+    parser.add_argument('--route', default='/', help='path of the webhook, for --app (default: /)')
+    parser.add_argument('--header', action='append', default=[], type=_header,
+                        help='extra request header, "Name: value" (repeatable)')
+    parser.add_argument('--mode', choices=('threads', 'asyncio'), default='threads')
+    parser.add_argument('--concurrency', type=int, default=1, help='concurrent senders (default: 1)')
+    limit = parser.add_mutually_exclusive_group()
+    limit.add_argument('--requests', type=int, help='requests to send (default: 1000)')
+    limit.add_argument('--duration', type=float, help='send requests for this many seconds')
+    parser.add_argument('--warmup', type=int, default=0, help='requests sent first, not measured')
+    parser.add_argument('--json', action='store_true', help='print the report as JSON')
+    args = parser.parse_args(argv)
+    from .core import Dispatcher
+
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+    else:
+        template = TEMPLATE
+        if args.template:
+            with open(args.template) as template_file:
+                template = json.load(template_file)
+        payloads = synthesize(template, args.action, dict(args.param),
+                              min(args.requests or 1000, 10000), args.sessions)
+
+    target = args.url or load_app(args.app)
+    if args.app is not None and not isinstance(target, Dispatcher):
+        if args.mode == 'asyncio' and not is_asgi(target):
+            parser.error('--mode asyncio needs an ASGI application, {} is a WSGI one'.format(args.app))
+        if args.mode == 'threads' and is_asgi(target):
+            parser.error('--mode threads needs a WSGI application, {} is an ASGI one'.format(args.app))
+
+    report = run(target, payloads, route=args.route, headers=args.header,
+                 mode=args.mode, concurrency=args.concurrency,
+                 requests=args.requests if args.duration is None else None,
+                 duration=args.duration, warmup=args.warmup)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+    return 1 if report['requests'] and report['errors'] == report['requests'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
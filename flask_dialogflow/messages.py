@@ -22,25 +22,38 @@ class MessageType(Enum):
     IMAGE = 3
     CUSTOM = 4
     
+def _platform_value(platform):
+    return platform.value if isinstance(platform, Platform) else platform
+
 class Message:
     """Base class of all messages supported by Flask-Dialogflow. 
 
+    Subclasses build their JSON representation in ``to_dict`` from their known fields, the
+    default implementation serializes every instance attribute (useful for custom messages).
+
+    The built-in messages declare their fields in ``__slots__``, so they don't carry an
+    instance ``__dict__``. Subclasses that don't declare ``__slots__`` work as regular classes.
+
     See also: 
         https://docs.python.org/3/tutorial/classes.html#odds-and-ends
     """
-    pass
+    __slots__ = ()
+
+    def to_dict(self):
+        """Return the message as a JSON compatible dict, in DialogFlow format."""
+        return dict(self.__dict__)
 
 class MessageEncoder(json.JSONEncoder):
     """ Custom Python JSON serializers for a Message object.
 
-    Just call the __dict_ member of a Message object when serializing.
+    Just call the to_dict method of a Message object when serializing.
 
     Example:
         json.dumps(res.__dict__, cls=MessageEncoder)
     """
     def default(self, obj): # pylint: disable=E0202
         if isinstance(obj, Message):
-            return obj.__dict__
+            return obj.to_dict()
         return json.JSONEncoder.default(self, obj)
 
 
@@ -56,11 +69,18 @@ class TextMessage(Message):
     See also: 
         https://dialogflow.com/docs/reference/agent/message-objects#text_response_2
     """
+    __slots__ = ('type', 'speech', 'platform')
+
     def __init__(self, speech, platform=None):
         self.type = MessageType.TEXT.value
         self.speech = speech
-        if platform is not None:
-            self.platform = platform
+        self.platform = platform
+
+    def to_dict(self):
+        data = {'type': self.type, 'speech': self.speech}
+        if self.platform is not None:
+            data['platform'] = _platform_value(self.platform)
+        return data
 
 class ImageMessage(Message):
     """A Google Dialog Flow image message. 
@@ -74,11 +94,18 @@ class ImageMessage(Message):
     See also:
         https://dialogflow.com/docs/reference/agent/message-objects#image_message_object
     """
+    __slots__ = ('type', 'imageUrl', 'platform')
+
     def __init__(self, image_url, platform=None):
         self.type = MessageType.IMAGE.value
         self.imageUrl = image_url
-        if platform is not None:
-            self.platform = platform
+        self.platform = platform
+
+    def to_dict(self):
+        data = {'type': self.type, 'imageUrl': self.imageUrl}
+        if self.platform is not None:
+            data['platform'] = _platform_value(self.platform)
+        return data
 
 class QuickReplyMessage(Message):
     """A Google Dialog Flow quick reply  message
@@ -93,12 +120,19 @@ class QuickReplyMessage(Message):
     See also:
         https://dialogflow.com/docs/reference/agent/message-objects#quick_replies_message_object
     """
+    __slots__ = ('type', 'title', 'replies', 'platform')
+
     def __init__(self, title, replies, platform=None):
         self.type = MessageType.QUICK_REPLY.value
         self.title = title
         self.replies = replies
-        if platform is not None:
-            self.platform = platform
+        self.platform = platform
+
+    def to_dict(self):
+        data = {'type': self.type, 'title': self.title, 'replies': self.replies}
+        if self.platform is not None:
+            data['platform'] = _platform_value(self.platform)
+        return data
 
 class CardMessage(Message):
     """A Google Dialog Flow card message
@@ -113,11 +147,19 @@ class CardMessage(Message):
         platform {Platform} -- Specifies the target platform of the message (default: {None})
 
     """
+    __slots__ = ('type', 'buttons', 'imageUrl', 'title', 'subtitle', 'platform')
+
     def __init__(self, buttons, image_url, title, subtitle, platform=None):
         self.type = MessageType.QUICK_REPLY.value
         self.buttons = buttons
         self.imageUrl = image_url
         self.title = title
         self.subtitle = subtitle
-        if platform is not None:
-            self.platform = platform
+        self.platform = platform
+
+    def to_dict(self):
+        data = {'type': self.type, 'buttons': self.buttons, 'imageUrl': self.imageUrl,
+                'title': self.title, 'subtitle': self.subtitle}
+        if self.platform is not None:
+            data['platform'] = _platform_value(self.platform)
+        return data
@@ -0,0 +1,192 @@
+import threading
+from bisect import bisect_left
+
+#: Phases of a webhook request, in order.
+#:
+#: - parse: decoding the JSON body of the request
+#: - bind: resolving the view function, building the request state and looking the action cache up
+#: - handler: binding the parameters and running the view function (waiting on the pool with a deadline)
+#: - serialize: encoding the response
+PHASES = ('parse', 'bind', 'handler', 'serialize')
+
+#: Upper bounds (in seconds) of the latency histogram buckets.
+DEFAULT_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class MetricsSink:
+    """Base class of the objects receiving the measurements of the webhook requests.
+
+    Subclass it to forward measurements to StatsD, OpenTelemetry..., and pass an instance
+    as the ``metrics`` argument of :class:`DialogFlow`.
+    """
+
+    def record(self, action, marks, error=False):
+        """Record one webhook request.
+
+        Arguments:
+            action {str} -- The registered action or pattern the request was routed to,
+                ``'unknown'`` for the default view function or if the request could not be parsed
+            marks {list[float]} -- ``time.perf_counter()`` at the start of the request and at
+                the end of each phase of :data:`PHASES` that was reached. Cached responses stop
+                after the bind phase, failed requests after the last completed phase.
+
+        Keyword Arguments:
+            error {bool} -- Whether the request raised an exception (default: {False})
+        """
+        raise NotImplementedError()
+
+
+class Histogram:
+    """Cumulative latency histogram, in the Prometheus fashion.
+
+    Keyword Arguments:
+        buckets {tuple[float]} -- Sorted upper bounds of the buckets (default: {DEFAULT_BUCKETS})
+    """
+    __slots__ = ('buckets', 'counts', 'sum', 'count')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """Return the ``(upper bound, cumulative count)`` pairs, ending with ``+Inf``."""
+        total = 0
+        pairs = []
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            total += count
+            pairs.append((bound, total))
+        return pairs
+
+
+class ActionStats:
+    """Counters and histograms of one action."""
+    __slots__ = ('requests', 'errors', 'latency', 'phases', '_phases')
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.requests = 0
+        self.errors = 0
+        self.latency = Histogram(buckets)
+        self.phases = {phase: Histogram(buckets) for phase in PHASES}
+        # same histograms in PHASES order, so they can be zipped with the marks
+        self._phases = tuple(self.phases[phase] for phase in PHASES)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _bound(value):
+    return '+Inf' if value == float('inf') else repr(value)
+
+
+class Metrics(MetricsSink):
+    """In-memory per-action request counts, error counts and latency histograms.
+
+    Keyword Arguments:
+        buckets {tuple[float]} -- Upper bounds of the histogram buckets, in seconds (default: {DEFAULT_BUCKETS})
+        labels {dict} -- Labels added to every series, e.g. ``{'agent': 'billing'}`` when one process serves several agents (default: {None})
+
+    Example:
+        >>> metrics = Metrics()
+        >>> dialogflow = DialogFlow(app, '/webhook', metrics=metrics)
+        >>> metrics.actions['math.square'].phases['handler'].sum
+    """
+
+    def __init__(self, buckets=DEFAULT_BUCKETS, labels=None):
+        self.buckets = tuple(buckets)
+        self.labels = dict(labels or {})
+        self.actions = {}
+        self._lock = threading.Lock()
+        self._prefix = ''.join('{}="{}",'.format(name, _label(value))
+                               for name, value in sorted(self.labels.items()))
+
+    def record(self, action, marks, error=False):
+        with self._lock:
+            stats = self.actions.get(action)
+            if stats is None:
+                stats = self.actions[action] = ActionStats(self.buckets)
+            stats.requests += 1
+            if error:
+                stats.errors += 1
+            if len(marks) > 1:
+                stats.latency.observe(marks[-1] - marks[0])
+                for histogram, start, end in zip(stats._phases, marks, marks[1:]):
+                    histogram.observe(end - start)
+
+    def reset(self):
+        """Forget all the measurements."""
+        with self._lock:
+            self.actions = {}
+
+    def prometheus(self):
+        """Render the measurements in the Prometheus text exposition format.
+
+        Returns:
+            [str] -- The exposition text
+        """
+        return prometheus([self])
+
+    def _samples(self):
+        """Return the sample lines of each family of :data:`_FAMILIES`, in order."""
+        with self._lock:
+            actions = sorted(self.actions.items(), key=lambda item: str(item[0]))
+            labels = [(self._prefix + 'action="{}"'.format(_label(action)), stats)
+                      for action, stats in actions]
+            requests = ['dialogflow_requests_total{{{}}} {}'.format(label, stats.requests)
+                        for label, stats in labels]
+            errors = ['dialogflow_errors_total{{{}}} {}'.format(label, stats.errors)
+                      for label, stats in labels]
+            latency = []
+            for label, stats in labels:
+                self._histogram(latency, 'dialogflow_request_duration_seconds', label, stats.latency)
+            phases = []
+            for label, stats in labels:
+                for phase in PHASES:
+                    self._histogram(phases, 'dialogflow_phase_duration_seconds',
+                                    '{},phase="{}"'.format(label, phase), stats.phases[phase])
+        return requests, errors, latency, phases
+
+    @staticmethod
+    def _histogram(lines, name, labels, histogram):
+        for bound, count in histogram.cumulative():
+            lines.append('{}_bucket{{{},le="{}"}} {}'.format(name, labels, _bound(bound), count))
+        lines.append('{}_sum{{{}}} {!r}'.format(name, labels, histogram.sum))
+        lines.append('{}_count{{{}}} {}'.format(name, labels, histogram.count))
+
+
+_FAMILIES = (
+    ('dialogflow_requests_total', 'counter', 'Webhook requests per action.'),
+    ('dialogflow_errors_total', 'counter', 'Webhook requests that raised an exception per action.'),
+    ('dialogflow_request_duration_seconds', 'histogram', 'Webhook request latency per action.'),
+    ('dialogflow_phase_duration_seconds', 'histogram', 'Webhook request latency per action and phase.'),
+)
+
+
+def prometheus(sinks):
+    """Render several :class:`Metrics` in a single Prometheus text exposition.
+
+    Give each sink distinct ``labels`` (e.g. one ``agent`` label per agent) so their series
+    don't clash.
+
+    Arguments:
+        sinks {list[Metrics]} -- The sinks to render
+
+    Returns:
+        [str] -- The exposition text
+    """
+    samples = [sink._samples() for sink in sinks]
+    lines = []
+    for i, (name, kind, description) in enumerate(_FAMILIES):
+        lines.append('# HELP {} {}'.format(name, description))
+        lines.append('# TYPE {} {}'.format(name, kind))
+        for families in samples:
+            lines.extend(families[i])
+    return '\n'.join(lines) + '\n'
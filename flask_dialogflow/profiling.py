@@ -0,0 +1,165 @@
+import hmac
+import io
+import os
+import random
+import threading
+import time
+
+
+class Profiler:
+    """On-demand cProfile of webhook requests, aggregated per action.
+
+    Actions are the registered actions or patterns the requests are routed to, the ones left
+    to the default view function share ``unknown``. A request is profiled when it is sampled
+    (``rate``), when its action is listed in ``actions``, or when it carries the ``header``
+    (with the value ``token``, if set). The statistics of the profiled requests are added up
+    per action over a ``window`` of seconds: at the end of the window they are dumped to
+    ``directory`` (if set, as ``<action>-<timestamp>.prof`` files readable by :mod:`pstats`,
+    snakeviz...) and reset.
+
+    cProfile only sees the thread it runs on: the time a view function with a deadline
+    spends on the thread pool shows up as waiting, and the profile of an ``async def``
+    view function includes the other tasks the event loop ran in the meantime. Requests
+    are not profiled while another profiler is active on the interpreter.
+
+    Keyword Arguments:
+        rate {float} -- Fraction of the requests profiled (default: {0.0})
+        actions {list[str]} -- Registered actions or patterns whose requests are all profiled (default: {()})
+        header {str} -- Header requesting the profiling of a request (default: {'X-Dialogflow-Profile'})
+        token {str} -- Value the header must have, any value is accepted if None (default: {None})
+        window {float} -- Aggregation window, in seconds (default: {300})
+        directory {str} -- Directory the statistics are dumped to at the end of each window (default: {None})
+        timer {function} -- Clock of the windows (default: {time.monotonic})
+
+    Example:
+        >>> profiler = Profiler(rate=0.001, actions=['order.checkout'], directory='/tmp/profiles')
+        >>> dialogflow = DialogFlow(app, '/webhook', profiler=profiler, profile_route='/debug/profile')
+    """
+
+    def __init__(self, rate=0.0, actions=(), header='X-Dialogflow-Profile', token=None,
+                 window=300, directory=None, timer=time.monotonic):
+        self.rate = rate
+        self.actions = frozenset(actions)
+        self.header = header
+        self.token = token
+        self.window = window
+        self.directory = directory
+        self.timer = timer
+        self.profiled = 0
+        self._random = random.random
+        self._stats = {}
+        self._requests = {}
+        self._window_start = timer()
+        self._lock = threading.Lock()
+
+    def requested(self, value):
+        """Tell whether the value of the profiling header requests a profile."""
+        if not value:
+            return False
+        if self.token is None:
+            return True
+        if isinstance(value, bytes):
+            value = value.decode('latin-1')
+        return hmac.compare_digest(value.encode('utf-8'), self.token.encode('utf-8'))
+
+    def wants(self, action):
+        """Tell whether a request of ``action`` is sampled or selected for profiling."""
+        return action in self.actions or (self.rate > 0 and self._random() < self.rate)
+
+    def run(self, action, func, *args):
+        """Call ``func(*args)`` under cProfile and add its statistics to the ones of ``action``."""
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:  # another profiler is active
+            return func(*args)
+        try:
+            return func(*args)
+        finally:
+            profile.disable()
+            self._add(action, profile)
+
+    async def run_async(self, action, func, *args):
+        """Coroutine counterpart of :meth:`run`, ``func`` is a coroutine function."""
+        import cProfile
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return await func(*args)
+        try:
+            return await func(*args)
+        finally:
+            profile.disable()
+            self._add(action, profile)
+
+    def report(self, action=None, sort='cumulative', limit=40):
+        """Render the statistics of the current window as text.
+
+        Keyword Arguments:
+            action {str} -- Only this action, all of them if None (default: {None})
+            sort {str} -- Sort key, see :meth:`pstats.Stats.sort_stats` (default: {'cumulative'})
+            limit {int} -- Number of functions listed per action (default: {40})
+
+        Returns:
+            [str] -- The report
+        """
+        self._roll()
+        output = io.StringIO()
+        with self._lock:
+            for name in sorted(self._stats, key=str):
+                if action is not None and name != action:
+                    continue
+                output.write('=== {} ({} requests) ===\n'.format(name, self._requests[name]))
+                stats = self._stats[name]
+                stats.stream = output
+                stats.sort_stats(sort).print_stats(limit)
+        return output.getvalue() or 'No profiled request.\n'
+
+    def dump(self):
+        """Write the statistics of the current window to ``directory`` and reset them.
+
+        Returns:
+            [list[str]] -- Paths of the written files
+        """
+        with self._lock:
+            stats, self._stats, self._requests = self._stats, {}, {}
+            self._window_start = self.timer()
+        return self._write(stats)
+
+    def _add(self, action, profile):
+        import pstats
+        self._roll()
+        with self._lock:
+            self.profiled += 1
+            stats = self._stats.get(action)
+            if stats is None:
+                self._stats[action] = pstats.Stats(profile)
+            else:
+                stats.add(profile)
+            self._requests[action] = self._requests.get(action, 0) + 1
+
+    def _roll(self):
+        """Start a new window if the current one is over, dumping its statistics."""
+        if self.timer() - self._window_start < self.window:
+            return
+        with self._lock:
+            if self.timer() - self._window_start < self.window:
+                return
+            stats, self._stats, self._requests = self._stats, {}, {}
+            self._window_start = self.timer()
+        self._write(stats)
+
+    def _write(self, stats):
+        if self.directory is None or not stats:
+            return []
+        os.makedirs(self.directory, exist_ok=True)
+        timestamp = time.strftime('%Y%m%d-%H%M%S')
+        paths = []
+        for action, action_stats in stats.items():
+            name = ''.join(c if c.isalnum() or c in '._-' else '_' for c in str(action))
+            path = os.path.join(self.directory, '{}-{}.prof'.format(name, timestamp))
+            action_stats.dump_stats(path)
+            paths.append(path)
+        return paths
@@ -1,4 +1,5 @@
-from .helpers import TypedList
+from .formats import V1, contexts_v2, response_v2
+from .helpers import TypedList, json_dumps
 from .messages import Message
 
 class Response:
@@ -15,4 +16,125 @@ class Response:
         self.messages = TypedList(Message)
 
     def append(self, msg):
-        self.messages.append(msg)
\ No newline at end of file
+        self.messages.append(msg)
+
+    def extend(self, msgs):
+        """Append many messages at once, e.g. the cards of a carousel.
+
+        All the messages are validated in a single pass before any of them is added.
+
+        Arguments:
+            msgs {iterable[Message]} -- The messages to append
+        """
+        self.messages.extend(msgs)
+
+    def to_dict(self):
+        """Return the response as a JSON compatible dict, in DialogFlow format.
+
+        Each message is converted with its own ``to_dict``, extra attributes set on the
+        response (e.g. ``contextOut``) are kept as they are.
+        """
+        data = dict(self.__dict__)
+        data['messages'] = [msg.to_dict() for msg in self.messages]
+        return data
+
+    def to_json(self):
+        """Serialize the response with the configured JSON backend.
+
+        Returns:
+            [bytes] -- The UTF-8 encoded JSON document
+
+        See also:
+            flask_dialogflow.helpers.set_json_backend
+        """
+        return json_dumps(self.to_dict())
+
+    def render(self, context_out=None, version=V1, session=None):
+        """Serialize the response to the body sent back to Google DialogFlow.
+
+        Keyword Arguments:
+            context_out {context} -- The output context of the request, overrides ``contextOut`` (default: {None})
+            version {int} -- Version of the webhook format of the request, 1 or 2 (default: {1})
+            session {str} -- The ``session`` of a v2 request, it qualifies the output context names (default: {None})
+
+        Returns:
+            [bytes] -- The UTF-8 encoded JSON document
+        """
+        data = self.to_dict()
+        if context_out is not None:
+            data['contextOut'] = context_out
+        if version != V1:
+            data = response_v2(data, session)
+        return json_dumps(data)
+
+    def freeze(self):
+        """Serialize the response once and return an immutable copy of it.
+
+        Use it for static answers, built once at import time and returned as they are by view
+        functions, without rebuilding or re-encoding the messages on each request.
+
+        Returns:
+            [FrozenResponse] -- The frozen response
+
+        Example:
+            >>> HOURS = Response()
+            >>> HOURS.append(TextMessage(speech='Our hours are 9-5'))
+            >>> HOURS = HOURS.freeze()
+            >>>
+            >>> @dialogflow.action('store.hours')
+            >>> def hours():
+            >>>     return HOURS
+        """
+        return FrozenResponse(self)
+
+
+class FrozenResponse:
+    """A response serialized once, see :meth:`Response.freeze`.
+
+    The body is kept as bytes, in both webhook formats. A per-request output context is merged
+    by splicing its JSON into the pre-serialized body, the messages are never encoded again.
+
+    Arguments:
+        response {Response} -- The response to freeze
+    """
+    __slots__ = ('body', '_head', '_head_v2', '_context_out')
+
+    def __init__(self, response):
+        data = response.to_dict()
+        context_out = data.pop('contextOut', None)
+        # "messages" is always there, so the head always ends with a value: '{"messages":[...]'
+        self._head = json_dumps(data).rstrip()[:-1]
+        # and so is "fulfillmentMessages" in v2, the output contexts depend on the session
+        self._head_v2 = json_dumps(response_v2(data)).rstrip()[:-1]
+        self._context_out = context_out
+        if context_out is not None:
+            self.body = self._splice(context_out)
+        else:
+            self.body = self._head + b'}'
+
+    def _splice(self, context_out):
+        return self._head + b',"contextOut":' + json_dumps(context_out) + b'}'
+
+    def render(self, context_out=None, version=V1, session=None):
+        """Return the body sent back to Google DialogFlow.
+
+        Keyword Arguments:
+            context_out {context} -- The output context of the request, overrides ``contextOut`` (default: {None})
+            version {int} -- Version of the webhook format of the request, 1 or 2 (default: {1})
+            session {str} -- The ``session`` of a v2 request, it qualifies the output context names (default: {None})
+
+        Returns:
+            [bytes] -- The UTF-8 encoded JSON document
+        """
+        if version == V1:
+            if context_out is None:
+                return self.body
+            return self._splice(context_out)
+        if context_out is None:
+            context_out = self._context_out
+            if context_out is None:
+                return self._head_v2 + b'}'
+        return self._head_v2 + b',"outputContexts":' + json_dumps(contexts_v2(context_out, session)) + b'}'
+
+    def to_json(self):
+        return self.body
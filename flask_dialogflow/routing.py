@@ -0,0 +1,123 @@
+import re
+
+_PARAM = re.compile(r'^\{([A-Za-z_][A-Za-z0-9_]*)\}$')
+
+
+def is_pattern(name):
+    """Tell whether an action name is a pattern rather than an exact name."""
+    return '*' in name or '{' in name
+
+
+class _Node:
+    __slots__ = ('children', 'param', 'terminal', 'rest')
+
+    def __init__(self):
+        self.children = {}
+        self.param = None
+        self.terminal = None
+        self.rest = None
+
+
+class Router:
+    """Index of action name patterns, compiled into a trie of dot separated segments.
+
+    Patterns are made of literal segments and of:
+
+    * ``{name}``, matching exactly one segment, passed to the view function as the ``name`` parameter
+    * ``*``, matching exactly one segment, or when it is the last segment one or more segments
+
+    ``smalltalk.*`` matches ``smalltalk.greetings.hello``, ``order.{step}`` matches
+    ``order.payment`` with ``step='payment'``. When several patterns match, literal segments
+    win over ``{name}`` and ``*`` segments, which win over a trailing ``*``.
+
+    Matching walks the trie once per segment of the action name, and the results (misses
+    included) are kept in a bounded cache, so repeated actions are resolved with a single dict
+    lookup. Exact names don't belong here, the dispatcher keeps them in a plain dict.
+
+    Keyword Arguments:
+        cache_size {int} -- Maximum number of resolved action names kept, the cache is cleared when full (default: {4096})
+    """
+
+    def __init__(self, cache_size=4096):
+        self.cache_size = cache_size
+        self._root = _Node()
+        self._resolved = {}
+
+    def add(self, pattern, value):
+        """Register ``value`` under ``pattern``, replacing the previous value of the same pattern.
+
+        Raises:
+            ValueError -- If a segment mixes wildcards and literal text
+        """
+        segments = pattern.split('.')
+        names = []
+        node = self._root
+        for i, segment in enumerate(segments):
+            if segment == '*' and i == len(segments) - 1:
+                node.rest = (pattern, value, tuple(names) + (None,))
+                self._resolved.clear()
+                return
+            if segment == '*':
+                names.append(None)
+            elif segment.startswith('{'):
+                match = _PARAM.match(segment)
+                if match is None:
+                    raise ValueError('Invalid segment "{}" in action pattern "{}"'.format(segment, pattern))
+                names.append(match.group(1))
+            elif '*' in segment or '{' in segment:
+                raise ValueError('Invalid segment "{}" in action pattern "{}"'.format(segment, pattern))
+            else:
+                child = node.children.get(segment)
+                if child is None:
+                    child = node.children[segment] = _Node()
+                node = child
+                continue
+            if node.param is None:
+                node.param = _Node()
+            node = node.param
+        node.terminal = (pattern, value, tuple(names))
+        self._resolved.clear()
+
+    def match(self, action):
+        """Resolve an action name.
+
+        Returns:
+            [tuple(str, object, dict)] -- The matching pattern, its value and the ``{name}``
+                segments (or None if it has none), or None if no pattern matches
+        """
+        try:
+            return self._resolved[action]
+        except KeyError:
+            pass
+        captured = []
+        entry = self._walk(self._root, action.split('.'), 0, captured)
+        if entry is None:
+            result = None
+        else:
+            pattern, value, names = entry
+            params = {name: segment for name, segment in zip(names, captured) if name is not None}
+            result = (pattern, value, params or None)
+        if len(self._resolved) >= self.cache_size:
+            self._resolved.clear()
+        self._resolved[action] = result
+        return result
+
+    def _walk(self, node, segments, i, captured):
+        if i == len(segments):
+            return node.terminal
+        segment = segments[i]
+        child = node.children.get(segment)
+        if child is not None:
+            entry = self._walk(child, segments, i + 1, captured)
+            if entry is not None:
+                return entry
+        if node.param is not None:
+            captured.append(segment)
+            entry = self._walk(node.param, segments, i + 1, captured)
+            if entry is not None:
+                return entry
+            captured.pop()
+        if node.rest is not None:
+            captured.append('.'.join(segments[i:]))
+            return node.rest
+        return None
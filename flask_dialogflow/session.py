@@ -0,0 +1,264 @@
+import atexit
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from .metrics import Histogram
+
+
+class SessionBackend:
+    """Base class of the persistent storages of session state.
+
+    Sessions are dicts of JSON compatible values, keyed by the ``sessionId`` of the requests.
+    """
+
+    def load(self, session_id):
+        """Return the state of a session, or None if it is unknown."""
+        raise NotImplementedError()
+
+    def save_many(self, sessions):
+        """Persist a batch of sessions.
+
+        Arguments:
+            sessions {dict} -- Session id -> session state
+        """
+        raise NotImplementedError()
+
+    def delete(self, session_id):
+        """Forget a session."""
+        raise NotImplementedError()
+
+
+class MemoryBackend(SessionBackend):
+    """Sessions kept in a dict of the process, for tests and single process deployments."""
+
+    def __init__(self):
+        self.sessions = {}
+        self._lock = threading.Lock()
+
+    def load(self, session_id):
+        with self._lock:
+            data = self.sessions.get(session_id)
+        return dict(data) if data is not None else None
+
+    def save_many(self, sessions):
+        with self._lock:
+            self.sessions.update(sessions)
+
+    def delete(self, session_id):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+
+
+class SQLiteBackend(SessionBackend):
+    """Sessions stored as JSON in a SQLite database file, for local development and testing.
+
+    Arguments:
+        path {str} -- Path of the database file, ``:memory:`` for a private in-memory database
+    """
+
+    def __init__(self, path):
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                'CREATE TABLE IF NOT EXISTS dialogflow_sessions '
+                '(id TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)')
+
+    def load(self, session_id):
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT data FROM dialogflow_sessions WHERE id = ?', (session_id,)).fetchone()
+        return json.loads(row[0]) if row is not None else None
+
+    def save_many(self, sessions):
+        now = time.time()
+        rows = [(session_id, json.dumps(data), now) for session_id, data in sessions.items()]
+        with self._lock, self._connection:
+            self._connection.executemany(
+                'INSERT OR REPLACE INTO dialogflow_sessions (id, data, updated) VALUES (?, ?, ?)', rows)
+
+    def delete(self, session_id):
+        with self._lock, self._connection:
+            self._connection.execute('DELETE FROM dialogflow_sessions WHERE id = ?', (session_id,))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+class SessionStore:
+    """Per-session state with an in-process LRU cache and write-behind persistence.
+
+    Sessions read by a view function are served from the LRU cache, or loaded from the backend.
+    Once the response is ready they are queued, and a background thread writes the queued
+    sessions to the backend in batches, every ``flush_interval`` seconds or as soon as
+    ``batch_size`` sessions are waiting. Queued sessions are served to later requests until they
+    are written, so nothing is lost when they are evicted from the cache. After a failed write
+    they are retried ``flush_interval`` seconds later.
+
+    Keyword Arguments:
+        backend {SessionBackend} -- Persistent storage (default: {MemoryBackend()})
+        maxsize {int} -- Number of sessions kept in the LRU cache (default: {1024})
+        flush_interval {float} -- Maximum delay before queued sessions are written, in seconds (default: {1.0})
+        batch_size {int} -- Number of queued sessions that triggers an early write (default: {100})
+
+    Example:
+        >>> dialogflow = DialogFlow(app, '/webhook', sessions=SessionStore(SQLiteBackend('sessions.db')))
+        >>>
+        >>> @dialogflow.action('cart.add')
+        >>> def add(product):
+        >>>     dialogflow.session.setdefault('cart', []).append(product)
+    """
+
+    def __init__(self, backend=None, maxsize=1024, flush_interval=1.0, batch_size=100):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.maxsize = maxsize
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.hits = 0
+        self.misses = 0
+        self.flushes = 0
+        self.flushed_sessions = 0
+        self.flush_errors = 0
+        self.flush_latency = Histogram()
+        self._cache = OrderedDict()
+        self._dirty = {}
+        self._lock = threading.Lock()
+        self._condition = threading.Condition(self._lock)
+        self._flusher = None
+        self._closed = False
+
+    @property
+    def hit_rate(self):
+        """Fraction of the session reads served without reaching the backend."""
+        reads = self.hits + self.misses
+        return self.hits / reads if reads else 0.0
+
+    def get(self, session_id):
+        """Return the state of a session, an empty dict for a new session.
+
+        Arguments:
+            session_id {str} -- The ``sessionId`` of the request
+
+        Returns:
+            [dict] -- The session state
+        """
+        with self._lock:
+            data = self._cache.get(session_id)
+            if data is not None:
+                self._cache.move_to_end(session_id)
+                self.hits += 1
+                return data
+            data = self._dirty.get(session_id)
+            if data is not None:
+                self.hits += 1
+                data = dict(data)
+                self._remember(session_id, data)
+                return data
+            self.misses += 1
+
+        data = self.backend.load(session_id)
+        if data is None:
+            data = {}
+        with self._lock:
+            self._remember(session_id, data)
+        return data
+
+    def save(self, session_id, data):
+        """Queue a session to be written to the backend, without waiting for the write.
+
+        Arguments:
+            session_id {str} -- The ``sessionId`` of the request
+            data {dict} -- The session state
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('The session store is closed.')
+            self._remember(session_id, data)
+            # shallow snapshot, so the flusher doesn't see a dict being modified
+            self._dirty[session_id] = dict(data)
+            if self._flusher is None:
+                self._start()
+            if len(self._dirty) >= self.batch_size:
+                self._condition.notify()
+
+    def delete(self, session_id):
+        """Forget a session, in the cache and in the backend."""
+        with self._lock:
+            self._cache.pop(session_id, None)
+            self._dirty.pop(session_id, None)
+        self.backend.delete(session_id)
+
+    def flush(self):
+        """Write the queued sessions to the backend now, in the calling thread."""
+        with self._lock:
+            batch, self._dirty = self._dirty, {}
+        if not batch:
+            return
+        start = time.perf_counter()
+        try:
+            self.backend.save_many(batch)
+        except Exception:
+            with self._lock:
+                self.flush_errors += 1
+                # keep the failed sessions for the next flush, unless they were saved again
+                for session_id, data in batch.items():
+                    self._dirty.setdefault(session_id, data)
+            raise
+        self.flush_latency.observe(time.perf_counter() - start)
+        self.flushes += 1
+        self.flushed_sessions += len(batch)
+
+    def close(self):
+        """Stop the background thread and write the queued sessions."""
+        with self._lock:
+            self._closed = True
+            flusher, self._flusher = self._flusher, None
+            self._condition.notify()
+        if flusher is not None:
+            flusher.join()
+        self.flush()
+
+    def _remember(self, session_id, data):
+        self._cache[session_id] = data
+        self._cache.move_to_end(session_id)
+        while len(self._cache) > self.maxsize:
+            self._cache.popitem(last=False)
+
+    def _start(self):
+        self._flusher = threading.Thread(
+            target=self._run, name='flask-dialogflow-sessions', daemon=True)
+        self._flusher.start()
+        atexit.register(self._close_at_exit)
+
+    def _close_at_exit(self):
+        try:
+            self.close()
+        except Exception:
+            import logging
+            logging.getLogger('flask_dialogflow').exception('Queued sessions lost at exit')
+
+    def _run(self):
+        failed = False
+        while True:
+            with self._lock:
+                if failed:
+                    # the failed sessions still fill a batch, wait before retrying anyway
+                    retry_at = time.monotonic() + self.flush_interval
+                    while not self._closed and time.monotonic() < retry_at:
+                        self._condition.wait(retry_at - time.monotonic())
+                elif not self._closed and len(self._dirty) < self.batch_size:
+                    self._condition.wait(self.flush_interval)
+                if self._closed:
+                    return
+            try:
+                self.flush()
+                failed = False
+            except Exception:
+                # counted in flush_errors, the sessions are retried on the next flush
+                failed = True
@@ -0,0 +1,129 @@
+import time
+
+from .formats import V1, context_v1
+
+_UNSET = object()
+
+
+class RequestState:
+    """Lazy view of the DialogFlow request being processed.
+
+    One instance is created for every webhook call and made current through a
+    :class:`contextvars.ContextVar`, so it follows the request across threads and
+    coroutines without depending on the Flask application context.
+
+    Only the action is read up front. The intent, the input contexts and the original
+    request are looked up in the payload the first time a view function reads them, and
+    the index used by :meth:`get_context` is built on its first call, so view functions that
+    ignore large ``originalRequest`` blobs or dozens of contexts don't pay for them.
+
+    v2 requests are presented like v1 ones: the intent is the ``displayName`` of the intent,
+    input contexts have their short name and a ``lifespan``, the original request is the
+    ``originalDetectIntentRequest``.
+
+    Keyword Arguments:
+        data {dict} -- The request sent by Google DialogFlow (default: {None})
+        action {str} -- Name of the action of the request (default: {None})
+        version {int} -- Version of the webhook format of the request, 1 or 2 (default: {1})
+    """
+
+    __slots__ = ('data', 'action', 'version', 'route', 'started', 'context_out', 'session', 'deferred',
+                 '_intent', '_context_in', '_original_request', '_contexts_by_name')
+
+    def __init__(self, data=None, action=None, version=V1):
+        self.data = data if data is not None else {}
+        self.action = action
+        self.version = version
+        # registered action name or pattern the action was routed to, None for the default view function
+        self.route = action
+        # time.monotonic() when the request was prepared, the time left to answer it is counted from it
+        self.started = time.monotonic()
+        self.context_out = None
+        self.session = None
+        # (task queue, function, args, kwargs) submitted once the response is ready
+        self.deferred = None
+        self._intent = _UNSET
+        self._context_in = _UNSET
+        self._original_request = _UNSET
+        self._contexts_by_name = None
+
+    @property
+    def session_id(self):
+        """The ``sessionId`` of the request, the ``session`` of a v2 request."""
+        if self.version == V1:
+            return self.data.get('sessionId')
+        return self.data.get('session')
+
+    @property
+    def intent(self):
+        """Name of the intent fired."""
+        if self._intent is _UNSET:
+            if self.version == V1:
+                self._intent = self.data.get('result', {}).get('metadata', {}).get('intentName')
+            else:
+                self._intent = self.data.get('queryResult', {}).get('intent', {}).get('displayName')
+        return self._intent
+
+    @intent.setter
+    def intent(self, value):
+        self._intent = value
+
+    @property
+    def context_in(self):
+        """Contexts received from DialogFlow."""
+        if self._context_in is _UNSET:
+            if self.version == V1:
+                self._context_in = self.data.get('result', {}).get('contexts', [])
+            else:
+                self._context_in = [context_v1(context) for context
+                                    in self.data.get('queryResult', {}).get('outputContexts', [])]
+        return self._context_in
+
+    @context_in.setter
+    def context_in(self, value):
+        self._context_in = value
+        self._contexts_by_name = None
+
+    @property
+    def original_request(self):
+        """Data of the 1-click integration provider."""
+        if self._original_request is _UNSET:
+            key = 'originalRequest' if self.version == V1 else 'originalDetectIntentRequest'
+            self._original_request = self.data.get(key, None)
+        return self._original_request
+
+    @original_request.setter
+    def original_request(self, value):
+        self._original_request = value
+
+    def get_context(self, name):
+        """Return the input context named ``name`` (case insensitive), or None.
+
+        The name index is built on the first call, lookups are then O(1).
+        """
+        if self._contexts_by_name is None:
+            self._contexts_by_name = {
+                context['name'].lower(): context for context in self.context_in}
+        return self._contexts_by_name.get(name.lower())
+
+    def copy(self):
+        """Return a fresh view of the same request, without output context."""
+        state = RequestState(self.data, self.action, self.version)
+        state.route = self.route
+        state.started = self.started
+        return state
+
+
+def get_state(var):
+    """Return the state of the current request.
+
+    Arguments:
+        var {ContextVar} -- The variable holding the state, each dispatcher has its own
+
+    Raises:
+        RuntimeError -- When called outside of a DialogFlow request
+    """
+    state = var.get()
+    if state is None:
+        raise RuntimeError('Working outside of a DialogFlow request.')
+    return state
@@ -0,0 +1,90 @@
+import atexit
+import logging
+import threading
+
+logger = logging.getLogger('flask_dialogflow')
+
+
+class TaskQueue:
+    """Bounded pool running background work deferred by view functions.
+
+    At most ``max_pending`` tasks are queued or running, tasks submitted beyond that are
+    dropped (and counted) instead of piling up in memory: back-pressure protects the webhook
+    when the backends the tasks talk to are slow. Exceptions raised by tasks are logged on the
+    ``flask_dialogflow`` logger. Pending tasks are drained on :meth:`shutdown` and at exit.
+
+    Keyword Arguments:
+        max_workers {int} -- Number of worker threads or processes (default: {4})
+        max_pending {int} -- Maximum number of queued or running tasks (default: {1000})
+        processes {bool} -- Use a process pool, for CPU heavy tasks. Tasks and their arguments must be picklable (default: {False})
+    """
+
+    def __init__(self, max_workers=4, max_pending=1000, processes=False):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.processes = processes
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped = 0
+        self._pending = 0
+        self._executor = None
+        self._closed = False
+        self._lock = threading.Lock()
+
+    @property
+    def pending(self):
+        """Number of tasks queued or running (the queue depth)."""
+        return self._pending
+
+    def submit(self, fn, *args, **kwargs):
+        """Run ``fn(*args, **kwargs)`` in the pool.
+
+        Returns:
+            [bool] -- False if the task was dropped because the queue is full or shut down
+        """
+        with self._lock:
+            if self._closed or self._pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self._pending += 1
+            self.submitted += 1
+            if self._executor is None:
+                self._start()
+            executor = self._executor
+        future = executor.submit(fn, *args, **kwargs)
+        future.add_done_callback(self._done)
+        return True
+
+    def shutdown(self, wait=True):
+        """Stop accepting tasks and release the pool.
+
+        Keyword Arguments:
+            wait {bool} -- Wait for the pending tasks to complete (default: {True})
+        """
+        with self._lock:
+            self._closed = True
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=wait)
+
+    def _start(self):
+        if self.processes:
+            from concurrent.futures import ProcessPoolExecutor
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            from concurrent.futures import ThreadPoolExecutor
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix='flask-dialogflow-tasks')
+        atexit.register(self.shutdown)
+
+    def _done(self, future):
+        error = None if future.cancelled() else future.exception()
+        with self._lock:
+            self._pending -= 1
+            if error is None:
+                self.completed += 1
+            else:
+                self.failed += 1
+        if error is not None:
+            logger.error('Deferred task failed', exc_info=(type(error), error, error.__traceback__))
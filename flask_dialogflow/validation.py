@@ -0,0 +1,90 @@
+"""Early rejection of malformed webhook requests.
+
+A validator checks the fields of a parsed request in a single pass and raises
+:class:`InvalidPayload`, which the adapters answer with a structured 400, instead of letting
+a missing key fail deep in the dispatcher.
+"""
+from .errors import InvalidPayload
+
+#: Fields every DialogFlow webhook request has, with their types. Parents are implied:
+#: ``result.action`` requires ``result`` to be an object.
+WEBHOOK_FIELDS = (
+    ('result.action', str),
+    ('result.parameters', dict),
+    ('result.metadata.intentName', str),
+)
+
+#: Fields every DialogFlow v2 webhook request has, with their types.
+WEBHOOK_FIELDS_V2 = (
+    ('session', str),
+    ('queryResult.intent.displayName', str),
+)
+
+_TYPE_NAMES = {dict: 'an object', list: 'an array', str: 'a string', bool: 'a boolean',
+               int: 'an integer', float: 'a number'}
+
+_MISSING = object()
+
+
+def _describe(kind):
+    if isinstance(kind, tuple):
+        return ' or '.join(_describe(item) for item in kind)
+    return _TYPE_NAMES.get(kind, kind.__name__)
+
+
+def _fail(field, kind, value):
+    raise InvalidPayload(field, _describe(kind), missing=value is _MISSING)
+
+
+def compile_validator(fields=WEBHOOK_FIELDS):
+    """Build a function checking the fields of a request, raising :class:`InvalidPayload`.
+
+    The checks are compiled to straight-line code once: each object on the paths is looked up
+    a single time, whatever the number of fields below it.
+
+    Keyword Arguments:
+        fields {list[tuple[str, type]]} -- Dotted paths of the required fields and their types (default: {WEBHOOK_FIELDS})
+
+    Returns:
+        [function] -- Called with the parsed request, returns None or raises :class:`InvalidPayload`
+
+    Example:
+        >>> validator = compile_validator(WEBHOOK_FIELDS + (('sessionId', str),))
+        >>> dialogflow = DialogFlow(app, '/webhook', validator=validator)
+    """
+    namespace = {'_MISSING': _MISSING, '_fail': _fail, '_dict': dict}
+    variables = {'': 'data'}
+    lines = ['def validate(data):',
+             '    if not isinstance(data, _dict):',
+             "        _fail('', _dict, data)"]
+
+    def check(path, kind_name):
+        parent, _, key = path.rpartition('.')
+        if parent not in variables:
+            check(parent, '_dict')
+        variable = variables[path] = 'v{}'.format(len(variables))
+        lines.append('    {} = {}.get({!r}, _MISSING)'.format(variable, variables[parent], key))
+        lines.append('    if not isinstance({}, {}):'.format(variable, kind_name))
+        lines.append('        _fail({!r}, {}, {})'.format(path, kind_name, variable))
+
+    for index, (path, kind) in enumerate(fields):
+        if path in variables:
+            raise ValueError('Field {!r} is listed twice, or after one of its children'.format(path))
+        kind_name = '_t{}'.format(index)
+        namespace[kind_name] = kind
+        check(path, kind_name)
+    exec('\n'.join(lines), namespace)
+    return namespace['validate']
+
+
+_validate_v1 = compile_validator(WEBHOOK_FIELDS)
+_validate_v2 = compile_validator(WEBHOOK_FIELDS_V2)
+
+
+def validate_webhook(data):
+    """Default validator of :class:`Dispatcher`, checks :data:`WEBHOOK_FIELDS` or, for v2
+    requests, :data:`WEBHOOK_FIELDS_V2`."""
+    if isinstance(data, dict) and 'queryResult' in data:
+        _validate_v2(data)
+    else:
+        _validate_v1(data)
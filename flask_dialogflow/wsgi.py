@@ -0,0 +1,87 @@
+from http import HTTPStatus
+
+from .errors import BadRequest
+
+
+class WSGIApp:
+    """Plain WSGI application serving a DialogFlow webhook, without Flask.
+
+    Don't build it directly, use :meth:`Dispatcher.wsgi_app`.
+
+    Arguments:
+        dispatcher {Dispatcher} -- The dispatcher holding the registered actions
+        route {str} -- Route at which DialogFlow is going to listen, ``None`` to accept any path
+    """
+
+    def __init__(self, dispatcher, route):
+        self.dispatcher = dispatcher
+        self.route = route
+
+    def __call__(self, environ, start_response):
+        if self.route is not None and environ.get('PATH_INFO', '') != self.route:
+            return self._send(start_response, '404 Not Found')
+        if environ['REQUEST_METHOD'] != 'POST':
+            return self._send(start_response, '405 Method Not Allowed')
+        if not self.dispatcher._is_authorized(environ.get('HTTP_AUTHORIZATION')):
+            return self._send(start_response, '401 Unauthorized')
+
+        profiler = self.dispatcher.profiler
+        profile = profiler is not None and profiler.requested(
+            environ.get('HTTP_' + profiler.header.upper().replace('-', '_')))
+        try:
+            body = self.dispatcher.dispatch(self._read_body(environ), profile=profile)
+        except BadRequest as error:
+            status = HTTPStatus(error.status)
+            return self._send(start_response, '{} {}'.format(status.value, status.phrase), error.body)
+        if body is None:
+            return self._send(start_response, '400 Bad Request')
+        return self._send(start_response, '200 OK', body)
+
+    def _read_body(self, environ):
+        stream = environ['wsgi.input']
+        try:
+            length = int(environ.get('CONTENT_LENGTH') or 0)
+        except ValueError:
+            length = 0
+        if length > 0:
+            self.dispatcher._check_body_size(length)
+            return stream.read(length)
+        # without a length, the input only ends if the server says so (PEP 3333): reading it
+        # to the end, or up to the size limit, would block the worker until the client gives up
+        if not environ.get('wsgi.input_terminated'):
+            return b''
+        if self.dispatcher.max_body_size is not None:
+            return self.dispatcher._read_limited(stream.read)
+        return stream.read()
+
+    @staticmethod
+    def _send(start_response, status, body=b''):
+        headers = [('Content-Length', str(len(body)))]
+        if body:
+            headers.append(('Content-Type', 'application/json'))
+        start_response(status, headers)
+        return [body]
+
+
+class WSGIRouter:
+    """Plain WSGI application serving the webhooks of several agents, one route each.
+
+    Arguments:
+        apps {list[WSGIApp]} -- The applications of the agents, they must have distinct routes
+
+    Example:
+        >>> app = WSGIRouter([billing.wsgi_app('/billing'), support.wsgi_app('/support')])
+    """
+
+    def __init__(self, apps):
+        self.apps = {}
+        for app in apps:
+            if app.route is None or app.route in self.apps:
+                raise ValueError('Each agent needs its own route, got {!r}'.format(app.route))
+            self.apps[app.route] = app
+
+    def __call__(self, environ, start_response):
+        app = self.apps.get(environ.get('PATH_INFO', ''))
+        if app is None:
+            return WSGIApp._send(start_response, '404 Not Found')
+        return app(environ, start_response)
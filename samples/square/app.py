@@ -1,3 +1,5 @@
+from decimal import Decimal
+
 from flask import Flask
 from flask_dialogflow import DialogFlow
 from flask_dialogflow import Response, TextMessage
@@ -5,15 +7,9 @@ from flask_dialogflow import Response, TextMessage
 app = Flask(__name__)
 dialogflow = DialogFlow(app, '/webhook')
 
-def num(s):
-    try:
-        return int(s)
-    except ValueError:
-        return float(s)
-
 @dialogflow.action('math.square')
-def square(number):
-    answer = TextMessage(speech=str(num(number)*num(number)))
+def square(number: Decimal):
+    answer = TextMessage(speech=str(number*number))
     response = Response()
     response.append(answer)
     return response
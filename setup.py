@@ -8,14 +8,12 @@ setup(name='Flask-Dialogflow',
         'Intended Audience :: Developers',
         'License :: OSI Approved :: MIT License',
         'Framework :: Flask',
-        'Programming Language :: Python :: 2',
-        'Programming Language :: Python :: 2.6',
-        'Programming Language :: Python :: 2.7',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.3',
-        'Programming Language :: Python :: 3.4',
-        'Programming Language :: Python :: 3.5',
-        'Programming Language :: Python :: 3.6',
+        'Programming Language :: Python :: 3.7',
+        'Programming Language :: Python :: 3.8',
+        'Programming Language :: Python :: 3.9',
+        'Programming Language :: Python :: 3.10',
+        'Programming Language :: Python :: 3.11',
         'Topic :: Scientific/Engineering :: Artificial Intelligence'
       ],
       url='https://github.com/gabrielrezzonico/flask-dialogflow',
@@ -29,6 +27,7 @@ setup(name='Flask-Dialogflow',
           'dev': ['sphinx'],
           'test': ['pytest', 'pytest-cov'],
       },
+      python_requires='>=3.7',
       install_requires=['flask'],
       zip_safe=False)
 
@@ -1,3 +1,9 @@
+import json
+
+from flask_dialogflow.messages import TextMessage
+from flask_dialogflow.response import Response
+
+
 sample_request = {
     'id': '91b20aa5-9ccf-498d-8944-5d3a32ab1b37',
     'timestamp': '2018-02-17T11:26:58.76Z',
@@ -46,3 +52,100 @@ sample_context = {
                 "key": "value"
             }
 }
+
+sample_request_v2 = {
+    'responseId': '0a4f3bd2-8e8e-4a5e-9d0b-6d5f1c1fa2b1',
+    'session': 'projects/sample-agent/agent/sessions/926e72d8-35ee-4640-8a69-a77c87f475f5',
+    'queryResult': {
+        'queryText': 'hello',
+        'parameters': {
+
+        },
+        'allRequiredParamsPresent': True,
+        'fulfillmentText': '',
+        'fulfillmentMessages': [
+            {
+                'text': {
+                    'text': ['']
+                }
+            }
+        ],
+        'outputContexts': [
+            {
+                'name': 'projects/sample-agent/agent/sessions/926e72d8-35ee-4640-8a69-a77c87f475f5/contexts/user',
+                'lifespanCount': 5,
+                'parameters': {
+                    'name': 'Jane'
+                }
+            }
+        ],
+        'intent': {
+            'name': 'projects/sample-agent/agent/intents/6e4d06c7-bdd0-4e44-b130-a1169f2920c8',
+            'displayName': 'hello'
+        },
+        'intentDetectionConfidence': 1.0,
+        'languageCode': 'en',
+        'action': 'hello'
+    },
+    'originalDetectIntentRequest': {
+        'source': 'facebook',
+        'payload': {}
+    }
+}
+
+
+def make_request(action='hello', parameters=None, contexts=None, result=None, **fields):
+    """Returns a copy of ``sample_request`` for ``action``, nested values included.
+
+    ``fields`` replace top level fields like ``sessionId`` and ``result`` updates the result.
+    """
+    data = json.loads(json.dumps(sample_request))
+    data.update(fields)
+    data['result']['action'] = action
+    if parameters is not None:
+        data['result']['parameters'] = parameters
+    if contexts is not None:
+        data['result']['contexts'] = contexts
+    data['result'].update(result or {})
+    return data
+
+
+def text_response(speech):
+    """Returns a response made of a single text message."""
+    response = Response()
+    response.append(TextMessage(speech=speech))
+    return response
+
+
+def speech(body):
+    """Returns the speech of the first message of a response body, parsed or not, or None."""
+    data = json.loads(body) if isinstance(body, (bytes, str)) else body
+    return data['messages'][0]['speech'] if data['messages'] else None
+
+
+def call_asgi(app, data, path='/webhook', method='POST', headers=None):
+    """Returns a coroutine posting ``data`` to an ASGI application, it returns the status and the body."""
+    scope = {'type': 'http', 'method': method, 'path': path, 'headers': headers or []}
+    body = json.dumps(data).encode('utf-8')
+    received = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': body, 'more_body': False}
+
+    async def send(message):
+        received.append(message)
+
+    async def run():
+        await app(scope, receive, send)
+        return received[0]['status'], received[1]['body']
+    return run()
+
+
+class FakeClock:
+    """A timer that only moves when ``now`` is set."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
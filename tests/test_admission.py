@@ -0,0 +1,156 @@
+import asyncio
+import json
+import threading
+
+from flask import Flask
+
+from flask_dialogflow.admission import AdmissionControl
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.messages import TextMessage
+from flask_dialogflow.response import Response
+from sample_data import FakeClock, make_request, speech
+
+
+class TestAdmissionControl:
+    def test_session_rate(self):
+        clock = FakeClock()
+        admission = AdmissionControl(session_rate=1, session_burst=2, timer=clock)
+        assert admission.acquire('a') and admission.acquire('a')
+        assert not admission.acquire('a')
+        assert admission.acquire('b')
+        clock.now = 1.0
+        assert admission.acquire('a')
+        assert not admission.acquire('a')
+        assert admission.admitted == 4
+        assert admission.shed == {'rate_limited': 2}
+
+
+    def test_overloaded_refunds_the_token(self):
+        clock = FakeClock()
+        admission = AdmissionControl(max_concurrent=1, session_rate=1, session_burst=1, timer=clock)
+        assert admission.acquire('a')
+        assert not admission.acquire('b')
+        admission.release()
+        assert admission.acquire('b')
+        assert admission.shed == {'overloaded': 1}
+
+    def test_overloaded_refunds_the_token_async(self):
+        clock = FakeClock()
+        admission = AdmissionControl(max_concurrent=1, queue_timeout=0.01, session_rate=1,
+                                     session_burst=1, timer=clock)
+        assert admission.acquire('a')
+        assert not asyncio.run(admission.acquire_async('b'))
+        admission.release()
+        assert asyncio.run(admission.acquire_async('b'))
+
+    def test_unknown_session_is_not_limited(self):
+        admission = AdmissionControl(session_rate=1, session_burst=1)
+        assert all(admission.acquire(None) for _ in range(5))
+
+    def test_max_sessions(self):
+        admission = AdmissionControl(session_rate=1, max_sessions=2)
+        for session_id in 'abc':
+            admission.acquire(session_id)
+        assert list(admission._buckets) == ['b', 'c']
+
+    def test_concurrency(self):
+        admission = AdmissionControl(max_concurrent=1)
+        assert admission.acquire()
+        assert not admission.acquire()
+        admission.release()
+        assert admission.acquire()
+        assert (admission.admitted, admission.shed['overloaded'], admission.active) == (2, 1, 1)
+
+    def test_queue_timeout(self):
+        admission = AdmissionControl(max_concurrent=1, queue_timeout=5)
+        assert admission.acquire()
+        threading.Timer(0.05, admission.release).start()
+        assert admission.acquire()
+        assert admission.queued == 1
+
+        admission = AdmissionControl(max_concurrent=1, queue_timeout=0.01)
+        assert admission.acquire()
+        assert not admission.acquire()
+        assert (admission.queued, admission.shed['overloaded']) == (1, 1)
+
+    def test_queue_timeout_async(self):
+        admission = AdmissionControl(max_concurrent=1, queue_timeout=5)
+
+        async def run():
+            assert await admission.acquire_async()
+            waiter = asyncio.ensure_future(admission.acquire_async())
+            await asyncio.sleep(0.01)
+            assert not waiter.done()
+            admission.release()
+            assert await waiter
+            assert admission.active == 1
+
+            admission.queue_timeout = 0.01
+            assert not await admission.acquire_async()
+        asyncio.run(run())
+        assert (admission.admitted, admission.queued, admission.shed['overloaded']) == (2, 2, 1)
+
+    def test_custom_response(self):
+        response = Response()
+        response.append(TextMessage(speech='Busy'))
+        admission = AdmissionControl(response=response)
+        assert speech(admission.body) == 'Busy'
+
+
+class TestDispatch:
+    def test_shed_requests_get_the_busy_response(self):
+        admission = AdmissionControl(max_concurrent=1)
+        dispatcher = Dispatcher(admission=admission)
+        started, proceed = threading.Event(), threading.Event()
+
+        @dispatcher.action('hello')
+        def hello():
+            started.set()
+            proceed.wait()
+            response = Response()
+            response.append(TextMessage(speech='Hi'))
+            return response
+
+        bodies = []
+        thread = threading.Thread(target=lambda: bodies.append(dispatcher.dispatch(make_request())))
+        thread.start()
+        started.wait()
+        assert 'try again' in speech(dispatcher.dispatch(make_request()))
+        proceed.set()
+        thread.join()
+        assert speech(bodies[0]) == 'Hi'
+        assert admission.active == 0
+
+    def test_slot_released_on_error(self):
+        admission = AdmissionControl(max_concurrent=1)
+        dispatcher = Dispatcher(admission=admission)
+        dispatcher.default(lambda: 1 / 0)
+        for _ in range(2):
+            try:
+                dispatcher.dispatch(make_request())
+            except ZeroDivisionError:
+                pass
+        assert admission.active == 0 and admission.admitted == 2
+
+    def test_flask_session_rate(self):
+        app = Flask(__name__)
+        admission = AdmissionControl(session_rate=1, session_burst=1)
+        dialogflow = DialogFlow(app, '/webhook', admission=admission)
+        dialogflow.default(lambda: Response())
+        client = app.test_client()
+        first = client.post('/webhook', data=json.dumps(make_request()))
+        second = client.post('/webhook', data=json.dumps(make_request()))
+        assert first.status_code == second.status_code == 200
+        assert second.data == admission.body
+        assert first.data != admission.body
+
+    def test_async(self):
+        admission = AdmissionControl(session_rate=1, session_burst=1)
+        dispatcher = Dispatcher(admission=admission)
+        dispatcher.default(lambda: Response())
+
+        async def run():
+            await dispatcher.dispatch_async(make_request())
+            return await dispatcher.dispatch_async(make_request())
+        assert asyncio.run(run()) == admission.body
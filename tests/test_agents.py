@@ -0,0 +1,137 @@
+import asyncio
+import base64
+import json
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.asgi import ASGIRouter
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.metrics import Metrics, prometheus
+from flask_dialogflow.response import Response
+from flask_dialogflow.session import SessionStore
+from flask_dialogflow.wsgi import WSGIRouter
+from sample_data import call_asgi, make_request, speech, text_response
+
+
+def make_agents(cls=Dispatcher, **kwargs):
+    agents = []
+    for name in ('billing', 'support'):
+        agent = cls(route='/' + name, name=name, **kwargs)
+        agent.action('hello')(lambda name=name: text_response(name).freeze())
+        agents.append(agent)
+    return agents
+
+
+class TestFlask:
+    def test_routes_and_auth(self):
+        app = Flask(__name__)
+        app.testing = True
+        billing = DialogFlow(app, '/billing', name='billing', metrics_route='/billing/metrics',
+                             basic_auth_user='billing', basic_auth_pass='secret')
+        support = DialogFlow(app, '/support', metrics_route='/support/metrics')
+        billing.action('hello')(lambda: text_response('billing').freeze())
+        support.action('hello')(lambda: text_response('support').freeze())
+        client = app.test_client()
+        data = json.dumps(make_request('hello'))
+
+        assert client.post('/billing', data=data).status_code == 401
+        auth = 'Basic ' + base64.b64encode(b'billing:secret').decode('ascii')
+        response = client.post('/billing', data=data, headers={'Authorization': auth})
+        assert speech(response.data) == 'billing'
+        assert speech(client.post('/support', data=data).data) == 'support'
+        assert 'agent="billing",action="hello"' in client.get('/billing/metrics').data.decode()
+        assert 'dialogflow_requests_total{action="hello"} 1' in client.get('/support/metrics').data.decode()
+
+
+class TestIsolation:
+    def test_request_state(self):
+        billing, support = make_agents()
+
+        @billing.action('peek')
+        def peek():
+            assert support.context_out is None
+            with pytest.raises(RuntimeError):
+                support.context_out = {'name': 'other'}
+            billing.context_out = {'name': 'mine'}
+            return Response()
+
+        body = json.loads(billing.dispatch(make_request('peek')))
+        assert body['contextOut'] == {'name': 'mine'}
+
+    def test_shared_cache(self):
+        cache = TTLCache()
+        billing, support = make_agents()
+        billing.action('faq', cache=cache)(lambda: text_response('billing').freeze())
+        support.action('faq', cache=cache)(lambda: text_response('support').freeze())
+        assert speech(billing.dispatch(make_request('faq'))) == 'billing'
+        assert speech(support.dispatch(make_request('faq'))) == 'support'
+        assert len(cache) == 2
+
+    def test_shared_sessions(self):
+        sessions = SessionStore()
+        billing, support = make_agents(sessions=sessions)
+
+        for agent in (billing, support):
+            @agent.action('count')
+            def count(agent=agent):
+                agent.session['count'] = agent.session.get('count', 0) + 1
+                return text_response(str(agent.session['count'])).freeze()
+
+        assert speech(billing.dispatch(make_request('count'))) == '1'
+        assert speech(billing.dispatch(make_request('count'))) == '2'
+        assert speech(support.dispatch(make_request('count'))) == '1'
+        sessions.close()
+
+    def test_shared_executor(self):
+        pool = ThreadPoolExecutor(max_workers=2)
+        billing, support = make_agents(executor=pool, deadline=1)
+        assert billing.executor is pool and support.executor is pool
+        assert speech(billing.dispatch(make_request('hello'))) == 'billing'
+        assert speech(support.dispatch(make_request('hello'))) == 'support'
+        pool.shutdown()
+
+
+class TestRouters:
+    def test_wsgi(self):
+        app = WSGIRouter([agent.wsgi_app() for agent in make_agents()])
+        body = json.dumps(make_request('hello')).encode('utf-8')
+        for path, expected in (('/billing', 'billing'), ('/support', 'support')):
+            statuses = []
+            environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': path,
+                       'CONTENT_LENGTH': str(len(body)), 'wsgi.input': BytesIO(body)}
+            result = app(environ, lambda status, headers: statuses.append(status))
+            assert statuses == ['200 OK']
+            assert speech(b''.join(result)) == expected
+        statuses = []
+        app({'REQUEST_METHOD': 'POST', 'PATH_INFO': '/other'}, lambda status, headers: statuses.append(status))
+        assert statuses == ['404 Not Found']
+
+    def test_asgi(self):
+        pool = ThreadPoolExecutor(max_workers=2)
+        app = ASGIRouter([agent.asgi_app(executor=pool) for agent in make_agents()])
+        status, body = asyncio.run(call_asgi(app, make_request('hello'), path='/support'))
+        assert (status, speech(body)) == (200, 'support')
+        status, _ = asyncio.run(call_asgi(app, make_request('hello'), path='/other'))
+        assert status == 404
+        app.shutdown()
+
+    def test_distinct_routes(self):
+        billing, support = make_agents()
+        with pytest.raises(ValueError):
+            WSGIRouter([billing.wsgi_app('/same'), support.wsgi_app('/same')])
+
+
+class TestMetrics:
+    def test_combined_exposition(self):
+        sinks = [Metrics(labels={'agent': 'billing'}), Metrics(labels={'agent': 'support'})]
+        for sink in sinks:
+            sink.record('hello', [0.0, 0.001])
+        text = prometheus(sinks)
+        assert text.count('# TYPE dialogflow_requests_total counter') == 1
+        assert 'dialogflow_requests_total{agent="billing",action="hello"} 1' in text
+        assert 'dialogflow_requests_total{agent="support",action="hello"} 1' in text
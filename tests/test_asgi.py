@@ -0,0 +1,124 @@
+import asyncio
+import base64
+import json
+import threading
+import time
+
+import pytest
+
+from flask_dialogflow.dialogflow import DialogFlow
+from sample_data import call_asgi, make_request, sample_context, text_response
+
+WEBHOOK_ENDPOINT = '/webhook'
+
+
+@pytest.fixture
+def dialogflow():
+    dialogflow = DialogFlow(route=WEBHOOK_ENDPOINT)
+
+    @dialogflow.action('hello')
+    async def hello(name='World'):
+        await asyncio.sleep(0.05)
+        dialogflow.context_out = sample_context
+        return text_response('Hello, {}!'.format(name))
+
+    @dialogflow.action('sync')
+    def sync():
+        return text_response(threading.current_thread().name + ' ' + dialogflow.intent)
+
+    @dialogflow.action('nothing')
+    def nothing():
+        return None
+
+    return dialogflow
+
+
+class TestASGIApp:
+    def test_async_action(self, dialogflow):
+        status, body = asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('hello', {'name': 'Bob'})))
+        json_data = json.loads(body)
+        assert status == 200
+        assert json_data['messages'][0]['speech'] == 'Hello, Bob!'
+        assert json_data['contextOut'] == sample_context
+
+    def test_sync_action_runs_on_pool(self, dialogflow):
+        app = dialogflow.asgi_app(max_workers=2)
+        status, body = asyncio.run(call_asgi(app, make_request('sync')))
+        speech = json.loads(body)['messages'][0]['speech']
+        assert status == 200
+        assert speech.startswith('flask-dialogflow')
+        assert speech.endswith('hello')
+        app.shutdown()
+
+    def test_concurrent_requests(self, dialogflow):
+        app = dialogflow.asgi_app()
+
+        async def run():
+            return await asyncio.gather(*[call_asgi(app, make_request('hello')) for _ in range(200)])
+
+        start = time.perf_counter()
+        results = asyncio.run(run())
+        assert time.perf_counter() - start < 2
+        assert all(status == 200 for status, _ in results)
+
+    def test_no_response(self, dialogflow):
+        status, _ = asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('nothing')))
+        assert status == 400
+
+    def test_wrong_route(self, dialogflow):
+        status, _ = asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('hello'), path='/other'))
+        assert status == 404
+
+    def test_wrong_method(self, dialogflow):
+        status, _ = asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('hello'), method='GET'))
+        assert status == 405
+
+    def test_basic_auth(self, dialogflow):
+        dialogflow.set_basic_auth('user', 'secret')
+        app = dialogflow.asgi_app()
+        status, _ = asyncio.run(call_asgi(app, make_request('sync')))
+        assert status == 401
+        credentials = base64.b64encode(b'user:secret')
+        status, _ = asyncio.run(call_asgi(app, make_request('sync'),
+                                     headers=[(b'authorization', b'Basic ' + credentials)]))
+        assert status == 200
+
+    def test_lifespan_shutdown(self, dialogflow):
+        written = []
+
+        @dialogflow.action('deferred')
+        def deferred():
+            dialogflow.defer(lambda: time.sleep(0.05) or written.append(True))
+            return text_response('deferred')
+
+        app = dialogflow.asgi_app()
+        assert asyncio.run(call_asgi(app, make_request('deferred')))[0] == 200
+
+        async def lifespan():
+            messages = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+            sent = []
+
+            async def receive():
+                return messages.pop(0)
+
+            async def send(message):
+                sent.append(message['type'])
+            await app({'type': 'lifespan'}, receive, send)
+            return sent
+        assert asyncio.run(lifespan()) == ['lifespan.startup.complete', 'lifespan.shutdown.complete']
+        # the dispatcher was shut down too, waiting for the deferred task
+        assert written == [True]
+
+
+class TestFlaskAsyncAction:
+    def test_async_action(self, dialogflow):
+        from flask import Flask
+        app = Flask(__name__)
+        app.testing = True
+        dialogflow.init_app(app, WEBHOOK_ENDPOINT)
+        app_response = app.test_client().post(WEBHOOK_ENDPOINT,
+                        data=json.dumps(make_request('hello')),
+                        content_type='application/json')
+        json_data = json.loads(app_response.data)
+        assert json_data['messages'][0]['speech'] == 'Hello, World!'
+        assert json_data['contextOut'] == sample_context
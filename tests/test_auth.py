@@ -0,0 +1,101 @@
+import base64
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.auth import AnyAuth, BasicAuth, BearerAuth
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.response import Response
+from sample_data import sample_request
+
+
+def basic(username, password):
+    return 'Basic ' + base64.b64encode('{}:{}'.format(username, password).encode('utf-8')).decode('ascii')
+
+
+class UnreadableBody:
+    def read(self, *args):
+        raise AssertionError('the body was read')
+
+
+class TestAuthenticators:
+    def test_basic_auth(self):
+        auth = BasicAuth([('user', 'secret')])
+        assert auth.authenticate(basic('user', 'secret'))
+        assert auth.authenticate(basic('user', 'secret').encode('ascii'))
+        assert auth.authenticate(basic('user', 'secret').replace('Basic', 'basic'))
+        assert not auth.authenticate(basic('user', 'other'))
+        assert not auth.authenticate(basic('other', 'secret'))
+        assert not auth.authenticate('Bearer ' + basic('user', 'secret')[6:])
+        assert not auth.authenticate('Basic')
+        assert not auth.authenticate('Basic !!!')
+        assert not auth.authenticate('Basic é')
+        assert not auth.authenticate(None)
+        assert not auth.authenticate('')
+
+    def test_rotated_credentials(self):
+        auth = BasicAuth([('user', 'new'), ('user', 'old')])
+        assert auth.authenticate(basic('user', 'new'))
+        assert auth.authenticate(basic('user', 'old'))
+        assert not auth.authenticate(basic('user', 'older'))
+
+    def test_non_ascii_credentials(self):
+        auth = BasicAuth([('usér', 'sécret')])
+        assert auth.authenticate(basic('usér', 'sécret'))
+
+    def test_bearer_auth(self):
+        auth = BearerAuth(['token-1', 'token-2'])
+        assert auth.authenticate('Bearer token-2')
+        assert not auth.authenticate('Bearer token-3')
+        assert not auth.authenticate('Basic token-1')
+
+    def test_any_auth(self):
+        auth = AnyAuth([BasicAuth([('user', 'secret')]), BearerAuth(['token'])])
+        assert auth.authenticate(basic('user', 'secret'))
+        assert auth.authenticate('Bearer token')
+        assert not auth.authenticate('Bearer secret')
+
+    def test_credentials_required(self):
+        with pytest.raises(ValueError):
+            BearerAuth([])
+
+
+class TestAdapters:
+    def test_wsgi_rejects_without_reading_the_body(self):
+        dispatcher = Dispatcher(auth=BearerAuth(['token']))
+        statuses = []
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'CONTENT_LENGTH': '100',
+                   'wsgi.input': UnreadableBody(), 'HTTP_AUTHORIZATION': 'Bearer wrong'}
+        dispatcher.wsgi_app(None)(environ, lambda status, headers: statuses.append(status))
+        assert statuses == ['401 Unauthorized']
+
+    def test_flask_init_app_credentials(self):
+        # the credentials given to init_app take effect
+        app = Flask(__name__)
+        dialogflow = DialogFlow()
+        dialogflow.default(lambda: Response())
+        dialogflow.init_app(app, '/webhook', basic_auth_user='user', basic_auth_pass='secret')
+        client = app.test_client()
+        data = json.dumps(sample_request)
+        assert client.post('/webhook', data=data).status_code == 401
+        assert client.post('/webhook', data=data,
+                           headers={'Authorization': basic('user', 'other')}).status_code == 401
+        assert client.post('/webhook', data=data,
+                           headers={'Authorization': basic('secret', 'secret')}).status_code == 401
+        assert client.post('/webhook', data=data,
+                           headers={'Authorization': basic('user', 'secret')}).status_code == 200
+
+    def test_flask_authenticator(self):
+        app = Flask(__name__)
+        dialogflow = DialogFlow(app, '/webhook', auth=BearerAuth(['token']))
+        dialogflow.default(lambda: Response())
+        client = app.test_client()
+        response = client.post('/webhook', input_stream=io.BytesIO(b'not json'),
+                               headers={'Authorization': 'Bearer wrong'})
+        assert response.status_code == 401
+        response = client.post('/webhook', data=json.dumps(sample_request),
+                               headers={'Authorization': 'Bearer token'})
+        assert response.status_code == 200
@@ -0,0 +1,52 @@
+from flask_dialogflow.binding import Binding
+
+
+def record(*args, **kwargs):
+    return args, kwargs
+
+
+class TestBinding:
+    def test_no_arguments(self):
+        binding = Binding(lambda: 'called')
+        assert binding({'unused': 1}) == 'called'
+
+    def test_positional(self):
+        def view(number, unit):
+            return number, unit
+        binding = Binding(view)
+        assert binding({'number': '2', 'unit': 'cm'}) == ('2', 'cm')
+
+    def test_missing_is_none(self):
+        def view(number):
+            return number
+        assert Binding(view)({}) is None
+
+    def test_defaults(self):
+        def view(number, unit='cm'):
+            return number, unit
+        binding = Binding(view)
+        assert binding({'number': '2'}) == ('2', 'cm')
+        assert binding({'number': '2', 'unit': 'm'}) == ('2', 'm')
+
+    def test_keyword_only(self):
+        def view(number, *, unit='cm', scale):
+            return number, unit, scale
+        binding = Binding(view)
+        assert binding({'number': '2', 'scale': 3}) == ('2', 'cm', 3)
+        assert binding.keyword_only == [('unit', 'cm'), ('scale', None)]
+
+    def test_var_keyword(self):
+        def view(number, **extra):
+            return number, extra
+        binding = Binding(view)
+        assert binding({'number': '2', 'geo-city': 'Paris'}) == ('2', {'geo-city': 'Paris'})
+        assert binding.var_keyword
+
+    def test_var_positional_ignored(self):
+        def view(number, *args):
+            return number, args
+        assert Binding(view)({'number': 1, 'args': 2}) == (1, ())
+
+    def test_func(self):
+        binding = Binding(record)
+        assert binding.func is record
@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.response import Response
+from flask_dialogflow.messages import TextMessage
+from sample_data import FakeClock, make_request, sample_context
+
+WEBHOOK_ENDPOINT = '/webhook'
+
+
+class TestTTLCache:
+    def test_key_normalized(self):
+        cache = TTLCache()
+        first = cache.key('a', make_request('a', {'x': '1', 'y': ['2', '3']}))
+        second = cache.key('a', make_request('a', {'y': ['2', '3'], 'x': '1'}))
+        assert first == second
+        assert hash(first) == hash(second)
+
+    def test_key_lang_and_contexts(self):
+        cache = TTLCache()
+        assert cache.key('a', make_request('a', lang='en')) == cache.key('a', make_request('a', lang='fr'))
+        cache = TTLCache(by_lang=True, by_contexts=True)
+        assert cache.key('a', make_request('a', lang='en')) != cache.key('a', make_request('a', lang='fr'))
+        assert (cache.key('a', make_request('a', contexts=[sample_context])) !=
+                cache.key('a', make_request('a')))
+
+    def test_hit_miss(self):
+        cache = TTLCache()
+        assert cache.get('key') is None
+        cache.set('key', b'value')
+        assert cache.get('key') == b'value'
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_ttl(self):
+        timer = FakeClock()
+        cache = TTLCache(ttl=10, timer=timer)
+        cache.set('key', b'value')
+        timer.now = 9
+        assert cache.get('key') == b'value'
+        timer.now = 10
+        assert cache.get('key') is None
+        assert len(cache) == 0
+
+    def test_lru(self):
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        assert cache.get('b') is None
+        assert cache.get('a') == 1
+        assert cache.evictions == 1
+
+    def test_invalidate(self):
+        cache = TTLCache()
+        cache.set(cache.key('a', make_request('a', {'x': 1})), 1)
+        cache.set(cache.key('a', make_request('a', {'x': 2})), 2)
+        cache.set(cache.key('b', make_request('b')), 3)
+        assert cache.invalidate('a', {'x': 1}) == 1
+        assert cache.invalidate('a') == 1
+        assert len(cache) == 1
+        cache.clear()
+        assert len(cache) == 0
+
+
+@pytest.fixture
+def cached():
+    app = Flask(__name__)
+    app.testing = True
+    dialogflow = DialogFlow(app, WEBHOOK_ENDPOINT)
+    cache = TTLCache(maxsize=10, ttl=60)
+    calls = []
+
+    @dialogflow.action('math.square', cache=cache)
+    def square(number):
+        calls.append(number)
+        dialogflow.context_out = sample_context
+        response = Response()
+        response.append(TextMessage(speech=str(int(number) ** 2)))
+        return response
+
+    return app, cache, calls
+
+
+def post(app, data):
+    app_response = app.test_client().post(WEBHOOK_ENDPOINT, data=json.dumps(data),
+                                          content_type='application/json')
+    return json.loads(app_response.data)
+
+
+class TestActionCache:
+    def test_cached(self, cached):
+        app, cache, calls = cached
+        first = post(app, make_request('math.square', {'number': '3'}))
+        second = post(app, make_request('math.square', {'number': '3'}))
+        assert first == second
+        assert second['messages'][0]['speech'] == '9'
+        assert second['contextOut'] == sample_context
+        assert calls == ['3']
+        assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_different_parameters(self, cached):
+        app, cache, calls = cached
+        post(app, make_request('math.square', {'number': '3'}))
+        assert post(app, make_request('math.square', {'number': '4'}))['messages'][0]['speech'] == '16'
+        assert calls == ['3', '4']
+
+    def test_invalidate(self, cached):
+        app, cache, calls = cached
+        post(app, make_request('math.square', {'number': '3'}))
+        cache.invalidate('math.square')
+        post(app, make_request('math.square', {'number': '3'}))
+        assert calls == ['3', '3']
@@ -0,0 +1,118 @@
+import gzip
+import json
+import os
+
+from flask_dialogflow import loadtest
+from flask_dialogflow.capture import TrafficCapture
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from sample_data import sample_request, sample_request_v2
+
+
+def make_private_request(i=0):
+    data = json.loads(json.dumps(sample_request))
+    data['id'] = str(i)
+    data['result']['parameters'] = {'email': 'jane@example.com', 'city': 'Paris'}
+    data['result']['contexts'] = [{'name': 'user', 'parameters': {'email': 'jane@example.com'}}]
+    data['originalRequest'] = {'source': 'facebook', 'data': {'sender': {'id': '42'}, 'text': 'hi'}}
+    return data
+
+
+def read(directory):
+    records = []
+    for name in sorted(os.listdir(directory)):
+        with gzip.open(os.path.join(directory, name), 'rt') as lines:
+            records.extend(json.loads(line) for line in lines)
+    return records
+
+
+def make_dispatcher(capture):
+    dispatcher = Dispatcher(capture=capture)
+
+    @dispatcher.action('hello')
+    def hello(email):
+        dispatcher.context_out = {'name': 'user', 'parameters': {'email': email}}
+        return Response()
+    return dispatcher
+
+
+class TestTrafficCapture:
+    def test_capture_and_redaction(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=1.0, redact_parameters=['email'],
+                                 redact_original_request=['data.sender.id'])
+        dispatcher = make_dispatcher(capture)
+        dispatcher.dispatch(make_private_request())
+        dispatcher.shutdown()
+
+        record, = read(str(tmp_path))
+        assert record['action'] == 'hello'
+        request = record['request']
+        assert request['result']['parameters'] == {'email': '[REDACTED]', 'city': 'Paris'}
+        assert request['result']['contexts'][0]['parameters'] == {'email': '[REDACTED]'}
+        assert request['originalRequest']['data'] == {'sender': {'id': '[REDACTED]'}, 'text': 'hi'}
+        assert record['response']['contextOut']['parameters'] == {'email': '[REDACTED]'}
+        assert capture.written == 1
+
+    def test_sampling(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=0.0)
+        dispatcher = make_dispatcher(capture)
+        for i in range(10):
+            dispatcher.dispatch(make_private_request(i))
+        dispatcher.shutdown()
+        assert capture.sampled == 0
+        assert not os.path.exists(str(tmp_path)) or os.listdir(str(tmp_path)) == []
+
+    def test_rotation(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=1.0, max_bytes=1, backup_count=3, flush_interval=0)
+        dispatcher = make_dispatcher(capture)
+        for i in range(6):
+            dispatcher.dispatch(make_private_request(i))
+            capture.flush()
+        dispatcher.shutdown()
+        assert len(os.listdir(str(tmp_path))) == 3
+        assert [record['request']['id'] for record in read(str(tmp_path))] == ['3', '4', '5']
+
+    def test_full_queue_drops(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=1.0, queue_size=1)
+        capture._thread = object()  # writer not started, nothing is consumed
+        capture.offer(make_private_request(), None)
+        capture.offer(make_private_request(), None)
+        assert (capture.sampled, capture.dropped) == (2, 1)
+
+    def test_errors_are_captured(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=1.0)
+        dispatcher = Dispatcher(capture=capture)
+        dispatcher.default(lambda: 1 / 0)
+        try:
+            dispatcher.dispatch(make_private_request())
+        except ZeroDivisionError:
+            pass
+        dispatcher.shutdown()
+        record, = read(str(tmp_path))
+        assert record['response'] is None
+
+    def test_replay(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path / 'capture'), rate=1.0)
+        dispatcher = make_dispatcher(capture)
+        for i in range(3):
+            dispatcher.dispatch(make_private_request(i))
+        capture.close()
+        path = os.path.join(str(tmp_path / 'capture'), os.listdir(str(tmp_path / 'capture'))[0])
+        payloads = loadtest.load_payloads(path)
+        assert [payload['id'] for payload in payloads] == ['0', '1', '2']
+
+    def test_redaction_v2(self, tmp_path):
+        capture = TrafficCapture(str(tmp_path), rate=1.0, redact_parameters=['name'],
+                                 redact_original_request=['source'])
+        dispatcher = make_dispatcher(capture)
+        data = json.loads(json.dumps(sample_request_v2))
+        data['queryResult']['parameters'] = {'email': 'jane@example.com'}
+        dispatcher.dispatch(data)
+        dispatcher.shutdown()
+
+        record, = read(str(tmp_path))
+        assert record['action'] == 'hello'
+        request = record['request']
+        assert request['queryResult']['outputContexts'][0]['parameters'] == {'name': '[REDACTED]'}
+        assert request['originalDetectIntentRequest']['source'] == '[REDACTED]'
+        assert record['response']['outputContexts'][0]['parameters'] == {'email': 'jane@example.com'}
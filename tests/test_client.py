@@ -0,0 +1,298 @@
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from flask_dialogflow.client import CircuitBreaker, HTTPClient
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.errors import CircuitOpen, DeadlineExceeded
+from flask_dialogflow.response import Response
+from sample_data import FakeClock, sample_request, text_response
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+
+    def do_GET(self):
+        server = self.server
+        parts = urlsplit(self.path)
+        query = parse_qs(parts.query)
+        with server.lock:
+            server.calls += 1
+            call = server.calls
+            server.ports.add(self.client_address[1])
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+        try:
+            delay = float(query.get('delay', ['0'])[0])
+            if parts.path == '/first-slow' and call == 1:
+                delay = 1.0
+            if delay:
+                time.sleep(delay)
+            status = 500 if parts.path == '/fail' else 200
+            self.reply(status, {'path': parts.path, 'call': call})
+            # closed without telling the client, like an idle keep-alive connection
+            self.close_connection = parts.path == '/close'
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        self.reply(200, {'body': body.decode('utf-8'), 'type': self.headers['Content-Type']})
+
+    def reply(self, status, data):
+        body = json.dumps(data).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+    server.daemon_threads = True
+    server.block_on_close = False
+    server.lock = threading.Lock()
+    server.calls = server.active = server.max_active = 0
+    server.ports = set()
+    server.url = 'http://127.0.0.1:{}'.format(server.server_address[1])
+    thread = threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def make_client(server, **kwargs):
+    return HTTPClient(base_url=server.url, **kwargs)
+
+
+class TestPool:
+    def test_keep_alive(self, server):
+        client = make_client(server)
+        for _ in range(3):
+            response = client.get('/ok?x=1')
+            assert response.ok and response.json()['path'] == '/ok'
+        assert client.opened == 1 and client.reused == 2
+        assert len(server.ports) == 1
+        client.close()
+
+    def test_post_json(self, server):
+        client = make_client(server)
+        assert client.post('/echo', json={'a': 1}).json() == {'body': '{"a":1}', 'type': 'application/json'}
+        assert client.request('post', '/echo', b'raw', headers={'Content-Type': 'text/plain'}).json() == \
+            {'body': 'raw', 'type': 'text/plain'}
+        client.close()
+
+    def test_bounded(self, server):
+        client = make_client(server, max_connections=2)
+        threads = [threading.Thread(target=client.get, args=('/ok?delay=0.1',)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert server.max_active == 2
+        assert client.opened == 2
+        client.close()
+
+    def test_waiting_for_a_connection_times_out(self, server):
+        client = make_client(server, max_connections=1)
+        thread = threading.Thread(target=client.get, args=('/ok?delay=0.3',))
+        thread.start()
+        time.sleep(0.05)
+        with pytest.raises(DeadlineExceeded):
+            client.get('/ok', timeout=0.05)
+        thread.join()
+        client.close()
+
+    def test_idle_connections_expire(self, server):
+        clock = FakeClock()
+        client = make_client(server, idle_timeout=10, timer=clock)
+        client.get('/ok')
+        clock.now = 11
+        client.get('/ok')
+        assert client.opened == 2 and client.reused == 0
+        client.close()
+
+    def test_stale_connection_is_retried(self, server):
+        client = make_client(server)
+        client.get('/close')
+        time.sleep(0.05)
+        assert client.get('/ok').ok
+        assert client.opened == 2
+        client.get('/close')
+        time.sleep(0.05)
+        with pytest.raises(ConnectionError):
+            client.post('/echo', json={})
+        client.close()
+
+    def test_closed(self, server):
+        client = make_client(server)
+        client.get('/ok')
+        client.close()
+        with pytest.raises(RuntimeError):
+            client.get('/ok')
+
+    def test_unsupported_url(self):
+        with pytest.raises(ValueError):
+            HTTPClient().get('ftp://example.com/file')
+
+
+class TestCircuitBreaker:
+    def test_states(self):
+        clock = FakeClock()
+        breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10, timer=clock)
+        assert breaker.allow()
+        breaker.failure()
+        assert breaker.state == 'closed'
+        breaker.failure()
+        assert breaker.state == 'open' and not breaker.allow()
+        assert breaker.retry_after() == 10
+        clock.now = 10
+        assert breaker.state == 'half_open'
+        assert breaker.allow()
+        assert not breaker.allow()
+        breaker.failure()
+        assert breaker.state == 'open' and breaker.opened == 2
+        clock.now = 20
+        assert breaker.allow()
+        breaker.success()
+        assert breaker.state == 'closed' and breaker.allow()
+        assert breaker.rejected == 2
+
+    def test_success_resets_the_failures(self):
+        breaker = CircuitBreaker(failure_threshold=2)
+        breaker.failure()
+        breaker.success()
+        breaker.failure()
+        assert breaker.state == 'closed'
+
+    def test_client(self, server):
+        clock = FakeClock()
+        client = make_client(server, failure_threshold=2, reset_timeout=5, timer=clock)
+        assert client.get('/fail').status == 500
+        assert client.get('/fail').status == 500
+        with pytest.raises(CircuitOpen) as error:
+            client.get('/ok')
+        assert error.value.retry_after == 5
+        assert server.calls == 2
+        clock.now = 5
+        assert client.get('/ok').ok
+        assert client.breaker('/ok').state == 'closed'
+        client.close()
+
+    def test_connection_errors(self, server):
+        client = HTTPClient(failure_threshold=1, timeout=1)
+        port = server.server_address[1]
+        server.shutdown()
+        server.server_close()
+        with pytest.raises(OSError):
+            client.get('http://127.0.0.1:{}/ok'.format(port))
+        with pytest.raises(CircuitOpen):
+            client.get('http://127.0.0.1:{}/ok'.format(port))
+
+    def test_disabled(self, server):
+        client = make_client(server, failure_threshold=None)
+        for _ in range(10):
+            client.get('/fail')
+        assert client.breaker('/fail') is None
+        client.close()
+
+
+class TestHedging:
+    def test_slow_call_is_hedged(self, server):
+        client = make_client(server, hedge_after=0.05)
+        start = time.monotonic()
+        assert client.get('/first-slow').json()['call'] == 2
+        assert time.monotonic() - start < 0.5
+        assert client.hedged == 1 and client.hedges_won == 1
+        client.close()
+
+    def test_fast_call_is_not_hedged(self, server):
+        client = make_client(server, hedge_after=0.5)
+        assert client.get('/ok').ok
+        assert client.hedged == 0 and server.calls == 1
+        client.close()
+
+    def test_only_idempotent_calls(self, server):
+        client = make_client(server, hedge_after=0.01)
+        assert client.post('/echo', json={}).ok
+        assert client.hedged == 0
+        with pytest.raises(ValueError):
+            client.post('/echo', json={}, hedge_after=0.01)
+        client.close()
+
+
+class TestDispatcher:
+    def test_timeout_from_the_time_left(self, server):
+        dispatcher = Dispatcher()
+        dispatcher.webhook_timeout = 0.3
+        errors = []
+
+        @dispatcher.action('hello')
+        def hello():
+            try:
+                dispatcher.client.get(server.url + '/ok?delay=1')
+            except OSError as error:
+                errors.append(error)
+            return Response()
+
+        start = time.monotonic()
+        dispatcher.dispatch(sample_request)
+        assert time.monotonic() - start < 0.5
+        assert isinstance(errors[0], TimeoutError)
+        dispatcher.shutdown()
+
+    def test_no_time_left(self, server):
+        dispatcher = Dispatcher()
+        dispatcher.webhook_timeout = 0.05
+
+        @dispatcher.action('hello')
+        def hello():
+            time.sleep(0.1)
+            dispatcher.client.get(server.url + '/ok')
+
+        with pytest.raises(DeadlineExceeded):
+            dispatcher.dispatch(sample_request)
+        assert server.calls == 0
+        assert dispatcher.time_left() is None
+
+    def test_shared_client(self, server):
+        client = HTTPClient(base_url=server.url)
+        first, second = Dispatcher(client=client), Dispatcher(client=client)
+
+        @second.action('hello')
+        def hello():
+            response = second.client.get('/ok')
+            assert 4 < second.client.time_left() < 5
+            return text_response(response.json()['path'])
+
+        assert first.client is second.client
+        assert json.loads(second.dispatch(sample_request))['messages'][0]['speech'] == '/ok'
+        second.shutdown()
+        with pytest.raises(RuntimeError):
+            client.get('/ok')
+
+    def test_async_view_function(self, server):
+        dispatcher = Dispatcher()
+
+        @dispatcher.action('hello')
+        async def hello():
+            response = await dispatcher.client.request_async('GET', server.url + '/ok')
+            assert dispatcher.client.time_left() is not None
+            return text_response(str(response.status))
+
+        body = asyncio.run(dispatcher.dispatch_async(sample_request))
+        assert json.loads(body)['messages'][0]['speech'] == '200'
+        dispatcher.shutdown()
@@ -0,0 +1,129 @@
+import datetime
+import decimal
+import enum
+import json
+from typing import List, Optional
+
+import pytest
+
+from flask_dialogflow.binding import Binding
+from flask_dialogflow.coercion import register_converter
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.errors import ParameterError
+from flask_dialogflow.response import Response
+from sample_data import sample_request
+
+
+class Size(enum.Enum):
+    SMALL = 'small'
+    LARGE = 'large'
+
+
+class Money:
+    def __init__(self, cents):
+        self.cents = cents
+
+    @classmethod
+    def parse(cls, value):
+        return cls(int(round(float(value.lstrip('$')) * 100)))
+
+
+register_converter(Money, Money.parse)
+
+
+def echo(**kwargs):
+    return kwargs
+
+
+class TestCoercion:
+    @pytest.mark.parametrize('annotation, value, expected', [
+        (int, '12', 12),
+        (int, 12, 12),
+        (int, '12.0', 12),
+        (float, '1.5', 1.5),
+        (decimal.Decimal, '1.10', decimal.Decimal('1.10')),
+        (decimal.Decimal, 1.1, decimal.Decimal('1.1')),
+        (bool, 'yes', True),
+        (bool, 'false', False),
+        (datetime.date, '2018-01-15', datetime.date(2018, 1, 15)),
+        (datetime.date, '2018-01-15T12:00:00Z', datetime.date(2018, 1, 15)),
+        (datetime.time, '12:30:00', datetime.time(12, 30)),
+        (datetime.datetime, '2018-01-15T12:00:00', datetime.datetime(2018, 1, 15, 12)),
+        (Size, 'large', Size.LARGE),
+        (Size, 'SMALL', Size.SMALL),
+        (List[int], ['1', '2'], [1, 2]),
+        (List[int], '1', [1]),
+        (list, 'a', ['a']),
+        (Optional[int], '3', 3),
+        (str, 'x', 'x'),
+        (Money, '$1.25', 1.25),
+    ])
+    def test_convert(self, annotation, value, expected):
+        def view(param: annotation):
+            return param
+        result = Binding(view)({'param': value})
+        if annotation is Money:
+            result = result.cents / 100
+        assert result == expected
+
+    def test_function_annotation(self):
+        def view(name: str.upper):
+            return name
+        assert Binding(view)({'name': 'paris'}) == 'PARIS'
+
+    @pytest.mark.parametrize('value', [None, ''])
+    def test_missing_takes_default(self, value):
+        def view(number: int = 7, *, unit: Size = None):
+            return number, unit
+        assert Binding(view)({'number': value, 'unit': value}) == (7, None)
+
+    @pytest.mark.parametrize('annotation, value', [
+        (int, 'two'), (int, '1.5'), (float, True), (decimal.Decimal, 'abc'),
+        (datetime.date, 'tomorrow'), (Size, 'medium'), (List[int], ['1', 'x']), (bool, 'maybe'),
+    ])
+    def test_bad_value(self, annotation, value):
+        def view(param: annotation):
+            return param
+        with pytest.raises(ParameterError) as info:
+            Binding(view)({'param': value})
+        assert info.value.parameter == 'param'
+        assert info.value.value == value
+
+    def test_keyword_only_and_var_keyword(self):
+        def view(a: int, *, b: float, **rest):
+            return a, b, rest
+        assert Binding(view)({'a': '1', 'b': '2', 'c': '3'}) == (1, 2.0, {'c': '3'})
+
+    def test_string_annotations(self):
+        namespace = {}
+        exec('def view(number: "int", other: "Unknown"):\n    return number, other', namespace)
+        assert Binding(namespace['view'])({'number': '1', 'other': 'x'}) == ('1', 'x')
+
+
+class TestBadRequest:
+    def setup_method(self):
+        self.dispatcher = Dispatcher()
+
+        @self.dispatcher.action('hello')
+        def square(number: int):
+            return Response()
+
+    def test_dispatch_raises(self):
+        data = json.loads(json.dumps(sample_request))
+        data['result']['parameters'] = {'number': 'two'}
+        with pytest.raises(ParameterError):
+            self.dispatcher.dispatch(data)
+
+    def test_wsgi_body(self):
+        data = json.loads(json.dumps(sample_request))
+        data['result']['parameters'] = {'number': 'two'}
+        body = json.dumps(data).encode('utf-8')
+        statuses = []
+        from io import BytesIO
+        response = self.dispatcher.wsgi_app()({
+            'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'CONTENT_LENGTH': str(len(body)),
+            'wsgi.input': BytesIO(body)}, lambda status, headers: statuses.append(status))
+        assert statuses == ['400 Bad Request']
+        assert json.loads(b''.join(response)) == {
+            'status': 400, 'error': 'invalid_parameter', 'parameter': 'number', 'expected': 'int',
+            'message': 'Invalid value for parameter "number", expected int'}
@@ -0,0 +1,89 @@
+import asyncio
+import json
+import subprocess
+import sys
+
+import pytest
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.metrics import Metrics
+from flask_dialogflow.response import Response
+from flask_dialogflow.messages import TextMessage
+from sample_data import make_request, sample_context
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher()
+
+    @dispatcher.action('hello')
+    def hello(name='World'):
+        dispatcher.context_out = sample_context
+        response = Response()
+        response.append(TextMessage(speech='Hello, {}!'.format(name)))
+        return response
+
+    @dispatcher.action('async.hello')
+    async def async_hello(name='World'):
+        return hello(name)
+
+    return dispatcher
+
+
+class TestDispatcher:
+    def test_dispatch_dict(self, dispatcher):
+        data = json.loads(dispatcher.dispatch(make_request('hello', {'name': 'Bob'})))
+        assert data['messages'][0]['speech'] == 'Hello, Bob!'
+        assert data['contextOut'] == sample_context
+
+    def test_dispatch_bytes(self, dispatcher):
+        body = json.dumps(make_request('hello')).encode('utf-8')
+        assert json.loads(dispatcher.dispatch(body))['messages'][0]['speech'] == 'Hello, World!'
+        assert json.loads(dispatcher.dispatch(body.decode('utf-8')))['messages'][0]['speech'] == 'Hello, World!'
+
+    def test_dispatch_async(self, dispatcher):
+        body = asyncio.run(dispatcher.dispatch_async(make_request('async.hello', {'name': 'Ann'})))
+        assert json.loads(body)['messages'][0]['speech'] == 'Hello, Ann!'
+        body = asyncio.run(dispatcher.dispatch_async(make_request('hello')))
+        assert json.loads(body)['messages'][0]['speech'] == 'Hello, World!'
+        dispatcher.shutdown()
+
+    def test_dispatch_measured(self, dispatcher):
+        dispatcher.metrics = Metrics()
+        dispatcher.dispatch(json.dumps(make_request('hello')))
+        asyncio.run(dispatcher.dispatch_async(make_request('async.hello')))
+        assert dispatcher.metrics.actions['hello'].requests == 1
+        assert dispatcher.metrics.actions['async.hello'].requests == 1
+
+    def test_unknown_action(self, dispatcher):
+        with pytest.raises(NotImplementedError):
+            dispatcher.dispatch(make_request('unknown'))
+
+    def test_state_outside_request(self, dispatcher):
+        assert dispatcher.context_out is None
+        with pytest.raises(RuntimeError):
+            dispatcher.context_out = sample_context
+
+    def test_is_authorized(self):
+        dispatcher = Dispatcher(basic_auth_user='user', basic_auth_pass='secret')
+        assert dispatcher._is_authorized('Basic dXNlcjpzZWNyZXQ=')
+        assert dispatcher._is_authorized(b'Basic dXNlcjpzZWNyZXQ=')
+        assert not dispatcher._is_authorized('Basic dXNlcjpvdGhlcg==')
+        assert not dispatcher._is_authorized('Bearer token')
+        assert not dispatcher._is_authorized('Basic !!!')
+        assert not dispatcher._is_authorized(None)
+        assert Dispatcher()._is_authorized(None)
+
+    def test_no_flask_import(self):
+        code = ('import sys; from flask_dialogflow.core import Dispatcher; '
+                'from flask_dialogflow import Response; '
+                'sys.exit("flask" in sys.modules)')
+        assert subprocess.run([sys.executable, '-c', code]).returncode == 0
+
+    def test_lazy_imports(self):
+        # the optional features are imported on first use, not with the package
+        code = ('import sys, flask_dialogflow; '
+                'loaded = [name for name in ("logging", "gzip", "hmac", "http.client") if name in sys.modules]; '
+                'flask_dialogflow.BasicAuth, flask_dialogflow.TaskQueue; '
+                'sys.exit(loaded or "hmac" not in sys.modules)')
+        assert subprocess.run([sys.executable, '-c', code]).returncode == 0
@@ -0,0 +1,155 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.dialogflow import DialogFlow
+from sample_data import call_asgi, make_request, speech, text_response
+
+WEBHOOK_ENDPOINT = '/webhook'
+
+
+def post(app, action):
+    app_response = app.test_client().post(WEBHOOK_ENDPOINT, data=json.dumps(make_request(action)),
+                                          content_type='application/json')
+    return json.loads(app_response.data)
+
+
+@pytest.fixture
+def release():
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+@pytest.fixture
+def dialogflow(release):
+    dialogflow = DialogFlow(route=WEBHOOK_ENDPOINT, deadline=0.05,
+                            fallback=text_response('Try again').freeze())
+
+    @dialogflow.action('fast')
+    def fast():
+        return text_response('fast')
+
+    @dialogflow.action('slow')
+    def slow():
+        release.wait(5)
+        return text_response('slow')
+
+    @dialogflow.action('slow.own', deadline=0.05, fallback=text_response('Own fallback'))
+    def slow_own():
+        release.wait(5)
+        return text_response('slow')
+
+    @dialogflow.action('slow.async')
+    async def slow_async():
+        await asyncio.sleep(5)
+        return text_response('slow')
+
+    @dialogflow.action('slow.unbounded', deadline=5)
+    def slow_unbounded():
+        time.sleep(0.1)
+        return text_response('slow')
+
+    yield dialogflow
+    release.set()
+    dialogflow.shutdown()
+
+
+@pytest.fixture
+def app(dialogflow):
+    app = Flask(__name__)
+    app.testing = True
+    dialogflow.init_app(app, WEBHOOK_ENDPOINT)
+    return app
+
+
+class TestDeadline:
+    def test_in_time(self, app):
+        assert speech(post(app, 'fast')) == 'fast'
+        assert speech(post(app, 'slow.unbounded')) == 'slow'
+
+    def test_global_fallback(self, app, dialogflow):
+        start = time.perf_counter()
+        assert speech(post(app, 'slow')) == 'Try again'
+        assert time.perf_counter() - start < 1
+        assert dialogflow.deadline_misses['slow'] == 1
+
+    def test_action_fallback(self, app, dialogflow):
+        assert speech(post(app, 'slow.own')) == 'Own fallback'
+        assert dialogflow.deadline_misses == {'slow.own': 1}
+
+    def test_default_fallback(self, app, dialogflow):
+        dialogflow.fallback = None
+
+        @dialogflow.default
+        def default():
+            return text_response('default ' + dialogflow.intent)
+
+        assert speech(post(app, 'slow')) == 'default hello'
+
+    def test_empty_fallback(self, app, dialogflow):
+        dialogflow.fallback = None
+        assert post(app, 'slow') == {'messages': []}
+
+    def test_late_result_cached(self, app, dialogflow, release):
+        cache = TTLCache()
+        calls = []
+
+        @dialogflow.action('slow.cached', cache=cache)
+        def slow_cached():
+            calls.append(1)
+            release.wait(5)
+            return text_response('late')
+
+        assert speech(post(app, 'slow.cached')) == 'Try again'
+        release.set()
+        for _ in range(100):
+            if len(cache):
+                break
+            time.sleep(0.01)
+        assert speech(post(app, 'slow.cached')) == 'late'
+        assert calls == [1]
+
+    @pytest.mark.parametrize('use_async', [False, True])
+    def test_queued_view_functions_cancelled(self, use_async):
+        dispatcher = DialogFlow(deadline=0.02, max_workers=1)
+        calls = []
+
+        @dispatcher.action('slow.{n}')
+        def slow(n):
+            calls.append(n)
+            return text_response('slow')
+
+        # keep the only worker busy until every request missed its deadline in the queue
+        release = threading.Event()
+        dispatcher.executor.submit(release.wait)
+        for n in range(3):
+            request = make_request('slow.{}'.format(n))
+            if use_async:
+                asyncio.run(dispatcher.dispatch_async(request))
+            else:
+                dispatcher.dispatch(request)
+        release.set()
+        dispatcher.shutdown()
+        assert calls == []
+        assert dispatcher.deadline_misses == {'slow.{n}': 3}
+
+
+class TestASGIDeadline:
+    def test_async_fallback(self, dialogflow):
+        status, body = asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('slow.async')))
+        assert status == 200
+        assert speech(body) == 'Try again'
+        assert dialogflow.deadline_misses['slow.async'] == 1
+
+    def test_sync_fallback(self, dialogflow):
+        app = dialogflow.asgi_app()
+        status, body = asyncio.run(call_asgi(app, make_request('slow.own')))
+        assert speech(body) == 'Own fallback'
+        status, body = asyncio.run(call_asgi(app, make_request('fast')))
+        assert speech(body) == 'fast'
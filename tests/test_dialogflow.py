@@ -11,6 +11,7 @@ WEBHOOK_ENDPOINT = '/webhook'
 response = Response()
 text_msg = TextMessage(speech="Hi there!")
 response.append(text_msg)
+frozen_response = response.freeze()
 
 @pytest.fixture
 def app():
@@ -24,8 +25,25 @@ def app():
         dialogflow.context_out = sample_context
         return response
 
+    @dialogflow.action('frozen')
+    def frozen():
+        return frozen_response
+
+    @dialogflow.action('frozen.context')
+    def frozen_context():
+        dialogflow.context_out = sample_context
+        return frozen_response
+
     return app
 
+
+def post(app, action):
+    data = dict(sample_request, result=dict(sample_request['result'], action=action))
+    app_response = app.test_client().post(WEBHOOK_ENDPOINT,
+                    data=json.dumps(data),
+                    content_type='application/json')
+    return json.loads(app_response.data)
+
 class TestMessages:
 
     def test_response(self, app):
@@ -44,4 +62,12 @@ class TestMessages:
         json_data = json.loads(app_response.data)
         assert 'contextOut' in json_data
         assert json_data['contextOut'] == sample_context
-        
\ No newline at end of file
+
+    def test_frozen_response(self, app):
+        json_data = post(app, 'frozen')
+        assert json_data == {'messages': [{'type': 0, 'speech': 'Hi there!'}]}
+
+    def test_frozen_response_context_out(self, app):
+        json_data = post(app, 'frozen.context')
+        assert json_data['messages'][0]['speech'] == 'Hi there!'
+        assert json_data['contextOut'] == sample_context
@@ -0,0 +1,190 @@
+import json
+import time
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.admission import AdmissionControl
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.errors import InvalidPayload
+from flask_dialogflow.formats import V1, V2, message_v2, response_v2, version_of
+from flask_dialogflow.messages import CardMessage, ImageMessage, Platform, QuickReplyMessage, TextMessage
+from flask_dialogflow.response import Response
+from sample_data import sample_request, sample_request_v2, text_response
+
+SESSION = sample_request_v2['session']
+
+
+def make_request_v2(action='hello', **result):
+    data = json.loads(json.dumps(sample_request_v2))
+    data['queryResult']['action'] = action
+    data['queryResult'].update(result)
+    return data
+
+
+class TestMessages:
+    def test_text(self):
+        assert message_v2(TextMessage('Hi').to_dict()) == {'text': {'text': ['Hi']}}
+        assert message_v2(TextMessage('Hi', platform=Platform.FACEBOOK).to_dict()) == \
+            {'text': {'text': ['Hi']}, 'platform': 'FACEBOOK'}
+
+    def test_card(self):
+        card = CardMessage([{'text': 'Open', 'postback': 'https://example.com'}],
+                           'https://example.com/a.png', 'Title', 'Subtitle', platform=Platform.SLACK)
+        assert message_v2(card.to_dict()) == {
+            'card': {'title': 'Title', 'subtitle': 'Subtitle', 'imageUri': 'https://example.com/a.png',
+                     'buttons': [{'text': 'Open', 'postback': 'https://example.com'}]},
+            'platform': 'SLACK'}
+
+    def test_quick_replies_and_image(self):
+        assert message_v2(QuickReplyMessage('Pick', ['a', 'b']).to_dict()) == \
+            {'quickReplies': {'title': 'Pick', 'quickReplies': ['a', 'b']}}
+        assert message_v2(ImageMessage('https://example.com/a.png').to_dict()) == \
+            {'image': {'imageUri': 'https://example.com/a.png'}}
+
+    def test_custom(self):
+        assert message_v2({'type': 4, 'payload': {'x': 1}, 'platform': 'google'}) == \
+            {'payload': {'x': 1}, 'platform': 'ACTIONS_ON_GOOGLE'}
+        assert message_v2({'something': 'else'}) == {'something': 'else'}
+
+
+class TestResponses:
+    def test_response_v2(self):
+        data = {'messages': [{'type': 0, 'speech': 'Hi'}], 'speech': 'Hi', 'data': {'x': 1},
+                'contextOut': {'name': 'user', 'lifespan': 2, 'parameters': {'a': 1}},
+                'followupEvent': {'name': 'welcome', 'data': {'b': 2}}, 'source': 'webhook'}
+        assert response_v2(data, SESSION) == {
+            'fulfillmentMessages': [{'text': {'text': ['Hi']}}],
+            'fulfillmentText': 'Hi',
+            'payload': {'x': 1},
+            'outputContexts': [{'name': SESSION + '/contexts/user', 'lifespanCount': 2, 'parameters': {'a': 1}}],
+            'followupEventInput': {'name': 'welcome', 'parameters': {'b': 2}},
+            'source': 'webhook',
+        }
+
+    @pytest.mark.parametrize('freeze', [False, True])
+    def test_render(self, freeze):
+        response = text_response('Hi')
+        response.contextOut = [{'name': 'static', 'lifespan': 1}]
+        if freeze:
+            response = response.freeze()
+        assert json.loads(response.render(None, V2, SESSION)) == {
+            'fulfillmentMessages': [{'text': {'text': ['Hi']}}],
+            'outputContexts': [{'name': SESSION + '/contexts/static', 'lifespanCount': 1}]}
+        data = json.loads(response.render({'name': 'user'}, V2, SESSION))
+        assert data['outputContexts'] == [{'name': SESSION + '/contexts/user'}]
+        assert json.loads(response.render())['contextOut'] == [{'name': 'static', 'lifespan': 1}]
+
+    def test_empty_frozen_response(self):
+        assert json.loads(Response().freeze().render(None, V2, SESSION)) == {'fulfillmentMessages': []}
+
+
+class TestDispatch:
+    def test_version_of(self):
+        assert version_of(sample_request) == V1
+        assert version_of(sample_request_v2) == V2
+        assert version_of(None) == V1
+
+    def test_same_view_function(self):
+        dispatcher = Dispatcher()
+        seen = {}
+
+        @dispatcher.action('order.{step}')
+        def order(step, number=None):
+            seen.update(step=step, number=number, intent=dispatcher.intent,
+                        context=dispatcher.get_context('user'),
+                        original=dispatcher.original_request)
+            dispatcher.context_out = {'name': 'order', 'lifespan': 3, 'parameters': {'step': step}}
+            return text_response('Step {}'.format(step))
+
+        body = json.loads(dispatcher.dispatch(make_request_v2('order.confirm', parameters={'number': '3'})))
+        assert seen == {'step': 'confirm', 'number': '3', 'intent': 'hello',
+                        'context': {'name': 'user', 'lifespan': 5, 'parameters': {'name': 'Jane'}},
+                        'original': {'source': 'facebook', 'payload': {}}}
+        assert body == {
+            'fulfillmentMessages': [{'text': {'text': ['Step confirm']}}],
+            'outputContexts': [{'name': SESSION + '/contexts/order', 'lifespanCount': 3,
+                                'parameters': {'step': 'confirm'}}]}
+
+        v1 = json.loads(json.dumps(sample_request))
+        v1['result'].update(action='order.confirm', parameters={'number': '3'})
+        body = json.loads(dispatcher.dispatch(v1))
+        assert body['messages'] == [{'type': 0, 'speech': 'Step confirm'}]
+        assert body['contextOut']['name'] == 'order'
+
+    def test_missing_action(self):
+        dispatcher = Dispatcher()
+        dispatcher.default(lambda: text_response('default'))
+        data = make_request_v2()
+        del data['queryResult']['action'], data['queryResult']['parameters']
+        assert json.loads(dispatcher.dispatch(data))['fulfillmentMessages'] == [{'text': {'text': ['default']}}]
+
+    def test_validation(self):
+        dispatcher = Dispatcher()
+        dispatcher.default(lambda: Response())
+        data = make_request_v2()
+        del data['session']
+        with pytest.raises(InvalidPayload) as error:
+            dispatcher.dispatch(data)
+        assert error.value.field == 'session'
+
+    def test_cache(self):
+        dispatcher = Dispatcher()
+        calls = []
+
+        @dispatcher.action('hello', cache=TTLCache())
+        def hello():
+            calls.append(1)
+            return text_response('Hi')
+
+        v1 = json.loads(json.dumps(sample_request))
+        for data in (v1, make_request_v2(), v1, make_request_v2()):
+            dispatcher.dispatch(data)
+        assert len(calls) == 2
+        assert 'messages' in json.loads(dispatcher.dispatch(v1))
+        assert 'fulfillmentMessages' in json.loads(dispatcher.dispatch(make_request_v2()))
+
+    def test_responses_with_output_contexts_are_not_cached(self):
+        dispatcher = Dispatcher()
+        calls = []
+
+        @dispatcher.action('hello', cache=TTLCache())
+        def hello():
+            calls.append(1)
+            dispatcher.context_out = {'name': 'user'}
+            return Response()
+
+        other = make_request_v2()
+        other['session'] = 'projects/sample-agent/agent/sessions/other'
+        dispatcher.dispatch(make_request_v2())
+        body = json.loads(dispatcher.dispatch(other))
+        assert len(calls) == 2
+        assert body['outputContexts'] == [{'name': other['session'] + '/contexts/user'}]
+
+    def test_flask(self):
+        app = Flask(__name__)
+        dialogflow = DialogFlow(app, '/webhook')
+
+        @dialogflow.action('hello')
+        def hello():
+            return text_response('Hello ' + dialogflow.get_context('user')['parameters']['name'])
+
+        response = app.test_client().post('/webhook', data=json.dumps(sample_request_v2))
+        assert response.status_code == 200
+        assert response.get_json() == {'fulfillmentMessages': [{'text': {'text': ['Hello Jane']}}]}
+
+    def test_static_responses(self):
+        dispatcher = Dispatcher(deadline=0.01, fallback=text_response('Later'))
+        dispatcher.default(lambda: time.sleep(0.1))
+        assert json.loads(dispatcher.dispatch(make_request_v2())) == \
+            {'fulfillmentMessages': [{'text': {'text': ['Later']}}]}
+        dispatcher.shutdown()
+
+        admission = AdmissionControl(session_rate=1, session_burst=1)
+        dispatcher = Dispatcher(admission=admission)
+        dispatcher.default(lambda: Response())
+        dispatcher.dispatch(make_request_v2())
+        body = json.loads(dispatcher.dispatch(make_request_v2()))
+        assert 'try again' in body['fulfillmentMessages'][0]['text']['text'][0]
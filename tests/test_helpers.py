@@ -1,6 +1,7 @@
+import json
 import pytest
 
-from flask_dialogflow.helpers import TypedList
+from flask_dialogflow.helpers import TypedList, JSON_BACKENDS, json_dumps, set_json_backend
 
 
 class TestTypedList:
@@ -28,4 +29,43 @@ class TestTypedList:
         assert len(obj) == 1
         assert obj[0] == 1
         obj.append(2)
-        assert obj[1] == 2
\ No newline at end of file
+        assert obj[1] == 2
+
+    def test_extend(self):
+        obj = TypedList(int)
+        obj.extend(iter([1, 2, 3]))
+        assert obj == [1, 2, 3]
+
+    def test_extend_exception(self):
+        obj = TypedList(int)
+        with pytest.raises(Exception) as excinfo:
+            obj.extend([1, 'a'])
+        assert 'item is not of type' in str(excinfo.value)
+        assert len(obj) == 0
+
+
+class TestJsonBackend:
+    def teardown_method(self):
+        set_json_backend('orjson' if 'orjson' in JSON_BACKENDS else 'json')
+
+    def test_dumps(self):
+        assert json.loads(json_dumps({'a': [1, 'b']})) == {'a': [1, 'b']}
+        assert isinstance(json_dumps({}), bytes)
+
+    def test_stdlib(self):
+        set_json_backend('json')
+        assert json_dumps({'a': 1}) == b'{"a":1}'
+
+    @pytest.mark.parametrize('backend', sorted(JSON_BACKENDS))
+    def test_same_output(self, backend):
+        data = {'contextOut': [{'name': 'cart', 'parameters': {1: 'apple', 2.5: None, True: ['pear']}}]}
+        set_json_backend(backend)
+        assert json_dumps(data) == json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+    def test_callable(self):
+        set_json_backend(lambda obj: b'custom')
+        assert json_dumps({'a': 1}) == b'custom'
+
+    def test_unknown(self):
+        with pytest.raises(ValueError):
+            set_json_backend('unknown')
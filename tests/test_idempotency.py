@@ -0,0 +1,218 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.idempotency import Idempotency, IdempotencyStore
+from flask_dialogflow.response import Response
+from flask_dialogflow.messages import TextMessage
+from sample_data import make_request
+
+
+class DictStore(IdempotencyStore):
+    def __init__(self):
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value):
+        self.data[key] = value
+
+
+class TestIdempotency:
+    def test_store(self):
+        idempotency = Idempotency()
+        calls = []
+        assert idempotency.run('id', lambda: calls.append(1) or b'body') == b'body'
+        assert idempotency.run('id', lambda: calls.append(1) or b'other') == b'body'
+        assert calls == [1]
+        assert (idempotency.executions, idempotency.hits) == (1, 1)
+
+    def test_none_not_stored(self):
+        idempotency = Idempotency()
+        idempotency.run('id', lambda: None)
+        assert idempotency.run('id', lambda: b'body') == b'body'
+
+    def test_custom_store(self):
+        store = DictStore()
+        idempotency = Idempotency(store=store)
+        idempotency.run('id', lambda: b'body')
+        assert store.data == {'id': b'body'}
+
+    @pytest.mark.parametrize('use_async', [False, True])
+    def test_retry_while_storing(self, use_async):
+        idempotency = Idempotency(store=DictStore())
+        storing = threading.Event()
+        calls = []
+        retried = []
+
+        def slow_set(key, value):
+            storing.set()
+            time.sleep(0.1)
+            DictStore.set(idempotency.store, key, value)
+        idempotency.store.set = slow_set
+
+        def retry():
+            storing.wait(5)
+            retried.append(idempotency.run('id', lambda: calls.append(1) or b'again'))
+        thread = threading.Thread(target=retry)
+        thread.start()
+
+        if use_async:
+            async def func():
+                calls.append(1)
+                return b'body'
+            asyncio.run(idempotency.run_async('id', func))
+        else:
+            idempotency.run('id', lambda: calls.append(1) or b'body')
+        thread.join()
+        assert calls == [1]
+        assert retried == [b'body']
+
+    def test_coalesce_threads(self):
+        idempotency = Idempotency()
+        release = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            release.wait(5)
+            return b'body'
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(idempotency.run('id', slow)))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        while idempotency.coalesced < 9:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert results == [b'body'] * 10
+        assert calls == [1]
+
+    def test_error_shared(self):
+        idempotency = Idempotency()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait(5)
+            raise ValueError('boom')
+
+        def run():
+            try:
+                idempotency.run('id', failing)
+            except ValueError as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=run) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        while idempotency.coalesced < 2:
+            time.sleep(0.001)
+        release.set()
+        for thread in threads:
+            thread.join()
+        assert len(errors) == 3
+        assert idempotency.run('id', lambda: b'retry') == b'retry'
+
+    def test_coalesce_async(self):
+        idempotency = Idempotency()
+        calls = []
+
+        async def slow():
+            calls.append(1)
+            await asyncio.sleep(0.05)
+            return b'body'
+
+        async def run():
+            return await asyncio.gather(*[idempotency.run_async('id', slow) for _ in range(10)])
+
+        assert asyncio.run(run()) == [b'body'] * 10
+        assert calls == [1]
+        assert idempotency.coalesced == 9
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher(idempotency=Idempotency())
+    dispatcher.calls = []
+
+    @dispatcher.action('slow')
+    async def slow():
+        dispatcher.calls.append(1)
+        await asyncio.sleep(0.05)
+        response = Response()
+        response.append(TextMessage(speech='done'))
+        return response
+
+    return dispatcher
+
+
+class TestDispatcherIdempotency:
+    def test_retries(self, dispatcher):
+        first = dispatcher.dispatch(make_request('slow', id='a'))
+        assert dispatcher.dispatch(make_request('slow', id='a')) == first
+        dispatcher.dispatch(make_request('slow', id='b'))
+        assert dispatcher.calls == [1, 1]
+
+    def test_no_id(self, dispatcher):
+        data = make_request('slow', id='a')
+        del data['id']
+        dispatcher.dispatch(data)
+        dispatcher.dispatch(data)
+        assert dispatcher.calls == [1, 1]
+
+    def test_concurrent_async(self, dispatcher):
+        async def run():
+            return await asyncio.gather(*[dispatcher.dispatch_async(make_request('slow', id='a'))
+                                          for _ in range(20)])
+        bodies = asyncio.run(run())
+        assert len(set(bodies)) == 1
+        assert dispatcher.calls == [1]
+        dispatcher.shutdown()
+
+    def test_late_result_replaces_fallback(self):
+        release = threading.Event()
+        dispatcher = Dispatcher(idempotency=Idempotency(), deadline=0.01)
+
+        @dispatcher.action('slow')
+        def slow():
+            release.wait(5)
+            response = Response()
+            response.append(TextMessage(speech='late'))
+            return response
+
+        assert json.loads(dispatcher.dispatch(make_request('slow', id='a'))) == {'messages': []}
+        release.set()
+        dispatcher.shutdown()
+        assert json.loads(dispatcher.dispatch(make_request('slow', id='a')))['messages'][0]['speech'] == 'late'
+
+    def test_slow_fallback_keeps_late_result(self):
+        dispatcher = Dispatcher(idempotency=Idempotency(), deadline=0.05)
+
+        @dispatcher.action('slow')
+        def slow():
+            time.sleep(0.1)
+            response = Response()
+            response.append(TextMessage(speech='late'))
+            return response
+
+        @dispatcher.default
+        def fallback():
+            # still running when the late view function stores its response
+            time.sleep(0.2)
+            response = Response()
+            response.append(TextMessage(speech='fallback'))
+            return response
+
+        first = json.loads(dispatcher.dispatch(make_request('slow', id='a')))
+        assert first['messages'][0]['speech'] == 'fallback'
+        dispatcher.shutdown()
+        assert json.loads(dispatcher.dispatch(make_request('slow', id='a')))['messages'][0]['speech'] == 'late'
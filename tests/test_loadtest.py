@@ -0,0 +1,89 @@
+import gzip
+import json
+
+import pytest
+
+from flask_dialogflow import loadtest
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from sample_data import sample_request
+
+dispatcher = Dispatcher(route='/webhook')
+
+
+@dispatcher.action('ok')
+def ok():
+    return Response()
+
+
+@dispatcher.action('fail')
+def fail():
+    return None
+
+
+wsgi_app = dispatcher.wsgi_app()
+asgi_app = dispatcher.asgi_app()
+
+
+def payloads(*actions):
+    return loadtest.synthesize(sample_request, list(actions), {}, 10)
+
+
+class TestPayloads:
+    def test_synthesize(self):
+        requests = loadtest.synthesize(sample_request, ['a', 'b'], {'number': '3'}, 4, sessions=2)
+        assert [request['result']['action'] for request in requests] == ['a', 'b', 'a', 'b']
+        assert requests[0]['result']['parameters'] == {'number': '3'}
+        assert len({request['id'] for request in requests}) == 4
+        assert len({request['sessionId'] for request in requests}) == 2
+        assert sample_request['result']['parameters'] == {}
+
+    def test_load_jsonl(self, tmp_path):
+        path = str(tmp_path / 'traffic.jsonl.gz')
+        with gzip.open(path, 'wt') as output:
+            output.write(json.dumps(sample_request) + '\n\n')
+            output.write(json.dumps({'time': 1, 'request': sample_request}) + '\n')
+        assert loadtest.load_payloads(path) == [sample_request, sample_request]
+
+
+class TestRun:
+    @pytest.mark.parametrize('mode', ['threads', 'asyncio'])
+    def test_report(self, mode):
+        report = loadtest.run(dispatcher, payloads('ok', 'fail'), route='/webhook', mode=mode,
+                              concurrency=3, requests=40)
+        assert report['requests'] == 40
+        assert report['errors'] == 20
+        assert report['error_rate'] == 0.5
+        assert report['actions']['ok']['errors'] == 0
+        assert report['actions']['fail']['requests'] == 20
+        assert 0 <= report['p50_ms'] <= report['p99_ms'] <= report['max_ms']
+
+    def test_duration(self):
+        report = loadtest.run(dispatcher.wsgi_app(), payloads('ok'), route='/webhook', duration=0.05)
+        assert report['requests'] > 0
+        assert report['errors'] == 0
+
+    def test_wrong_mode(self):
+        with pytest.raises(ValueError):
+            loadtest.run(dispatcher.wsgi_app(), payloads('ok'), mode='asyncio')
+
+
+class TestMain:
+    def test_cli(self, capsys):
+        assert loadtest.main(['--app', 'test_loadtest:dispatcher', '--route', '/webhook',
+                              '--action', 'ok', '--requests', '20', '--concurrency', '2', '--json']) == 0
+        report = json.loads(capsys.readouterr().out)
+        assert report['requests'] == 20
+        assert list(report['actions']) == ['ok']
+
+    def test_text_report(self, capsys):
+        loadtest.main(['--app', 'test_loadtest:dispatcher', '--route', '/webhook',
+                       '--action', 'ok', '--requests', '5'])
+        assert 'TOTAL' in capsys.readouterr().out
+
+    @pytest.mark.parametrize('mode, app', [('asyncio', 'wsgi_app'), ('threads', 'asgi_app')])
+    def test_wrong_mode(self, mode, app, capsys):
+        with pytest.raises(SystemExit) as error:
+            loadtest.main(['--app', 'test_loadtest:' + app, '--mode', mode, '--requests', '1'])
+        assert error.value.code == 2
+        assert '--mode {} needs'.format(mode) in capsys.readouterr().err
@@ -1,7 +1,7 @@
 import pytest
 import json
 from flask_dialogflow.messages import MessageEncoder, TextMessage, Message, \
-        MessageType, ImageMessage
+        MessageType, ImageMessage, QuickReplyMessage, CardMessage, Platform
 
 
 @pytest.fixture
@@ -22,7 +22,12 @@ class TestTextMessages:
         assert "Hello!" in text
 
     def test_type(self, txt_msg):
-        assert set(["speech", "type"]).issubset(txt_msg.__dict__.keys())
+        assert set(["speech", "type"]).issubset(txt_msg.to_dict().keys())
+
+    def test_slots(self, txt_msg):
+        assert not hasattr(txt_msg, '__dict__')
+        with pytest.raises(AttributeError):
+            txt_msg.unknown = 1
 
 class TestImageMessages:
     def test_isinstance(self, img_msg):
@@ -33,4 +38,31 @@ class TestImageMessages:
         assert isinstance(text, str)
 
     def test_type(self, img_msg):
-        assert set(["imageUrl", "type"]).issubset(img_msg.__dict__.keys())
\ No newline at end of file
+        assert set(["imageUrl", "type"]).issubset(img_msg.to_dict().keys())
+
+class TestToDict:
+    def test_text(self, txt_msg):
+        assert txt_msg.to_dict() == {'type': 0, 'speech': 'Hello!'}
+
+    def test_platform(self):
+        msg = TextMessage(speech='Hi', platform=Platform.SLACK)
+        assert msg.to_dict()['platform'] == 'slack'
+        assert json.loads(json.dumps(msg, cls=MessageEncoder))['platform'] == 'slack'
+
+    def test_image(self, img_msg):
+        assert img_msg.to_dict() == {'type': 3, 'imageUrl': 'example.com/1.png'}
+
+    def test_quick_reply(self):
+        msg = QuickReplyMessage(title='Pick one', replies=['a', 'b'])
+        assert msg.to_dict() == {'type': 2, 'title': 'Pick one', 'replies': ['a', 'b']}
+
+    def test_card(self):
+        msg = CardMessage(buttons=[], image_url='example.com/1.png', title='T', subtitle='S')
+        assert set(msg.to_dict()) == {'type', 'buttons', 'imageUrl', 'title', 'subtitle'}
+
+    def test_custom(self):
+        class Custom(Message):
+            def __init__(self):
+                self.type = MessageType.CUSTOM.value
+                self.payload = {'key': 'value'}
+        assert Custom().to_dict() == {'type': 4, 'payload': {'key': 'value'}}
@@ -0,0 +1,144 @@
+import asyncio
+import json
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.metrics import Histogram, Metrics, MetricsSink, PHASES
+from flask_dialogflow.response import Response
+from flask_dialogflow.messages import TextMessage
+from sample_data import call_asgi, make_request
+
+WEBHOOK_ENDPOINT = '/webhook'
+METRICS_ENDPOINT = '/metrics'
+
+
+class ListSink(MetricsSink):
+    def __init__(self):
+        self.records = []
+
+    def record(self, action, marks, error=False):
+        self.records.append((action, len(marks), error))
+
+
+class TestHistogram:
+    def test_observe(self):
+        histogram = Histogram(buckets=(0.1, 1.0))
+        for value in (0.05, 0.1, 0.5, 2):
+            histogram.observe(value)
+        assert histogram.count == 4
+        assert histogram.sum == pytest.approx(2.65)
+        assert histogram.cumulative() == [(0.1, 2), (1.0, 3), (float('inf'), 4)]
+
+
+class TestMetrics:
+    def test_record(self):
+        metrics = Metrics()
+        metrics.record('a', [0.0, 0.001, 0.002, 0.012, 0.013])
+        metrics.record('a', [0.0, 0.001], error=True)
+        stats = metrics.actions['a']
+        assert (stats.requests, stats.errors) == (2, 1)
+        assert stats.latency.count == 2
+        assert stats.phases['parse'].count == 2
+        assert stats.phases['handler'].count == 1
+        assert stats.phases['handler'].sum == pytest.approx(0.01)
+
+    def test_prometheus(self):
+        metrics = Metrics(buckets=(0.01,))
+        metrics.record('say "hi"', [0.0, 0.001, 0.002, 0.003, 0.004])
+        text = metrics.prometheus()
+        assert 'dialogflow_requests_total{action="say \\"hi\\""} 1' in text
+        assert 'dialogflow_errors_total{action="say \\"hi\\""} 0' in text
+        assert ('dialogflow_phase_duration_seconds_bucket'
+                '{action="say \\"hi\\"",phase="serialize",le="+Inf"} 1') in text
+        assert 'dialogflow_request_duration_seconds_count{action="say \\"hi\\""} 1' in text
+
+    def test_reset(self):
+        metrics = Metrics()
+        metrics.record('a', [0.0, 0.1])
+        metrics.reset()
+        assert metrics.actions == {}
+
+
+@pytest.fixture
+def dialogflow():
+    dialogflow = DialogFlow(route=WEBHOOK_ENDPOINT, metrics=ListSink())
+
+    @dialogflow.action('hello')
+    def hello():
+        response = Response()
+        response.append(TextMessage(speech='Hi!'))
+        return response
+
+    @dialogflow.action('cached', cache=TTLCache())
+    def cached():
+        return hello()
+
+    @dialogflow.action('broken')
+    def broken():
+        raise ValueError('broken')
+
+    return dialogflow
+
+
+def post(app, action, path=WEBHOOK_ENDPOINT):
+    return app.test_client().post(path, data=json.dumps(make_request(action)),
+                                  content_type='application/json')
+
+
+class TestInstrumentation:
+    def test_phases(self, dialogflow):
+        app = Flask(__name__)
+        dialogflow.init_app(app, WEBHOOK_ENDPOINT)
+        post(app, 'hello')
+        post(app, 'cached')
+        post(app, 'cached')
+        assert dialogflow.metrics.records == [
+            ('hello', len(PHASES) + 1, False),
+            ('cached', len(PHASES) + 1, False),
+            ('cached', 3, False),
+        ]
+
+    def test_error(self, dialogflow):
+        app = Flask(__name__)
+        dialogflow.init_app(app, WEBHOOK_ENDPOINT)
+        assert post(app, 'broken').status_code == 500
+        assert dialogflow.metrics.records == [('broken', 3, True)]
+
+    def test_bounded_labels(self, dialogflow):
+        @dialogflow.action('order.{step}')
+        def order(step):
+            return Response()
+
+        dialogflow.default(lambda: Response())
+        for action in ('order.start', 'order.confirm', 'rand0', 'rand1'):
+            dialogflow.dispatch(make_request(action))
+        with pytest.raises(ValueError):
+            dialogflow.dispatch(b'not json')
+        assert [record[0] for record in dialogflow.metrics.records] == \
+            ['order.{step}', 'order.{step}', 'unknown', 'unknown', 'unknown']
+
+    def test_asgi(self, dialogflow):
+        asyncio.run(call_asgi(dialogflow.asgi_app(), make_request('hello')))
+        assert dialogflow.metrics.records == [('hello', len(PHASES) + 1, False)]
+
+    def test_metrics_route(self):
+        app = Flask(__name__)
+        dialogflow = DialogFlow(app, WEBHOOK_ENDPOINT, metrics_route=METRICS_ENDPOINT)
+
+        @dialogflow.action('hello')
+        def hello():
+            return Response()
+
+        post(app, 'hello')
+        app_response = app.test_client().get(METRICS_ENDPOINT)
+        assert app_response.status_code == 200
+        assert app_response.mimetype == 'text/plain'
+        assert b'dialogflow_requests_total{action="hello"} 1' in app_response.data
+
+    def test_metrics_route_requires_metrics(self):
+        with pytest.raises(ValueError):
+            DialogFlow(Flask(__name__), WEBHOOK_ENDPOINT, metrics=ListSink(),
+                       metrics_route=METRICS_ENDPOINT)
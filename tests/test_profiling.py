@@ -0,0 +1,136 @@
+import asyncio
+import base64
+import io
+import json
+import os
+import pstats
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.profiling import Profiler
+from flask_dialogflow.response import Response
+from sample_data import FakeClock, make_request
+
+
+def busy():
+    return sum(i * i for i in range(1000))
+
+
+def register(dispatcher):
+    @dispatcher.action('hello')
+    def hello():
+        busy()
+        return Response()
+
+    @dispatcher.action('other')
+    async def other():
+        busy()
+        return Response()
+    return dispatcher
+
+
+class TestProfiler:
+    def test_selected_actions(self):
+        profiler = Profiler(actions=['hello'])
+        dispatcher = register(Dispatcher(profiler=profiler))
+        dispatcher.dispatch(make_request('hello'))
+        dispatcher.dispatch(make_request('hello'))
+        dispatcher.dispatch(make_request('other'))
+        assert profiler.profiled == 2
+        report = profiler.report()
+        assert '=== hello (2 requests) ===' in report
+        assert 'busy' in report
+        assert 'other' not in report
+
+    def test_pattern_actions(self, tmp_path):
+        profiler = Profiler(rate=1.0, directory=str(tmp_path))
+        dispatcher = register(Dispatcher(profiler=profiler))
+
+        @dispatcher.action('order.{step}')
+        def order(step):
+            return Response()
+
+        dispatcher.default(lambda: Response())
+        for action in ('order.a', 'order.b', 'nope.1', 'nope.2'):
+            dispatcher.dispatch(make_request(action))
+        assert '=== order.{step} (2 requests) ===' in profiler.report()
+        assert '=== unknown (2 requests) ===' in profiler.report()
+        assert len(profiler.dump()) == 2
+
+    def test_sampling(self):
+        profiler = Profiler(rate=1.0)
+        dispatcher = register(Dispatcher(profiler=profiler))
+        dispatcher.dispatch(make_request('hello'))
+        asyncio.run(dispatcher.dispatch_async(make_request('other')))
+        assert profiler.profiled == 2
+        assert '=== other (1 requests) ===' in profiler.report('other')
+        assert 'hello' not in profiler.report('other')
+
+    def test_requested(self):
+        profiler = Profiler(token='s3cret')
+        dispatcher = register(Dispatcher(profiler=profiler))
+        dispatcher.dispatch(make_request('hello'))
+        assert profiler.profiled == 0
+        dispatcher.dispatch(make_request('hello'), profile=True)
+        assert profiler.profiled == 1
+        assert profiler.requested('s3cret') and profiler.requested(b's3cret')
+        assert not profiler.requested('wrong') and not profiler.requested(None)
+        assert Profiler().requested('1')
+
+    def test_window_dump(self, tmp_path):
+        clock = FakeClock()
+        profiler = Profiler(actions=['hello'], window=60, directory=str(tmp_path), timer=clock)
+        dispatcher = register(Dispatcher(profiler=profiler))
+        dispatcher.dispatch(make_request('hello'))
+        assert os.listdir(str(tmp_path)) == []
+        clock.now = 61
+        assert profiler.report() == 'No profiled request.\n'
+        name, = os.listdir(str(tmp_path))
+        assert name.startswith('hello-') and name.endswith('.prof')
+        stats = pstats.Stats(os.path.join(str(tmp_path), name), stream=io.StringIO())
+        assert any(function[2] == 'busy' for function in stats.stats)
+
+    def test_errors_are_profiled(self):
+        profiler = Profiler(rate=1.0)
+        dispatcher = Dispatcher(profiler=profiler)
+        dispatcher.default(lambda: 1 / 0)
+        with pytest.raises(ZeroDivisionError):
+            dispatcher.dispatch(make_request('hello'))
+        assert profiler.profiled == 1
+
+
+class TestAdapters:
+    def test_wsgi_header(self):
+        profiler = Profiler()
+        dispatcher = register(Dispatcher(profiler=profiler))
+        body = json.dumps(make_request('hello')).encode('utf-8')
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'CONTENT_LENGTH': str(len(body)),
+                   'wsgi.input': io.BytesIO(body), 'HTTP_X_DIALOGFLOW_PROFILE': '1'}
+        dispatcher.wsgi_app(None)(environ, lambda status, headers: None)
+        assert profiler.profiled == 1
+
+    def test_flask_route(self):
+        app = Flask(__name__)
+        profiler = Profiler()
+        dialogflow = register(DialogFlow(
+            app, '/webhook', basic_auth_user='user', basic_auth_pass='secret',
+            profiler=profiler, profile_route='/debug/profile'))
+        client = app.test_client()
+        auth = 'Basic ' + base64.b64encode(b'user:secret').decode('ascii')
+        response = client.post('/webhook', data=json.dumps(make_request('hello')),
+                               headers={'Authorization': auth, 'X-Dialogflow-Profile': '1'})
+        assert response.status_code == 200
+        assert profiler.profiled == 1
+
+        assert client.get('/debug/profile').status_code == 401
+        response = client.get('/debug/profile?action=hello', headers={'Authorization': auth})
+        assert response.status_code == 200
+        assert response.mimetype == 'text/plain'
+        assert b'=== hello (1 requests) ===' in response.data
+
+    def test_flask_route_requires_basic_auth(self):
+        with pytest.raises(ValueError):
+            DialogFlow(Flask(__name__), '/webhook', profiler=Profiler(), profile_route='/debug/profile')
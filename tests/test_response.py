@@ -1,6 +1,6 @@
 import pytest
 import json
-from flask_dialogflow.response import Response
+from flask_dialogflow.response import Response, FrozenResponse
 from flask_dialogflow.messages import TextMessage, MessageEncoder
 
 @pytest.fixture
@@ -28,4 +28,56 @@ class TestResponse:
     def test_serializable(self, response, message):
         response.append(message)
         text = json.dumps(response.__dict__ , cls=MessageEncoder)
-        assert isinstance(text, str)
\ No newline at end of file
+        assert isinstance(text, str)
+
+    def test_to_dict(self, response, message):
+        response.append(message)
+        response.contextOut = {'name': 'ctx'}
+        assert response.to_dict() == {
+            'messages': [{'type': 0, 'speech': MESSAGE}],
+            'contextOut': {'name': 'ctx'},
+        }
+
+    def test_to_json(self, response, message):
+        response.append(message)
+        text = json.dumps(response.__dict__ , cls=MessageEncoder)
+        assert json.loads(response.to_json()) == json.loads(text)
+
+    def test_extend(self, response, message):
+        response.extend([message, message])
+        assert len(response.messages) == 2
+
+    def test_extend_type(self, response, message):
+        with pytest.raises(Exception):
+            response.extend([message, 'not a message'])
+        assert len(response.messages) == 0
+
+
+class TestFrozenResponse:
+    def test_body(self, response, message):
+        response.append(message)
+        frozen = response.freeze()
+        assert isinstance(frozen, FrozenResponse)
+        assert json.loads(frozen.body) == response.to_dict()
+        assert frozen.render() is frozen.body
+
+    def test_context_out(self, response, message):
+        response.append(message)
+        frozen = response.freeze()
+        data = json.loads(frozen.render({'name': 'ctx'}))
+        assert data == {'messages': [{'type': 0, 'speech': MESSAGE}], 'contextOut': {'name': 'ctx'}}
+
+    def test_frozen_context_out(self, response, message):
+        response.append(message)
+        response.contextOut = {'name': 'frozen'}
+        frozen = response.freeze()
+        assert json.loads(frozen.render())['contextOut'] == {'name': 'frozen'}
+        assert json.loads(frozen.render({'name': 'ctx'}))['contextOut'] == {'name': 'ctx'}
+
+    def test_immutable(self, response, message):
+        response.append(message)
+        frozen = response.freeze()
+        response.append(message)
+        assert len(json.loads(frozen.body)['messages']) == 1
+        with pytest.raises(AttributeError):
+            frozen.append(message)
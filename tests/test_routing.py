@@ -0,0 +1,108 @@
+import pytest
+
+from flask_dialogflow.cache import TTLCache
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from flask_dialogflow.routing import Router
+from sample_data import make_request
+
+
+class TestRouter:
+    def test_trailing_wildcard(self):
+        router = Router()
+        router.add('smalltalk.*', 'smalltalk')
+        assert router.match('smalltalk.greetings.hello') == ('smalltalk.*', 'smalltalk', None)
+        assert router.match('smalltalk.agent') == ('smalltalk.*', 'smalltalk', None)
+        assert router.match('smalltalk') is None
+        assert router.match('other.greetings') is None
+
+    def test_named_segment(self):
+        router = Router()
+        router.add('order.{step}', 'order')
+        assert router.match('order.payment') == ('order.{step}', 'order', {'step': 'payment'})
+        assert router.match('order.payment.card') is None
+
+    def test_inner_wildcard(self):
+        router = Router()
+        router.add('shop.*.{item}.buy', 'buy')
+        assert router.match('shop.fruits.apple.buy') == ('shop.*.{item}.buy', 'buy', {'item': 'apple'})
+
+    def test_precedence(self):
+        router = Router()
+        router.add('order.*', 'rest')
+        router.add('order.{step}', 'step')
+        router.add('order.payment', 'literal')
+        assert router.match('order.payment')[1] == 'literal'
+        assert router.match('order.address')[1] == 'step'
+        assert router.match('order.address.zip')[1] == 'rest'
+
+    def test_backtracking(self):
+        router = Router()
+        router.add('a.b.c', 'literal')
+        router.add('a.{x}.d', 'param')
+        assert router.match('a.b.d') == ('a.{x}.d', 'param', {'x': 'b'})
+
+    def test_cache_is_invalidated(self):
+        router = Router(cache_size=2)
+        assert router.match('order.payment') is None
+        router.add('order.*', 'order')
+        assert router.match('order.payment')[1] == 'order'
+        for action in ('order.a', 'order.b', 'order.c'):
+            assert router.match(action)[1] == 'order'
+        assert len(router._resolved) <= 2
+
+    @pytest.mark.parametrize('pattern', ['order.step*', 'order.{step', 'order.{1step}'])
+    def test_invalid(self, pattern):
+        with pytest.raises(ValueError):
+            Router().add(pattern, None)
+
+
+class TestPatternActions:
+    def test_dispatch(self):
+        dispatcher = Dispatcher()
+        calls = []
+
+        @dispatcher.action('smalltalk.*')
+        def smalltalk():
+            calls.append('smalltalk')
+            return Response()
+
+        @dispatcher.action('order.{step}')
+        def order(step, quantity):
+            calls.append((step, quantity))
+            return Response()
+
+        @dispatcher.action('order.cancel')
+        def cancel():
+            calls.append('cancel')
+            return Response()
+
+        dispatcher.dispatch(make_request('smalltalk.greetings.hello'))
+        dispatcher.dispatch(make_request('order.payment', {'quantity': 2}))
+        dispatcher.dispatch(make_request('order.cancel'))
+        assert calls == ['smalltalk', ('payment', 2), 'cancel']
+
+    def test_unmatched_uses_default(self):
+        dispatcher = Dispatcher()
+        dispatcher.action('order.{step}')(lambda step: Response())
+        dispatcher.default(lambda: None)
+        assert dispatcher.dispatch(make_request('order.payment.card')) is None
+
+        dispatcher = Dispatcher()
+        dispatcher.action('order.{step}')(lambda step: Response())
+        with pytest.raises(NotImplementedError):
+            dispatcher.dispatch(make_request('other'))
+
+    def test_options_follow_the_pattern(self):
+        dispatcher = Dispatcher()
+        cache = TTLCache()
+        calls = []
+
+        @dispatcher.action('faq.{topic}', cache=cache)
+        def faq(topic):
+            calls.append(topic)
+            return Response()
+
+        for action in ('faq.hours', 'faq.hours', 'faq.prices'):
+            dispatcher.dispatch(make_request(action))
+        assert calls == ['hours', 'prices']
@@ -0,0 +1,180 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from flask_dialogflow.session import MemoryBackend, SQLiteBackend, SessionStore
+from sample_data import make_request
+
+
+class SlowBackend(MemoryBackend):
+    def __init__(self):
+        super(SlowBackend, self).__init__()
+        self.batches = []
+        self.release = threading.Event()
+
+    def save_many(self, sessions):
+        self.release.wait(5)
+        self.batches.append(sorted(sessions))
+        super(SlowBackend, self).save_many(sessions)
+
+
+class TestSQLiteBackend:
+    def test_roundtrip(self, tmp_path):
+        path = str(tmp_path / 'sessions.db')
+        backend = SQLiteBackend(path)
+        assert backend.load('a') is None
+        backend.save_many({'a': {'cart': ['apple']}, 'b': {}})
+        backend.close()
+        backend = SQLiteBackend(path)
+        assert backend.load('a') == {'cart': ['apple']}
+        backend.delete('a')
+        assert backend.load('a') is None
+        backend.close()
+
+
+class TestSessionStore:
+    def test_cache(self):
+        store = SessionStore()
+        data = store.get('a')
+        assert data == {}
+        assert store.get('a') is data
+        assert (store.hits, store.misses) == (1, 1)
+        assert store.hit_rate == 0.5
+
+    def test_write_behind(self):
+        backend = SlowBackend()
+        store = SessionStore(backend, flush_interval=0.01)
+        store.save('a', {'x': 1})
+        # save returned while the backend is still blocked
+        assert backend.load('a') is None
+        backend.release.set()
+        store.close()
+        assert backend.load('a') == {'x': 1}
+        assert store.flushed_sessions == 1
+        assert store.flush_latency.count == store.flushes
+
+    def test_batch(self):
+        backend = SlowBackend()
+        backend.release.set()
+        store = SessionStore(backend, flush_interval=60, batch_size=3)
+        for session_id in 'abc':
+            store.save(session_id, {})
+        for _ in range(500):
+            if backend.batches:
+                break
+            threading.Event().wait(0.01)
+        assert backend.batches == [['a', 'b', 'c']]
+        store.close()
+
+    def test_dirty_survives_eviction(self):
+        backend = SlowBackend()
+        store = SessionStore(backend, maxsize=1, flush_interval=60)
+        store.save('a', {'x': 1})
+        store.save('b', {'x': 2})
+        assert store.get('a') == {'x': 1}
+        backend.release.set()
+        store.close()
+
+    def test_flush_error(self):
+        class FailingBackend(MemoryBackend):
+            def save_many(self, sessions):
+                raise IOError('disk full')
+
+        store = SessionStore(FailingBackend(), flush_interval=60)
+        store.save('a', {'x': 1})
+        with pytest.raises(IOError):
+            store.flush()
+        assert store.flush_errors == 1
+        assert store.get('a') == {'x': 1}
+        store.backend = MemoryBackend()
+        store.close()
+        assert store.backend.load('a') == {'x': 1}
+
+    def test_failing_backend_backs_off(self, caplog):
+        class FailingBackend(MemoryBackend):
+            def save_many(self, sessions):
+                raise IOError('backend down')
+
+        store = SessionStore(FailingBackend(), flush_interval=0.1, batch_size=2)
+        store.save('a', {})
+        store.save('b', {})
+        time.sleep(0.35)
+        # a full batch is retried every flush_interval, not in a busy loop
+        assert 2 <= store.flush_errors <= 5
+        store._close_at_exit()
+        assert 'Queued sessions lost at exit' in caplog.text
+        store.backend = MemoryBackend()
+
+    def test_closed(self):
+        store = SessionStore()
+        store.close()
+        with pytest.raises(RuntimeError):
+            store.save('a', {})
+
+
+class TestDispatcherSession:
+    def test_session(self, tmp_path):
+        backend = SQLiteBackend(str(tmp_path / 'sessions.db'))
+        dispatcher = Dispatcher(sessions=SessionStore(backend, flush_interval=0.01))
+
+        @dispatcher.action('cart.add')
+        def add(product):
+            dispatcher.session.setdefault('cart', []).append(product)
+            return Response()
+
+        dispatcher.dispatch(make_request('cart.add', {'product': 'apple'}, sessionId='s1'))
+        dispatcher.dispatch(make_request('cart.add', {'product': 'pear'}, sessionId='s1'))
+        dispatcher.dispatch(make_request('cart.add', {'product': 'kiwi'}, sessionId='s2'))
+        dispatcher.shutdown()
+        assert backend.load('s1') == {'cart': ['apple', 'pear']}
+        assert backend.load('s2') == {'cart': ['kiwi']}
+
+    def test_untouched_session_not_saved(self):
+        backend = MemoryBackend()
+        dispatcher = Dispatcher(sessions=SessionStore(backend))
+
+        @dispatcher.action('hello')
+        def hello():
+            return Response()
+
+        dispatcher.dispatch(make_request('hello', sessionId='s1'))
+        dispatcher.shutdown()
+        assert backend.sessions == {}
+
+    @pytest.mark.parametrize('use_async', [False, True])
+    def test_deadline_missed(self, use_async):
+        backend = MemoryBackend()
+        dispatcher = Dispatcher(sessions=SessionStore(backend), deadline=0.02)
+
+        @dispatcher.action('cart.add')
+        def add(product):
+            dispatcher.session['late'] = product
+            time.sleep(0.1)
+            return Response()
+
+        @dispatcher.default
+        def default():
+            dispatcher.session['fallback'] = True
+            return Response()
+
+        request = make_request('cart.add', {'product': 'apple'}, sessionId='s1')
+        if use_async:
+            asyncio.run(dispatcher.dispatch_async(request))
+        else:
+            dispatcher.dispatch(request)
+        dispatcher.shutdown()
+        assert backend.sessions['s1'] == {'late': 'apple', 'fallback': True}
+
+    def test_no_store(self):
+        dispatcher = Dispatcher()
+
+        @dispatcher.action('hello')
+        def hello():
+            return dispatcher.session
+
+        with pytest.raises(RuntimeError):
+            dispatcher.dispatch(make_request('hello', sessionId='s1'))
@@ -0,0 +1,80 @@
+import json
+from contextvars import ContextVar
+
+import pytest
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from flask_dialogflow.state import RequestState, get_state
+from sample_data import sample_request, sample_context
+
+
+@pytest.fixture
+def data():
+    data = json.loads(json.dumps(sample_request))
+    data['result']['contexts'] = [sample_context, dict(sample_context, name='Other')]
+    data['originalRequest'] = {'source': 'facebook'}
+    return data
+
+
+class TestRequestState:
+    def test_lazy(self, data):
+        state = RequestState(data, 'hello')
+        assert state._context_in is state._original_request is state._intent
+        assert state.intent == 'hello'
+        assert state.context_in == data['result']['contexts']
+        assert state.original_request == {'source': 'facebook'}
+
+    def test_missing(self):
+        state = RequestState({'result': {'action': 'hello'}})
+        assert state.intent is None
+        assert state.context_in == []
+        assert state.original_request is None
+        assert state.get_context('some-context') is None
+
+    def test_get_context(self, data):
+        state = RequestState(data)
+        assert state.get_context('some-context') == sample_context
+        assert state.get_context('OTHER')['name'] == 'Other'
+        assert state.get_context('unknown') is None
+
+    def test_set_context_in(self, data):
+        state = RequestState(data)
+        state.get_context('some-context')
+        state.context_in = [dict(sample_context, name='new')]
+        assert state.get_context('some-context') is None
+        assert state.get_context('new') is not None
+
+    def test_copy(self, data):
+        state = RequestState(data, 'hello')
+        state.context_out = sample_context
+        copy = state.copy()
+        assert copy.action == 'hello'
+        assert copy.context_out is None
+        assert copy.context_in == state.context_in
+
+    def test_get_state(self):
+        current_state = ContextVar('state', default=None)
+        with pytest.raises(RuntimeError):
+            get_state(current_state)
+        state = RequestState()
+        token = current_state.set(state)
+        try:
+            assert get_state(current_state) is state
+        finally:
+            current_state.reset(token)
+
+
+class TestGetContext:
+    def test_view_function(self, data):
+        dispatcher = Dispatcher()
+        found = []
+
+        @dispatcher.action('hello')
+        def hello():
+            found.append(dispatcher.get_context('some-context'))
+            return Response()
+
+        dispatcher.dispatch(data)
+        assert found == [sample_context]
+        assert dispatcher.get_context('some-context') is None
@@ -0,0 +1,127 @@
+import threading
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from flask_dialogflow.tasks import TaskQueue
+from sample_data import make_request
+
+
+class TestTaskQueue:
+    def test_run(self):
+        tasks = TaskQueue(max_workers=2)
+        results = []
+        assert tasks.submit(results.append, 1)
+        tasks.shutdown()
+        assert results == [1]
+        assert (tasks.submitted, tasks.completed, tasks.failed, tasks.pending) == (1, 1, 0, 0)
+
+    def test_back_pressure(self):
+        tasks = TaskQueue(max_workers=1, max_pending=2)
+        release = threading.Event()
+        assert tasks.submit(release.wait, 5)
+        assert tasks.submit(release.wait, 5)
+        assert tasks.pending == 2
+        assert not tasks.submit(release.wait, 5)
+        assert tasks.dropped == 1
+        release.set()
+        tasks.shutdown()
+        assert tasks.pending == 0
+        assert tasks.completed == 2
+
+    def test_failure_is_counted(self):
+        tasks = TaskQueue()
+        tasks.submit(lambda: 1 / 0)
+        tasks.shutdown()
+        assert tasks.failed == 1
+
+    def test_drain_on_shutdown(self):
+        tasks = TaskQueue(max_workers=1)
+        done = []
+        release = threading.Event()
+        tasks.submit(release.wait, 5)
+        for i in range(5):
+            tasks.submit(done.append, i)
+        release.set()
+        tasks.shutdown(wait=True)
+        assert done == [0, 1, 2, 3, 4]
+        assert not tasks.submit(done.append, 5)
+        assert tasks.dropped == 1
+
+
+class TestDefer:
+    def test_runs_after_response(self):
+        tasks = TaskQueue()
+        dispatcher = Dispatcher(tasks=tasks)
+        rendered = threading.Event()
+        seen = []
+
+        def task(value):
+            seen.append((value, rendered.is_set()))
+
+        @dispatcher.action('test')
+        def view():
+            dispatcher.defer(task, 'x')
+            rendered.set()
+            return Response()
+
+        assert dispatcher.dispatch(make_request('test')) is not None
+        dispatcher.shutdown()
+        assert seen == [('x', True)]
+
+    def test_discarded_on_error(self):
+        tasks = TaskQueue()
+        dispatcher = Dispatcher(tasks=tasks)
+        seen = []
+
+        @dispatcher.action('test')
+        def view():
+            dispatcher.defer(seen.append, 1)
+            raise ValueError()
+
+        try:
+            dispatcher.dispatch(make_request('test'))
+        except ValueError:
+            pass
+        dispatcher.shutdown()
+        assert seen == []
+        assert tasks.submitted == 0
+
+    def test_async(self):
+        import asyncio
+        tasks = TaskQueue()
+        dispatcher = Dispatcher(tasks=tasks)
+        seen = []
+
+        @dispatcher.action('test')
+        async def view():
+            dispatcher.defer(seen.append, 1)
+            return Response()
+
+        asyncio.run(dispatcher.dispatch_async(make_request('test')))
+        dispatcher.shutdown()
+        assert seen == [1]
+
+    def test_outside_request(self):
+        dispatcher = Dispatcher()
+        seen = []
+        dispatcher.defer(seen.append, 1)
+        dispatcher.shutdown()
+        assert seen == [1]
+
+    def test_late_view_function(self):
+        tasks = TaskQueue()
+        dispatcher = Dispatcher(tasks=tasks, fallback=Response())
+        release = threading.Event()
+        seen = []
+
+        @dispatcher.action('test', deadline=0.01)
+        def view():
+            release.wait(5)
+            dispatcher.defer(seen.append, 1)
+            return Response()
+
+        dispatcher.dispatch(make_request('test'))
+        assert tasks.submitted == 0
+        release.set()
+        dispatcher.shutdown()
+        assert seen == [1]
@@ -0,0 +1,164 @@
+import asyncio
+import io
+import json
+
+import pytest
+from flask import Flask
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.dialogflow import DialogFlow
+from flask_dialogflow.errors import InvalidPayload
+from flask_dialogflow.response import Response
+from flask_dialogflow.validation import WEBHOOK_FIELDS, compile_validator, validate_webhook
+from sample_data import make_request
+
+
+def error_of(data, validator=validate_webhook):
+    with pytest.raises(InvalidPayload) as error:
+        validator(data)
+    return error.value.to_dict()
+
+
+class TestValidator:
+    def test_valid(self):
+        assert validate_webhook(make_request()) is None
+
+    def test_missing_fields(self):
+        data = make_request()
+        del data['result']['metadata']['intentName']
+        assert error_of(data) == {
+            'status': 400, 'error': 'invalid_request', 'field': 'result.metadata.intentName',
+            'expected': 'a string', 'message': 'Missing field "result.metadata.intentName"'}
+        assert error_of({'sessionId': 'a'})['message'] == 'Missing field "result"'
+        data = make_request()
+        del data['result']['metadata']
+        assert error_of(data)['field'] == 'result.metadata'
+
+    def test_wrong_types(self):
+        assert error_of(make_request(action=None))['message'] == \
+            'Invalid field "result.action", expected a string'
+        assert error_of(make_request(parameters=[]))['expected'] == 'an object'
+        assert error_of(None)['message'] == 'Invalid request, expected an object'
+        assert error_of([])['field'] == ''
+
+    def test_custom_fields(self):
+        validator = compile_validator(WEBHOOK_FIELDS + (('sessionId', str), ('result.score', (int, float))))
+        assert validator(make_request()) is None
+        assert error_of(make_request(result={'score': 'high'}), validator)['expected'] == 'an integer or a number'
+
+    def test_fields_listed_twice(self):
+        with pytest.raises(ValueError):
+            compile_validator((('result.action', str), ('result.action', str)))
+        with pytest.raises(ValueError):
+            compile_validator((('result.action', str), ('result', dict)))
+
+
+def make_dispatcher(**kwargs):
+    dispatcher = Dispatcher(**kwargs)
+    dispatcher.default(lambda: Response())
+    return dispatcher
+
+
+class TestDispatcher:
+    def test_invalid_requests_are_rejected(self):
+        dispatcher = make_dispatcher()
+        with pytest.raises(InvalidPayload):
+            dispatcher.dispatch({'result': {'action': 'hello'}})
+        with pytest.raises(InvalidPayload):
+            asyncio.run(dispatcher.dispatch_async({'result': {'action': 'hello'}}))
+
+    def test_validation_can_be_disabled(self):
+        dispatcher = make_dispatcher(validator=None)
+        data = make_request()
+        del data['result']['metadata']
+        assert dispatcher.dispatch(data) is not None
+
+    def test_invalid_json(self):
+        with pytest.raises(ValueError) as error:
+            make_dispatcher().dispatch(b'{"result": ')
+        assert error.value.to_dict()['message'] == 'The request body is not valid JSON'
+
+
+def call_wsgi(app, body, length=True):
+    environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'wsgi.input': io.BytesIO(body)}
+    if length:
+        environ['CONTENT_LENGTH'] = str(len(body))
+    else:
+        environ['wsgi.input_terminated'] = True
+    statuses = []
+    chunks = app(environ, lambda status, headers: statuses.append(status))
+    return statuses[0], b''.join(chunks)
+
+
+class TestAdapters:
+    def test_wsgi(self):
+        app = make_dispatcher(max_body_size=1000).wsgi_app(None)
+        status, body = call_wsgi(app, json.dumps({'result': {}}).encode('utf-8'))
+        assert status == '400 Bad Request'
+        assert json.loads(body)['field'] == 'result.action'
+
+        large = json.dumps(make_request(parameters={'text': 'x' * 1000})).encode('utf-8')
+        status, body = call_wsgi(app, large)
+        assert status.startswith('413 ')
+        assert json.loads(body) == {'status': 413, 'error': 'payload_too_large', 'max_size': 1000,
+                                    'message': 'The request body is larger than 1000 bytes'}
+        assert call_wsgi(app, large, length=False)[0].startswith('413 ')
+        assert call_wsgi(app, json.dumps(make_request()).encode('utf-8'), length=False)[0] == '200 OK'
+
+    def test_wsgi_unterminated_input(self):
+        app = make_dispatcher(max_body_size=1000).wsgi_app(None)
+
+        class EndlessInput:
+            def read(self, size=-1):
+                raise AssertionError('read from an unterminated input')
+
+        statuses = []
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': '/', 'wsgi.input': EndlessInput()}
+        app(environ, lambda status, headers: statuses.append(status))
+        assert statuses == ['400 Bad Request']
+
+    def test_asgi(self):
+        app = make_dispatcher(max_body_size=1000).asgi_app(None)
+        large = json.dumps(make_request(parameters={'text': 'x' * 1000})).encode('utf-8')
+
+        async def call(body, headers):
+            received = []
+            chunks = [body[:500], body[500:]]
+
+            async def receive():
+                return {'type': 'http.request', 'body': chunks.pop(0), 'more_body': bool(chunks)}
+
+            async def send(message):
+                received.append(message)
+            scope = {'type': 'http', 'method': 'POST', 'path': '/', 'headers': headers}
+            await app(scope, receive, send)
+            return received[0]['status'], chunks
+        status, chunks = asyncio.run(call(large, [(b'content-length', str(len(large)).encode())]))
+        assert status == 413 and len(chunks) == 2  # rejected before reading
+        assert asyncio.run(call(large, []))[0] == 413
+        assert asyncio.run(call(json.dumps(make_request()).encode('utf-8'), []))[0] == 200
+        assert asyncio.run(call(b'{"result": {}}', []))[0] == 400
+
+    def test_flask(self):
+        app = Flask(__name__)
+        dialogflow = DialogFlow(app, '/webhook', max_body_size=1000)
+        dialogflow.default(lambda: Response())
+        client = app.test_client()
+        response = client.post('/webhook', data=json.dumps({'result': {'action': 'hello'}}))
+        assert response.status_code == 400
+        assert response.get_json()['field'] == 'result.parameters'
+        response = client.post('/webhook', data=b'not json')
+        assert response.status_code == 400
+        large = json.dumps(make_request(parameters={'text': 'x' * 1000}))
+        response = client.post('/webhook', data=large)
+        assert response.status_code == 413
+        assert response.get_json()['error'] == 'payload_too_large'
+        assert client.post('/webhook', data=json.dumps(make_request())).status_code == 200
+
+    def test_flask_without_validator(self):
+        app = Flask(__name__)
+        dialogflow = DialogFlow(app, '/webhook', validator=None)
+        dialogflow.default(lambda: Response())
+        response = app.test_client().post('/webhook', data=b'not json')
+        assert response.status_code == 400
+        assert response.get_json()['message'] == 'The request body is not valid JSON'
@@ -0,0 +1,105 @@
+import base64
+import io
+import json
+
+import pytest
+
+from flask_dialogflow.core import Dispatcher
+from flask_dialogflow.response import Response
+from flask_dialogflow.messages import TextMessage
+from sample_data import make_request
+
+WEBHOOK_ENDPOINT = '/webhook'
+
+
+def call(app, data, path=WEBHOOK_ENDPOINT, method='POST', authorization=None):
+    body = json.dumps(data).encode('utf-8')
+    environ = {
+        'REQUEST_METHOD': method,
+        'PATH_INFO': path,
+        'CONTENT_LENGTH': str(len(body)),
+        'CONTENT_TYPE': 'application/json',
+        'wsgi.input': io.BytesIO(body),
+    }
+    if authorization is not None:
+        environ['HTTP_AUTHORIZATION'] = authorization
+    statuses = []
+
+    def start_response(status, headers):
+        statuses.append(status)
+
+    chunks = app(environ, start_response)
+    return statuses[0], b''.join(chunks)
+
+
+@pytest.fixture
+def dispatcher():
+    dispatcher = Dispatcher(route=WEBHOOK_ENDPOINT)
+
+    @dispatcher.action('hello')
+    def hello():
+        response = Response()
+        response.append(TextMessage(speech='Hi there!'))
+        return response
+
+    @dispatcher.action('nothing')
+    def nothing():
+        return None
+
+    return dispatcher
+
+
+class EndlessInput:
+    """``wsgi.input`` of a server that doesn't end it, reading it to the end never returns."""
+
+    def __init__(self, body):
+        self.body = io.BytesIO(body)
+
+    def read(self, size=-1):
+        if size is None or size < 0:
+            raise AssertionError('read to the end of an unterminated input')
+        return self.body.read(size)
+
+
+class TestWSGIApp:
+    def test_missing_content_length(self, dispatcher):
+        body = json.dumps(make_request('hello')).encode('utf-8')
+        statuses = []
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': WEBHOOK_ENDPOINT, 'wsgi.input': EndlessInput(body)}
+        chunks = dispatcher.wsgi_app()(environ, lambda status, headers: statuses.append(status))
+        assert statuses == ['400 Bad Request']
+        assert json.loads(b''.join(chunks))['message'] == 'The request body is not valid JSON'
+
+        environ = {'REQUEST_METHOD': 'POST', 'PATH_INFO': WEBHOOK_ENDPOINT, 'wsgi.input': io.BytesIO(body),
+                   'wsgi.input_terminated': True}
+        chunks = dispatcher.wsgi_app()(environ, lambda status, headers: statuses.append(status))
+        assert statuses[1] == '200 OK'
+
+    def test_response(self, dispatcher):
+        status, body = call(dispatcher.wsgi_app(), make_request('hello'))
+        assert status == '200 OK'
+        assert json.loads(body)['messages'][0]['speech'] == 'Hi there!'
+
+    def test_no_response(self, dispatcher):
+        status, _ = call(dispatcher.wsgi_app(), make_request('nothing'))
+        assert status == '400 Bad Request'
+
+    def test_wrong_route(self, dispatcher):
+        status, _ = call(dispatcher.wsgi_app(), make_request('hello'), path='/other')
+        assert status == '404 Not Found'
+
+    def test_any_route(self, dispatcher):
+        dispatcher._route = None
+        status, _ = call(dispatcher.wsgi_app(), make_request('hello'), path='/other')
+        assert status == '200 OK'
+
+    def test_wrong_method(self, dispatcher):
+        status, _ = call(dispatcher.wsgi_app(), make_request('hello'), method='GET')
+        assert status == '405 Method Not Allowed'
+
+    def test_basic_auth(self, dispatcher):
+        dispatcher.set_basic_auth('user', 'secret')
+        app = dispatcher.wsgi_app()
+        assert call(app, make_request('hello'))[0] == '401 Unauthorized'
+        credentials = 'Basic ' + base64.b64encode(b'user:secret').decode('ascii')
+        assert call(app, make_request('hello'), authorization=credentials)[0] == '200 OK'